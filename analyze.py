@@ -1,15 +1,69 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import csv
 import glob
+import io
+import mmap
 import os
 import statistics
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
 from math import sqrt
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import experiment_spec
+from results_db import ResultsDB
+
 Z_98 = 2.3263
 EXPECTED_MEASURES = 1000
 EXPECTED_MEASURES_PER_LEVEL = 100
+WARMUP_PER_SIZE = 50      # WARMUP em client_udp.c (não vai para o CSV)
+PING_SIZE = 4             # teste de conectividade "PING" do client_udp
+ROLLING_WINDOW = 50       # janela (em iterações) das estatísticas móveis
+MSER_BATCH = 5            # tamanho do lote do MSER-5
+MSER_ALPHA = 0.01         # falso positivo do transiente, já corrigido pela escolha do ponto
+RAMP_TAXA_MIN = 10        # TAXA_MIN em client_udp_ramp.c (req/s)
+RAMP_TAXA_MAX = 100       # TAXA_MAX em client_udp_ramp.c (req/s)
+RAMP_NIVEIS = 10          # NIVEIS de subida; os níveis seguintes descem a rampa
+SATURATION_BOOTSTRAP = 200
+SATURATION_MIN_INCREASE = 0.10   # aumento mínimo do RTT (10%) para contar como saturação
+SATURATION_MIN_PROB = 0.95       # fração das reamostragens que precisa confirmar
+SATURATION_SEED = 20240917
+GE_MIN_LOSSES = 20               # perdas mínimas para ajustar o Gilbert-Elliott completo
+TICKS_PER_MS = 100000            # resolução dos CSVs (%.5f ms) = 10 ns
+TICK_DENSE_SPAN = 1 << 22        # faixa máxima (em ticks) contada com bincount denso
+TICK_SORT_RATIO = 2              # faixas com menos de 1 RTT a cada 2 ticks são ordenadas
+PARALLEL_MIN_BYTES = 32 << 20    # arquivos menores são lidos em um processo só
+PARALLEL_RANGES_PER_JOB = 4      # faixas por processo (equilibra a carga)
+CONTENTION_BIN_MS = 100          # janela do eixo de tempo comum (--send-ts)
+# Análises opcionais de cada CSV do cliente, ligadas pela opção de mesmo nome
+ANALYSES = {
+    "rolling": "estatísticas móveis por tamanho e por execução (rolling_*.csv)",
+    "steady-state": "transiente (MSER) e deriva por tamanho e por execução "
+                    "(steady_state_*.csv)",
+    "saturation": "ponto de saturação de cada tamanho na rampa (saturation_*.csv)",
+    "loss": "rajadas de perda e ajuste Gilbert-Elliott (loss_*.csv, loss_hist_*.csv)",
+    "contention": "carga concorrente x RTT dos CSVs gravados com --send-ts "
+                  "(contention_*.csv, load_timeline_*.csv)",
+    "kernel-overhead": "overhead de escalonamento dos CSVs gravados com --kernel-ts "
+                       "(overhead_kernel_*.csv)",
+    "dwell": "tempo no servidor x rede dos CSVs gravados com --dwell (dwell_*.csv)",
+}
+# Colunas numéricas dos CSVs dos clientes (as opcionais dependem das opções usadas)
+CLIENT_COLUMNS = ("tamanho_bytes", "nivel", "iteracao", "iteracao_no_nivel", "rtt_ms",
+                  "rtt_kernel_ms", "dwell_ms", "instancia", "t_envio_ns")
+BOOTSTRAP_CONFIDENCE = 98        # mesmo nível do IC da média (Z_98)
+BOOTSTRAP_SEED = 20240917
+BOOTSTRAP_COLUMNS = [
+    "media_bs_inf_ms", "media_bs_sup_ms", "mediana_bs_inf_ms", "mediana_bs_sup_ms",
+    "p95_bs_inf_ms", "p95_bs_sup_ms", "p99_bs_inf_ms", "p99_bs_sup_ms",
+]
 
 def _filter_by_speed(paths, network_speed):
     """
@@ -22,89 +76,907 @@ def _filter_by_speed(paths, network_speed):
     else:
         return [p for p in paths if "_100" not in os.path.basename(p)]
 
-def read_raw_data(filepath):
+def _byte_ranges(filepath, jobs):
     """
-    Lê raw_data_clienteX[ _100].csv => { tamanho_bytes: [rtt1, rtt2, ...] }
-    Descartamos rtt < 0 (timeouts).
+    Divide o arquivo (após o cabeçalho) em faixas [início, fim) alinhadas em
+    '\\n' para leitura em paralelo. Retorna (cabeçalho, faixas) ou None quando
+    o arquivo é pequeno demais para compensar.
     """
-    data = {}
-    total_per_size = {}
+    if jobs <= 1 or os.path.getsize(filepath) < PARALLEL_MIN_BYTES:
+        return None
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        body = mm.find(b"\n") + 1
+        header = next(csv.reader([mm[:body].decode("utf-8", "replace")]), [])
+        size = len(mm)
+        parts = jobs * PARALLEL_RANGES_PER_JOB
+        bounds = [body]
+        for i in range(1, parts):
+            nl = mm.find(b"\n", body + (size - body) * i // parts)
+            bounds.append(size if nl < 0 else nl + 1)
+        bounds.append(size)
+    bounds = sorted(set(bounds))
+    return header, list(zip(bounds[:-1], bounds[1:]))
 
-    if not os.path.exists(filepath):
-        print(f"[WARN] Arquivo não encontrado: {filepath}")
-        return data, total_per_size
 
+def _parse_range(filepath, start, end, cols):
+    """
+    Lê as colunas cols das linhas em [início, fim) direto do mmap do arquivo
+    (cada processo mapeia o arquivo; nada do conteúdo é copiado entre
+    processos). Retorna (tabela float64, linhas malformadas).
+    """
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8", "replace")
     try:
-        line_count = valid_count = invalid_count = 0
-        with open(filepath, newline="") as f:
-            reader = csv.DictReader(f)
+        return np.loadtxt(io.StringIO(text), delimiter=",", usecols=cols, ndmin=2), 0
+    except ValueError:
+        lines = [line for line in text.splitlines() if line.strip()]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            table = np.genfromtxt(lines, delimiter=",", usecols=cols,
+                                  invalid_raise=False, ndmin=2)
+        table = table[~np.isnan(table).any(axis=1)] if table.size else np.empty((0, len(cols)))
+        return table, len(lines) - table.shape[0]
 
-            for row in reader:
-                line_count += 1
-                if "tamanho_bytes" not in row or "rtt_ms" not in row:
-                    invalid_count += 1
-                    continue
 
-                try:
-                    size = int(row["tamanho_bytes"])
-                    rtt  = float(row["rtt_ms"])
-                except (ValueError, TypeError):
-                    invalid_count += 1
-                    continue
+def _read_table(filepath, cols, jobs=1):
+    """
+    Lê as colunas de índices cols de um CSV do cliente com numpy, descartando
+    linhas malformadas (execução interrompida, linha truncada). Com jobs > 1,
+    arquivos grandes são lidos em paralelo por faixas de bytes.
+    Retorna (tabela float64, linhas lidas, linhas malformadas, faixas).
+    """
+    split = _byte_ranges(filepath, jobs)
+    if split:
+        ranges = split[1]
+        n = len(ranges)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_parse_range, [filepath] * n, [r[0] for r in ranges],
+                                  [r[1] for r in ranges], [cols] * n))
+        table = np.concatenate([t for t, _ in parts])
+        invalid = sum(bad for _, bad in parts)
+        return table, table.shape[0] + invalid, invalid, n
+    try:
+        table = np.loadtxt(filepath, delimiter=",", skiprows=1, usecols=cols, ndmin=2)
+        return table, table.shape[0], 0, 1
+    except ValueError:
+        with open(filepath, newline="") as f:
+            lines = [line for line in f.read().splitlines()[1:] if line.strip()]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            table = np.genfromtxt(lines, delimiter=",", usecols=cols,
+                                  invalid_raise=False, ndmin=2)
+        table = table[~np.isnan(table).any(axis=1)] if table.size else np.empty((0, len(cols)))
+        return table, len(lines), len(lines) - table.shape[0], 1
 
-                total_per_size[size] = total_per_size.get(size, 0) + 1
-                if rtt < 0:              # timeout
-                    continue
 
-                data.setdefault(size, []).append(rtt)
-                valid_count += 1
+def _csv_columns(filepath):
+    with open(filepath, newline="") as f:
+        return next(csv.reader(f), [])
 
-        print(f"[INFO] {filepath}: {line_count} linhas lidas, "
-              f"{valid_count} RTTs válidos, {invalid_count} linhas inválidas")
 
+def load_client_csv(filepath, jobs=1):
+    """
+    Lê uma única vez as colunas numéricas de um raw_data_* ou ramp_data_*
+    (CLIENT_COLUMNS presentes no cabeçalho) => {coluna: array}. Todas as
+    análises do arquivo trabalham sobre esses arrays. None se o arquivo não
+    existir ou não tiver linhas válidas.
+    """
+    if not os.path.exists(filepath):
+        print(f"[WARN] Arquivo não encontrado: {filepath}")
+        return None
+    try:
+        header = _csv_columns(filepath)
+        names = [c for c in CLIENT_COLUMNS if c in header]
+        if "rtt_ms" not in names:
+            print(f"[WARN] {filepath}: sem a coluna rtt_ms")
+            return None
+        table, line_count, invalid_count, n_ranges = _read_table(
+            filepath, [header.index(c) for c in names], jobs)
     except Exception as e:
         print(f"[ERROR] Erro ao processar {filepath}: {e}")
+        return None
 
-    return data, total_per_size
+    valid_count = int((table[:, names.index("rtt_ms")] >= 0).sum())
+    print(f"[INFO] {filepath}: {line_count} linhas lidas, "
+          f"{valid_count} RTTs válidos, {invalid_count} linhas inválidas"
+          + (f" ({n_ranges} faixas em {jobs} processos)" if n_ranges > 1 else ""))
+    if not table.shape[0]:
+        return None
+    return {name: table[:, i] for i, name in enumerate(names)}
 
 
-def read_ramp_data(filepath):
+def group_rtts(cols, key_fields, skip_iterations=None):
     """
-    Lê ramp_data_clienteX[ _100].csv
-      => { (tamanho_bytes, nivel): [rtt1, rtt2, ...] }
+    Agrupa os RTTs de load_client_csv por chave => ({chave: RTTs válidos, na
+    ordem do arquivo}, {chave: linhas}). A chave é o valor da coluna quando
+    key_fields tem uma só coluna e a tupla das colunas caso contrário.
+    Descartamos rtt < 0 (timeouts), que contam apenas nas linhas.
+    skip_iterations = {tamanho: n} descarta as n primeiras iterações de cada
+    tamanho (transiente detectado).
     """
-    data = {}
-    total_per_key = {}
+    data, totals = {}, {}
+    if cols is None or not {*key_fields, "rtt_ms"} <= cols.keys():
+        return data, totals
+    keys = np.column_stack([cols[k] for k in key_fields]).astype(np.int64)
+    rtts = cols["rtt_ms"]
+    if skip_iterations and "iteracao" in cols:
+        sizes, inverse = np.unique(keys[:, 0], return_inverse=True)
+        limit = np.array([skip_iterations.get(s, 0) for s in sizes.tolist()])
+        keep = cols["iteracao"] > limit[inverse.reshape(-1)]
+        keys, rtts = keys[keep], rtts[keep]
+    if not rtts.size:
+        return data, totals
+    uniq, order, bounds = _group_rows(keys)
+    rtts = rtts[order]
+    for i, key in enumerate(uniq.tolist()):
+        key = key[0] if len(key_fields) == 1 else tuple(key)
+        chunk = rtts[bounds[i]:bounds[i + 1]]
+        totals[key] = chunk.size
+        valid = chunk[chunk >= 0]
+        if valid.size:
+            data[key] = valid
+    return data, totals
 
-    if not os.path.exists(filepath):
-        print(f"[WARN] Arquivo não encontrado: {filepath}")
-        return data, total_per_key
 
+def _load_columns(filepath, columns, purpose, jobs=1):
+    """
+    Lê as colunas pedidas de um CSV do cliente com numpy (None se faltar
+    alguma). Linhas malformadas de uma execução interrompida são descartadas.
+    Com jobs > 1, arquivos grandes são lidos em paralelo por faixas de bytes.
+    """
+    header = _csv_columns(filepath)
     try:
-        with open(filepath, newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if ("tamanho_bytes" not in row or
-                    "nivel" not in row or
-                    "rtt_ms" not in row):
-                    continue
-                try:
-                    size  = int(row["tamanho_bytes"])
-                    nivel = int(row["nivel"])
-                    rtt   = float(row["rtt_ms"])
-                except (ValueError, TypeError):
-                    continue
-                if rtt < 0:
-                    continue
-
-                key = (size, nivel)
-                total_per_key[key] = total_per_key.get(key, 0) + 1
-                data.setdefault(key, []).append(rtt)
+        cols = [header.index(c) for c in columns]
+    except ValueError:
+        return None
+    table, _, invalid, _ = _read_table(filepath, cols, jobs)
+    if invalid:
+        print(f"[WARN] {filepath}: linhas malformadas ignoradas {purpose}")
+    return table if table.shape[0] else None
 
-    except Exception as e:
-        print(f"[ERROR] Erro ao processar {filepath}: {e}")
 
-    return data, total_per_key
+def _group_rows(keys):
+    """
+    Agrupa as linhas pela chave (matriz linhas x colunas): devolve as chaves
+    únicas, a permutação que deixa cada grupo contíguo (na ordem do arquivo)
+    e os limites de cada grupo nessa permutação.
+    """
+    uniq, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    order = np.argsort(group, kind="stable")
+    bounds = np.searchsorted(group[order], np.arange(uniq.shape[0] + 1))
+    return uniq, order, bounds
+
+
+def read_kernel_overhead(cols, key_fields):
+    """
+    Colunas de um CSV gerado com --kernel-ts (load_client_csv)
+      => (chaves, limites, rtt_ms, rtt_kernel_ms), com as amostras de cada
+    chave contíguas nos arrays de RTT (chaves[i] ocupa limites[i]:limites[i+1]).
+    A chave é formada pelas colunas key_fields. Só entram amostras com os dois
+    RTTs válidos; arquivos sem a coluna rtt_kernel_ms retornam None.
+    """
+    if "rtt_kernel_ms" not in cols:
+        return None
+    rtts, kernel = cols["rtt_ms"], cols["rtt_kernel_ms"]
+    keep = (rtts >= 0) & (kernel >= 0)
+    if not keep.any():
+        return None
+    keys = np.column_stack([cols[k][keep] for k in key_fields]).astype(np.int64)
+    keys, order, bounds = _group_rows(keys)
+    return keys, bounds, rtts[keep][order], kernel[keep][order]
+
+
+def write_kernel_overhead(cols, key_fields, out_path):
+    """
+    Gera o overhead de escalonamento (rtt_ms - rtt_kernel_ms) por chave: o
+    tempo entre o kernel receber o eco e o processo cliente voltar a executar.
+    """
+    data = read_kernel_overhead(cols, key_fields)
+    if data is None:
+        return False
+    keys, bounds, user, kernel = data
+    overhead = user - kernel
+
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow([
+            *key_fields, "n_amostras", "rtt_usuario_medio_ms", "rtt_kernel_medio_ms",
+            "overhead_medio_ms", "overhead_mediana_ms", "overhead_p95_ms",
+            "overhead_p99_ms", "overhead_max_ms", "overhead_%"
+        ])
+        for i, key in enumerate(keys):
+            sl = slice(bounds[i], bounds[i + 1])
+            over = overhead[sl]
+            media_user, media_over = user[sl].mean(), over.mean()
+            writer.writerow([
+                *key.tolist(), over.size, f"{media_user:.5f}",
+                f"{kernel[sl].mean():.5f}", f"{media_over:.5f}",
+                *(f"{x:.5f}" for x in np.percentile(over, (50, 95, 99))),
+                f"{over.max():.5f}",
+                f"{(media_over / media_user * 100 if media_user > 0 else 0.0):.2f}"
+            ])
+
+    print(f"[SUCCESS] Overhead de escalonamento salvo em {out_path}")
+    return True
+
+
+def write_dwell(cols, key_fields, out_path):
+    """
+    Separa, por chave, o RTT de um CSV gravado com --dwell em tempo no
+    servidor (dwell_ms: da chegada ao socket do servidor ao envio do eco,
+    incluindo a fila do socket) e o restante (rtt_ms - dwell_ms: rede e
+    pilhas de rede dos dois lados). Payloads menores que o cabeçalho do
+    servidor (16 bytes) ficam de fora.
+    """
+    if "dwell_ms" not in cols:
+        return False
+    keep = (cols["rtt_ms"] >= 0) & (cols["dwell_ms"] >= 0)
+    n_samples = int(keep.sum())
+    if not n_samples:
+        print(f"[WARN] {out_path} não gerado: nenhuma amostra com dwell_ms (payloads "
+              "menores que 16 bytes ou servidor sem --dwell)")
+        return False
+
+    keys = np.column_stack([cols[k][keep] for k in key_fields]).astype(np.int64)
+    keys, order, bounds = _group_rows(keys)
+    rtts, dwell = cols["rtt_ms"][keep][order], cols["dwell_ms"][keep][order]
+    network = rtts - dwell
+
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow([
+            *key_fields, "n_amostras", "rtt_medio_ms", "dwell_medio_ms", "dwell_mediana_ms",
+            "dwell_p95_ms", "dwell_p99_ms", "dwell_max_ms", "rede_medio_ms",
+            "rede_mediana_ms", "rede_p95_ms", "rede_p99_ms", "dwell_%"
+        ])
+        for i, key in enumerate(keys):
+            sl = slice(bounds[i], bounds[i + 1])
+            d, net, rtt_mean = dwell[sl], network[sl], rtts[sl].mean()
+            writer.writerow([
+                *key.tolist(), d.size, f"{rtt_mean:.5f}", f"{d.mean():.5f}",
+                *(f"{x:.5f}" for x in np.percentile(d, (50, 95, 99))), f"{d.max():.5f}",
+                f"{net.mean():.5f}", *(f"{x:.5f}" for x in np.percentile(net, (50, 95, 99))),
+                f"{(d.mean() / rtt_mean * 100 if rtt_mean > 0 else 0.0):.2f}"
+            ])
+
+    print(f"[SUCCESS] Tempo no servidor x rede ({n_samples} amostras) salvo em {out_path}")
+    return True
+
+def _occurrence_rank(key):
+    """Ordem de ocorrência de cada linha entre as linhas com a mesma chave."""
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_key)) + 1]
+    lengths = np.diff(np.r_[starts, sorted_key.size])
+    rank = np.empty_like(order)
+    rank[order] = np.arange(sorted_key.size) - np.repeat(starts, lengths)
+    return rank
+
+
+def _execution_ids(labels, key):
+    """
+    Índice denso da execução de cada linha quando o CSV tem a coluna
+    instancia (--send-ts): o rótulo separa execuções simultâneas que
+    intercalam linhas no mesmo arquivo, e a ordem de ocorrência da chave
+    dentro do rótulo separa execuções que reaproveitaram o mesmo PID.
+    """
+    _, label = np.unique(labels, return_inverse=True)
+    label = label.reshape(-1).astype(np.int64)
+    rank = _occurrence_rank(label * (int(key.max()) + 1) + key)
+    _, ids = np.unique(label * (int(rank.max()) + 1) + rank, return_inverse=True)
+    return ids.reshape(-1)
+
+
+def raw_arrays(cols):
+    """
+    Colunas de um raw_data_clienteX[ _100].csv (load_client_csv) como
+    (tamanho, iteracao, rtt, instancia). Cada execução do cliente grava as
+    mesmas chaves (tamanho, iteracao), então a instância é a ordem de
+    ocorrência da chave (ou, com a coluna instancia, a ordem dentro de cada
+    rótulo).
+    """
+    if not {"tamanho_bytes", "iteracao"} <= cols.keys():
+        return None
+    sizes = cols["tamanho_bytes"].astype(np.int64)
+    iters = cols["iteracao"].astype(np.int64)
+    key = sizes * (int(iters.max()) + 1) + iters
+    instances = (_execution_ids(cols["instancia"], key) if "instancia" in cols
+                 else _occurrence_rank(key))
+    return sizes, iters, cols["rtt_ms"], instances
+
+
+def raw_instances_per_size(cols):
+    """
+    Execuções do cliente por tamanho em um raw_data_*: cada execução grava a
+    iteração 1 uma única vez por tamanho. Vale também para o modo --adaptive
+    do client_udp, em que cada execução para em um número diferente de
+    tentativas e EXPECTED_MEASURES não divide o total.
+    """
+    if cols is None or "iteracao" not in cols:
+        return {}
+    first = cols["iteracao"] == 1
+    sizes, counts = np.unique(cols["tamanho_bytes"][first].astype(np.int64), return_counts=True)
+    return dict(zip(sizes.tolist(), counts.tolist()))
+
+
+def iteration_matrix(iters, rtts, instances):
+    """
+    Monta a matriz instância x iteração de um tamanho: RTT válido ou NaN, mais
+    as máscaras de perda (rtt < 0) e de linhas presentes no CSV.
+    """
+    shape = (int(instances.max()) + 1, int(iters.max()))
+    values = np.full(shape, np.nan)
+    lost = np.zeros(shape, dtype=bool)
+    present = np.zeros(shape, dtype=bool)
+    cols = iters - 1
+    present[instances, cols] = True
+    lost[instances, cols] = rtts < 0
+    values[instances, cols] = np.where(rtts < 0, np.nan, rtts)
+    return values, lost, present
+
+
+def _rolling_sum(x, window):
+    """Soma móvel ao longo do último eixo (janelas completas apenas)."""
+    c = np.cumsum(x, axis=-1, dtype=np.float64)
+    c = np.concatenate([np.zeros(c.shape[:-1] + (1,)), c], axis=-1)
+    return c[..., window:] - c[..., :-window]
+
+
+def rolling_window_stats(values, lost, present, window=ROLLING_WINDOW, chunk_elems=1 << 22):
+    """
+    Estatísticas móveis ao longo de iteracao, agregando todas as instâncias da
+    janela. Retorna dict de arrays indexados pelo fim da janela.
+    """
+    n_iter = values.shape[1]
+    window = min(window, n_iter)
+    valid = ~np.isnan(values)
+    n_valid = _rolling_sum(valid.sum(axis=0), window)
+    n_lost = _rolling_sum(lost.sum(axis=0), window)
+    n_total = _rolling_sum(present.sum(axis=0), window)
+    sums = _rolling_sum(np.nansum(values, axis=0), window)
+
+    n_win = n_iter - window + 1
+    p50 = np.full(n_win, np.nan)
+    p99 = np.full(n_win, np.nan)
+    # A janela de todas as instâncias é ordenada em blocos para limitar a memória
+    view = sliding_window_view(values, window, axis=1)
+    step = max(1, chunk_elems // (values.shape[0] * window))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        for a in range(0, n_win, step):
+            b = min(a + step, n_win)
+            block = view[:, a:b, :].transpose(1, 0, 2).reshape(b - a, -1)
+            p50[a:b], p99[a:b] = np.nanpercentile(block, [50, 99], axis=1)
+        media = sums / n_valid
+    perda = np.divide(n_lost * 100.0, n_total, out=np.zeros(n_win), where=n_total > 0)
+    return {
+        "fim": np.arange(window, n_iter + 1),
+        "n": n_valid.astype(np.int64),
+        "media": media,
+        "p50": p50,
+        "p99": p99,
+        "perda": perda,
+    }
+
+
+def mser_truncation(series, batch=MSER_BATCH):
+    """
+    Ponto de truncamento MSER-m: número de observações iniciais cujo descarte
+    minimiza o erro padrão da média do restante (busca na primeira metade).
+    Em séries estacionárias o MSER ainda aponta alguns lotes ao acaso, então o
+    truncamento só vale se a média descartada diferir da média do regime. Como
+    o ponto testado é o que o MSER escolheu entre os candidatos, o limiar do
+    teste tem correção de Bonferroni sobre todos eles (nível MSER_ALPHA no
+    total). NaN (iterações sem RTT válido) são ignorados.
+    """
+    idx = np.flatnonzero(~np.isnan(series))
+    m = idx.size // batch
+    if m < 4:
+        return 0
+    y = series[idx[:m * batch]].reshape(m, batch).mean(axis=1)
+    s1 = np.cumsum(y[::-1])[::-1]
+    s2 = np.cumsum((y * y)[::-1])[::-1]
+    k = np.arange(m, 0, -1, dtype=np.float64)
+    mser = (s2 - s1 * s1 / k) / (k * k)
+    candidates = m // 2 + 1
+    d = int(np.argmin(mser[:candidates]))
+    if d == 0:
+        return 0
+    steady = y[d:]
+    stderr = steady.std(ddof=1) * sqrt(1 / d + 1 / steady.size)
+    z = statistics.NormalDist().inv_cdf(1 - MSER_ALPHA / (2 * (candidates - 1)))
+    if abs(y[:d].mean() - steady.mean()) <= z * stderr:
+        return 0
+    return int(idx[d * batch])
+
+
+def write_rolling_stats(cols, base, window=ROLLING_WINDOW, rolling=True, steady=True):
+    """
+    Gera rolling_<base>.csv (estatísticas móveis por tamanho, de todas as
+    execuções juntas e de cada execução) e steady_state_<base>.csv
+    (transiente MSER e deriva por tamanho e por instância), conforme rolling
+    e steady. Retorna {tamanho: iterações de transiente} do agregado ({} sem
+    steady).
+    """
+    arrays = raw_arrays(cols)
+    if arrays is None:
+        return {}
+    sizes, iters, rtts, instances = arrays
+
+    transient = {}
+    rolling_path = f"rolling_{base}.csv"
+    steady_path = f"steady_state_{base}.csv"
+    frol = open(rolling_path, "w", newline="") if rolling else None
+    fss = open(steady_path, "w", newline="") if steady else None
+    if rolling:
+        rol = csv.writer(frol)
+        rol.writerow(["tamanho_bytes", "instancia", "iteracao_fim", "janela", "n_validos",
+                      "media_ms", "p50_ms", "p99_ms", "taxa_perda_%"])
+    if steady:
+        ss = csv.writer(fss)
+        ss.writerow(["tamanho_bytes", "instancia", "transiente_iteracoes",
+                     "media_inicio_ms", "media_fim_ms", "deriva_ms", "perda_max_janela_%"])
+
+    for size in np.unique(sizes):
+        sel = sizes == size
+        values, lost, present = iteration_matrix(iters[sel], rtts[sel], instances[sel])
+        roll = rolling_window_stats(values, lost, present, window)
+        win = int(roll["fim"][0])
+        if rolling:
+            series = [("todas", roll)] + [
+                (inst + 1, rolling_window_stats(values[inst:inst + 1], lost[inst:inst + 1],
+                                                present[inst:inst + 1], win))
+                for inst in range(values.shape[0])]
+            for label, r in series:
+                for row in zip(r["fim"], r["n"], r["media"], r["p50"], r["p99"], r["perda"]):
+                    rol.writerow([int(size), label, int(row[0]), win, int(row[1]),
+                                  *(f"{x:.5f}" for x in row[2:5]), f"{row[5]:.2f}"])
+        if not steady:
+            continue
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            pooled = np.nanmean(values, axis=0)
+            inst_mean = _rolling_sum(np.nan_to_num(values), win) / \
+                _rolling_sum(~np.isnan(values), win)
+        inst_loss = _rolling_sum(lost, win) * 100.0 / \
+            np.maximum(_rolling_sum(present, win), 1)
+
+        transient[int(size)] = mser_truncation(pooled)
+        ss.writerow([int(size), "todas", transient[int(size)],
+                     f"{roll['media'][0]:.5f}", f"{roll['media'][-1]:.5f}",
+                     f"{roll['media'][-1] - roll['media'][0]:.5f}",
+                     f"{roll['perda'].max():.2f}"])
+        for inst in range(values.shape[0]):
+            first, last = inst_mean[inst, 0], inst_mean[inst, -1]
+            ss.writerow([int(size), inst + 1, mser_truncation(values[inst]),
+                         f"{first:.5f}", f"{last:.5f}", f"{last - first:.5f}",
+                         f"{inst_loss[inst].max():.2f}"])
+    for f in (frol, fss):
+        if f is not None:
+            f.close()
+
+    long_transients = {s: n for s, n in transient.items() if n > 0}
+    if long_transients:
+        detail = ", ".join(f"{s} B: {n}" for s, n in sorted(long_transients.items()))
+        print(f"[WARN] {base}: transiente após o WARMUP={WARMUP_PER_SIZE} "
+              f"(iterações por tamanho) - {detail}")
+    written = [p for p, on in ((rolling_path, rolling), (steady_path, steady)) if on]
+    print(f"[SUCCESS] Estatísticas móveis salvas em {' e '.join(written)}")
+    return transient
+
+
+def ramp_level_rate(nivel):
+    """Taxa (req/s) de um nível da rampa, como em build_ramp_intervals()."""
+    i = nivel - 1 if nivel <= RAMP_NIVEIS else 2 * RAMP_NIVEIS - 1 - nivel
+    return RAMP_TAXA_MIN + (RAMP_TAXA_MAX - RAMP_TAXA_MIN) * i // (RAMP_NIVEIS - 1)
+
+
+def _hinge_fit(n, sy, syy, levels):
+    """
+    Ajuste de mínimos quadrados de y = a + b * max(0, x - k) para cada joelho
+    candidato k em levels[:-1], a partir das somas por nível (n, Σy, Σy²),
+    com forma (..., L). Retorna (sse, a, b) com forma (..., K).
+    """
+    h = np.maximum(0, levels[None, :] - levels[:-1, None]).astype(np.float64)
+    S = n.sum(-1)[..., None]
+    Sh = (n[..., None, :] * h).sum(-1)
+    Shh = (n[..., None, :] * h * h).sum(-1)
+    Sy = sy.sum(-1)[..., None]
+    Shy = (sy[..., None, :] * h).sum(-1)
+    Syy = syy.sum(-1)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = (S * Shy - Sh * Sy) / (S * Shh - Sh * Sh)
+        a = (Sy - b * Sh) / S
+        sse = Syy - a * Sy - b * Shy
+    return np.where(np.isfinite(sse), sse, np.inf), a, b
+
+
+def _best_knee(n, sy, syy, levels):
+    """Joelho de menor SSE e o aumento relativo do RTT previsto no último nível."""
+    sse, a, b = _hinge_fit(n, sy, syy, levels)
+    best = np.argmin(sse, axis=-1)[..., None]
+    a = np.take_along_axis(a, best, -1)[..., 0]
+    b = np.take_along_axis(b, best, -1)[..., 0]
+    knee = levels[best[..., 0]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        increase = b * (levels[-1] - knee) / a
+    return knee, a, b, increase
+
+
+def detect_saturation(data, total_per_key, size, rng):
+    """
+    Detecta o nível em que o RTT de um tamanho deixa a linha de base na
+    subida da rampa: ajuste linear por partes (plano até o joelho, reta
+    depois) e reamostragem bootstrap dentro de cada nível para a confiança.
+    A perda é testada à parte: primeiro nível cuja taxa de perda supera a de
+    todos os níveis anteriores (teste z unilateral de duas proporções, 98%).
+    """
+    levels = np.array([lvl for lvl in range(1, RAMP_NIVEIS + 1)
+                       if len(data.get((size, lvl), ()))])
+    if levels.size < 3:
+        return None
+    samples = [np.asarray(data[(size, lvl)], dtype=np.float64) for lvl in levels]
+    n = np.array([len(x) for x in samples], dtype=np.float64)
+    sy = np.array([x.sum() for x in samples])
+    syy = np.array([(x * x).sum() for x in samples])
+    knee, a, b, increase = _best_knee(n, sy, syy, levels)
+
+    # Reamostragem dentro de cada nível (n fixo), todas as réplicas de uma vez
+    boot_sy = np.empty((SATURATION_BOOTSTRAP, levels.size))
+    boot_syy = np.empty_like(boot_sy)
+    for j, x in enumerate(samples):
+        pick = x[rng.integers(0, x.size, size=(SATURATION_BOOTSTRAP, x.size))]
+        boot_sy[:, j] = pick.sum(1)
+        boot_syy[:, j] = (pick * pick).sum(1)
+    bknee, _, bb, binc = _best_knee(np.broadcast_to(n, boot_sy.shape), boot_sy, boot_syy, levels)
+    boot_sat = (bb > 0) & (binc >= SATURATION_MIN_INCREASE)
+    prob = boot_sat.mean()
+    saturated = bool(b > 0 and increase >= SATURATION_MIN_INCREASE and prob >= SATURATION_MIN_PROB)
+    sat_levels = bknee[boot_sat] + 1
+    agree = np.mean(boot_sat & (np.abs(bknee - knee) <= 1))
+
+    totals = np.array([total_per_key.get((size, lvl), 0) for lvl in range(1, RAMP_NIVEIS + 1)],
+                      dtype=np.float64)
+    valid = np.array([len(data.get((size, lvl), ())) for lvl in range(1, RAMP_NIVEIS + 1)],
+                     dtype=np.float64)
+    lost = totals - valid
+    loss_level = None
+    prev_lost, prev_total = np.cumsum(lost)[:-1], np.cumsum(totals)[:-1]
+    cur_lost, cur_total = lost[1:], totals[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pooled = (prev_lost + cur_lost) / (prev_total + cur_total)
+        z = (cur_lost / cur_total - prev_lost / prev_total) / \
+            np.sqrt(pooled * (1 - pooled) * (1 / cur_total + 1 / prev_total))
+    hits = np.flatnonzero(np.nan_to_num(z, nan=0.0, posinf=0.0) > Z_98)
+    if hits.size:
+        loss_level = int(hits[0]) + 2
+
+    sat_level = int(knee) + 1 if saturated else None
+    return {
+        "nivel_joelho": int(knee),
+        "nivel_saturacao": sat_level,
+        "taxa_saturacao": ramp_level_rate(sat_level) if sat_level else None,
+        "rtt_base": float(a),
+        "inclinacao": float(b),
+        "aumento": float(increase) * 100,
+        "ic_nivel": np.percentile(sat_levels, [2.5, 97.5]) if saturated else None,
+        "prob_saturacao": float(prob),
+        "confianca_nivel": float(agree),
+        "nivel_perda": loss_level,
+        "taxa_perda_nivel": ramp_level_rate(loss_level) if loss_level else None,
+    }
+
+
+def write_saturation(data, total_per_key, out_path):
+    """saturation_<base>.csv: ponto de saturação de cada tamanho da rampa."""
+    rng = np.random.default_rng(SATURATION_SEED)
+    sizes = sorted({size for size, _ in total_per_key})
+    n_saturated = 0
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow([
+            "tamanho_bytes", "saturado", "nivel_saturacao", "taxa_saturacao_req_s",
+            "nivel_ic_inferior", "nivel_ic_superior", "prob_saturacao",
+            "confianca_nivel", "nivel_joelho", "rtt_base_ms",
+            "inclinacao_ms_por_nivel", "aumento_rtt_%", "nivel_perda", "taxa_perda_req_s"
+        ])
+        for size in sizes:
+            sat = detect_saturation(data, total_per_key, size, rng)
+            if sat is None:
+                continue
+            n_saturated += sat["nivel_saturacao"] is not None
+            writer.writerow([
+                size, "sim" if sat["nivel_saturacao"] else "nao",
+                sat["nivel_saturacao"] or "", sat["taxa_saturacao"] or "",
+                *((f"{x:.1f}" for x in sat["ic_nivel"]) if sat["ic_nivel"] is not None
+                  else ("", "")),
+                f"{sat['prob_saturacao']:.3f}", f"{sat['confianca_nivel']:.3f}",
+                sat["nivel_joelho"], f"{sat['rtt_base']:.5f}",
+                f"{sat['inclinacao']:.5f}", f"{sat['aumento']:.2f}",
+                sat["nivel_perda"] or "", sat["taxa_perda_nivel"] or "",
+            ])
+    print(f"[SUCCESS] Saturação ({n_saturated}/{len(sizes)} tamanhos saturados) "
+          f"salva em {out_path}")
+
+
+def _send_order_key(cols):
+    """
+    (tamanho, nivel, iteração) de cada linha e um código inteiro único dessa
+    chave; nivel = 0 no experimento 1. None se faltar alguma coluna.
+    """
+    ramp = "nivel" in cols
+    iter_col = "iteracao_no_nivel" if ramp else "iteracao"
+    if iter_col not in cols:
+        return None
+    sizes = cols["tamanho_bytes"].astype(np.int64)
+    levels = cols["nivel"].astype(np.int64) if ramp else np.zeros_like(sizes)
+    iters = cols[iter_col].astype(np.int64)
+    key = (sizes * (int(levels.max()) + 1) + levels) * (int(iters.max()) + 1) + iters
+    return sizes, levels, iters, key
+
+
+def loss_sequences(cols):
+    """
+    Marcadores de timeout (rtt_ms = -1) de um raw_data_* ou ramp_data_*
+    (load_client_csv) em ordem de envio: (tamanho, nivel, sequencia, perdido),
+    ordenados por chave, instância e iteração. Uma sequência é uma chave
+    (tamanho ou tamanho/nível) dentro de uma execução do cliente; nivel = 0
+    no experimento 1.
+    """
+    ordered = _send_order_key(cols)
+    if ordered is None:
+        return None
+    sizes, levels, iters, key = ordered
+    lost = cols["rtt_ms"] < 0
+    instances = (_execution_ids(cols["instancia"], key) if "instancia" in cols
+                 else _occurrence_rank(key))
+    order = np.lexsort((iters, instances, levels, sizes))
+    sizes, levels, instances, lost = sizes[order], levels[order], instances[order], lost[order]
+    new_seq = np.r_[True, (sizes[1:] != sizes[:-1]) | (levels[1:] != levels[:-1]) |
+                    (instances[1:] != instances[:-1])]
+    return sizes, levels, np.cumsum(new_seq) - 1, lost
+
+
+def gilbert_elliott_fit(a, b, e, p_gb_simple, n_losses):
+    """
+    Ajuste do Gilbert-Elliott com o estado bom sem perdas (perda 'd' no estado
+    ruim) pelo método dos momentos: a = P(perda), b = P(perda | perda anterior)
+    e e = P(perda | perda duas iterações antes). Como após uma perda o estado é
+    sabidamente ruim:
+        b = d(1 - r),  e = d((1 - r)^2 + r p),  a = d p / (p + r)
+    o que dá 1 - r = b(a - e) / (2ab - ae - b^2). Sem perdas suficientes ou
+    com solução fora de (0, 1), cai no modelo de Gilbert simples (d = 1). Se
+    uma perda não aumenta a chance da seguinte (b <= a), as perdas são tratadas
+    como independentes (Bernoulli: p = a, r = 1 - a).
+    Retorna (modelo, p, r, d).
+    """
+    if b <= a:
+        return "bernoulli", a, 1 - a, 1.0
+    denom = 2 * a * b - a * e - b * b
+    if n_losses >= GE_MIN_LOSSES and denom != 0:
+        stay = b * (a - e) / denom
+        if 0 < stay < 1 and b - a * stay > 0:
+            d = b / stay
+            p = a * stay * (1 - stay) / (b - a * stay)
+            if 0 < d <= 1 and 0 < p < 1:
+                return "gilbert-elliott", p, 1 - stay, d
+    return "gilbert", p_gb_simple, 1 - b, 1.0
+
+
+def loss_patterns(sizes, levels, seq, lost):
+    """
+    Rajadas de perda, intervalos entre perdas e modelo de Gilbert-Elliott por
+    chave, em uma passada vetorizada sobre todas as sequências. Rajadas e
+    transições nunca atravessam a fronteira entre sequências; intervalos que
+    tocam o início ou o fim de uma sequência são truncados e ficam de fora.
+    Retorna {(tamanho, nivel): dict}.
+    """
+    key_start = np.r_[True, (sizes[1:] != sizes[:-1]) | (levels[1:] != levels[:-1])]
+    key_id = np.cumsum(key_start) - 1
+    n_keys = int(key_id[-1]) + 1
+
+    def count(mask, ids=key_id):
+        return np.bincount(ids[mask], minlength=n_keys)
+
+    # Codificação por corridas (perdas ou sucessos consecutivos na mesma sequência)
+    starts = np.flatnonzero(np.r_[True, (lost[1:] != lost[:-1]) | (seq[1:] != seq[:-1])])
+    lengths = np.diff(np.r_[starts, lost.size])
+    run_lost, run_key, run_seq = lost[starts], key_id[starts], seq[starts]
+    seq_edge = np.r_[True, run_seq[1:] != run_seq[:-1]] | np.r_[run_seq[1:] != run_seq[:-1], True]
+    gap = ~run_lost & ~seq_edge
+
+    # Transições com atraso 1 e 2 dentro da sequência
+    same1 = seq[1:] == seq[:-1]
+    same2 = seq[2:] == seq[:-2]
+    after_loss = lost[:-1] & same1
+    after_ok = ~lost[:-1] & same1
+    lag2 = lost[:-2] & same2
+    n_after_loss, n_loss_loss = count(after_loss, key_id[:-1]), count(after_loss & lost[1:], key_id[:-1])
+    n_after_ok, n_ok_loss = count(after_ok, key_id[:-1]), count(after_ok & lost[1:], key_id[:-1])
+    n_lag2, n_lag2_loss = count(lag2, key_id[:-2]), count(lag2 & lost[2:], key_id[:-2])
+
+    n_sent = np.bincount(key_id, minlength=n_keys)
+    n_lost = count(lost)
+    key_rows = np.flatnonzero(key_start)
+    result = {}
+    for k in range(n_keys):
+        bursts = lengths[run_lost & (run_key == k)]
+        gaps = lengths[gap & (run_key == k)]
+        a = n_lost[k] / n_sent[k]
+        b = n_loss_loss[k] / n_after_loss[k] if n_after_loss[k] else 0.0
+        e = n_lag2_loss[k] / n_lag2[k] if n_lag2[k] else 0.0
+        p_simple = n_ok_loss[k] / n_after_ok[k] if n_after_ok[k] else 0.0
+        fit = gilbert_elliott_fit(a, b, e, p_simple, n_lost[k]) if n_lost[k] else None
+        row = key_rows[k]
+        result[(int(sizes[row]), int(levels[row]))] = {
+            "enviados": int(n_sent[k]), "perdidos": int(n_lost[k]), "a": a, "b": b,
+            "rajadas": bursts, "intervalos": gaps, "modelo": fit,
+        }
+    return result
+
+
+def write_loss_patterns(cols, out_path, hist_path):
+    """
+    Gera out_path (resumo do padrão de perdas e parâmetros do modelo por
+    chave) e hist_path (histogramas do comprimento das rajadas e dos
+    intervalos entre perdas).
+    """
+    seqs = loss_sequences(cols)
+    if seqs is None:
+        return
+    ramp = bool(seqs[1].any())
+    patterns = loss_patterns(*seqs)
+    key_cols = ["tamanho_bytes", "nivel"] if ramp else ["tamanho_bytes"]
+
+    with open(out_path, "w", newline="") as fout, open(hist_path, "w", newline="") as fhist:
+        writer = csv.writer(fout)
+        writer.writerow(key_cols + [
+            "n_envios", "n_perdas", "taxa_perda_%", "n_rajadas", "rajada_media",
+            "rajada_max", "perdas_isoladas_%", "intervalo_medio", "p_perda_apos_perda",
+            "razao_agrupamento", "modelo", "ge_p_bom_ruim", "ge_r_ruim_bom",
+            "ge_perda_no_ruim", "ge_permanencia_ruim", "ge_perda_modelo_%",
+        ])
+        hist = csv.writer(fhist)
+        hist.writerow(key_cols + ["tipo", "comprimento", "contagem"])
+
+        total_bursts, longest = 0, 0
+        for key in sorted(patterns):
+            pat = patterns[key]
+            key_vals = list(key) if ramp else [key[0]]
+            bursts, gaps = pat["rajadas"], pat["intervalos"]
+            total_bursts += bursts.size
+            longest = max(longest, int(bursts.max()) if bursts.size else 0)
+            row = key_vals + [pat["enviados"], pat["perdidos"], f"{pat['a'] * 100:.3f}",
+                              bursts.size]
+            if bursts.size:
+                row += [f"{bursts.mean():.3f}", int(bursts.max()),
+                        f"{(bursts == 1).mean() * 100:.2f}",
+                        f"{gaps.mean():.2f}" if gaps.size else "",
+                        f"{pat['b']:.4f}", f"{pat['b'] / pat['a']:.2f}"]
+            else:
+                row += ["", 0, "", "", "", ""]
+            if pat["modelo"]:
+                model, p, r, d = pat["modelo"]
+                row += [model, f"{p:.5f}", f"{r:.5f}", f"{d:.4f}",
+                        f"{1 / r:.2f}" if r > 0 else "", f"{d * p / (p + r) * 100:.3f}"]
+            else:
+                row += ["", "", "", "", "", ""]
+            writer.writerow(row)
+
+            for kind, values in (("rajada", bursts), ("intervalo", gaps)):
+                counts = np.bincount(values) if values.size else np.zeros(0, dtype=np.int64)
+                for length in np.flatnonzero(counts):
+                    hist.writerow(key_vals + [kind, int(length), int(counts[length])])
+
+    print(f"[SUCCESS] Padrão de perdas ({total_bursts} rajadas, maior com {longest} "
+          f"envios) salvo em {out_path} e {hist_path}")
+
+
+def send_times(cols):
+    """
+    Linhas de um raw_data_* ou ramp_data_* gravado com --send-ts
+    (load_client_csv): (tamanho, rtt, execução, instante de envio em ms).
+    None se o arquivo não tiver as colunas instancia e t_envio_ns.
+    """
+    if not {"instancia", "t_envio_ns"} <= cols.keys():
+        return None
+    ordered = _send_order_key(cols)
+    if ordered is None:
+        return None
+    sizes, _, _, key = ordered
+    return (sizes, cols["rtt_ms"], _execution_ids(cols["instancia"], key),
+            cols["t_envio_ns"] / 1e6)
+
+
+def contention_timeline(t_ms, sizes, rtts, execs, bin_ms):
+    """
+    Põe todas as execuções do arquivo em um eixo de tempo comum, em janelas
+    de bin_ms. Retorna a janela de cada linha e, por janela, as execuções
+    ativas (do primeiro ao último envio de cada uma), os envios, os bytes
+    oferecidos e as perdas.
+    """
+    bins = ((t_ms - t_ms.min()) // bin_ms).astype(np.int64)
+    n_bins = int(bins.max()) + 1
+    order = np.lexsort((bins, execs))
+    g, b = execs[order], bins[order]
+    first = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    last = np.r_[first[1:], g.size] - 1
+    delta = (np.bincount(b[first], minlength=n_bins + 1)
+             - np.bincount(b[last] + 1, minlength=n_bins + 1))
+    return bins, {
+        "ativas": np.cumsum(delta)[:n_bins],
+        "envios": np.bincount(bins, minlength=n_bins),
+        "bytes": np.bincount(bins, weights=sizes, minlength=n_bins),
+        "perdas": np.bincount(bins, weights=rtts < 0, minlength=n_bins),
+    }
+
+
+def write_contention(cols, out_path, timeline_path, bin_ms=CONTENTION_BIN_MS):
+    """
+    Carga concorrente x RTT/perda de um CSV gravado com --send-ts.
+    timeline_path: uma linha por janela (execuções ativas, carga oferecida
+    por todas elas e RTT mediano); out_path: estatísticas por (tamanho,
+    execuções ativas na janela do envio). Os instantes são CLOCK_MONOTONIC,
+    então só se comparam execuções do mesmo host (um arquivo por cliente).
+    """
+    loaded = send_times(cols)
+    if loaded is None:
+        return
+    sizes, rtts, execs, t_ms = loaded
+    bins, tl = contention_timeline(t_ms, sizes, rtts, execs, bin_ms)
+    bin_s = bin_ms / 1000
+    mbps = tl["bytes"] * 8 / bin_s / 1e6
+    req_s = tl["envios"] / bin_s
+    valid = rtts >= 0
+
+    median = np.full(bins.max() + 1, np.nan)
+    if valid.any():
+        uniq, stats = pooled_group_stats(bins[valid].reshape(-1, 1), rtts[valid])
+        median[uniq[:, 0]] = stats["mediana"]
+    with open(timeline_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["inicio_s", "instancias_ativas", "envios", "req_s", "carga_mbps",
+                         "taxa_perda_%", "rtt_mediana_ms"])
+        for i in np.flatnonzero(tl["ativas"] > 0):
+            sent = tl["envios"][i]
+            writer.writerow([f"{i * bin_s:.3f}", int(tl["ativas"][i]), int(sent),
+                             f"{req_s[i]:.1f}", f"{mbps[i]:.4f}",
+                             f"{tl['perdas'][i] / sent * 100:.2f}" if sent else "",
+                             "" if np.isnan(median[i]) else f"{median[i]:.5f}"])
+
+    # Curvas por tamanho: cada envio conta na classe das execuções ativas na sua janela
+    active = tl["ativas"][bins]
+    code = sizes * (int(active.max()) + 1) + active
+    groups, group = np.unique(code, return_inverse=True)
+    group = group.reshape(-1)
+    n_sent = np.bincount(group)
+    n_lost = np.bincount(group, weights=~valid)
+    load = np.bincount(group, weights=mbps[bins]) / n_sent
+    rate = np.bincount(group, weights=req_s[bins]) / n_sent
+    rtt_cols = {}
+    if valid.any():
+        uniq, stats = pooled_group_stats(code[valid].reshape(-1, 1), rtts[valid])
+        for j, idx in enumerate(np.searchsorted(groups, uniq[:, 0])):
+            rtt_cols[idx] = [stats["n"][j], *(f"{stats[k][j]:.5f}" for k in
+                                              ("media", "mediana", "p95", "p99"))]
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["tamanho_bytes", "instancias_ativas", "n_envios", "carga_media_mbps",
+                         "req_s_medio", "n_validos", "media_ms", "mediana_ms", "p95_ms",
+                         "p99_ms", "taxa_perda_%"])
+        width = int(active.max()) + 1
+        for idx, c in enumerate(groups):
+            writer.writerow([int(c // width), int(c % width), int(n_sent[idx]),
+                             f"{load[idx]:.4f}", f"{rate[idx]:.1f}",
+                             *rtt_cols.get(idx, [0, "", "", "", ""]),
+                             f"{n_lost[idx] / n_sent[idx] * 100:.2f}"])
+
+    print(f"[SUCCESS] Contenção ({int(execs.max()) + 1} execução(ões), até "
+          f"{int(tl['ativas'].max())} simultâneas, pico de {mbps.max():.2f} Mbps em "
+          f"janelas de {bin_ms:g} ms) salva em {out_path} e {timeline_path}")
+
 
 def detect_outliers(rtts):
     if len(rtts) < 4:
@@ -129,41 +1001,340 @@ def compute_percentile(sorted_data, p):
     return sorted_data[f]
 
 
+def _tick_counts(ticks):
+    """
+    Valores distintos (crescentes) e contagens de RTTs em ticks, sem ordenar
+    a amostra. A contagem é feita com bincount denso em faixas a partir do
+    menor valor, de TICK_DENSE_SPAN ticks ou do tamanho da amostra (o que for
+    maior, para que o vetor de contagens não passe muito do tamanho da
+    amostra); os valores além da faixa seguem para a próxima. Quando uma
+    faixa fica esparsa, o restante (a cauda de RTTs altos) é ordenado com
+    np.unique.
+    """
+    values, counts = [], []
+    width = max(TICK_DENSE_SPAN, ticks.size)
+    while True:
+        low = int(ticks.min())
+        beyond = ticks >= low + width
+        num_beyond = int(np.count_nonzero(beyond))
+        if num_beyond and (ticks.size - num_beyond) * TICK_SORT_RATIO < width:
+            tail, tail_counts = np.unique(ticks, return_counts=True)
+            values.append(tail)
+            counts.append(tail_counts)
+            break
+        offsets = ticks - low
+        np.minimum(offsets, width, out=offsets)
+        dense = np.bincount(offsets)[:width]
+        present = np.flatnonzero(dense)
+        values.append(present + low)
+        counts.append(dense[present])
+        if not num_beyond:
+            break
+        ticks = ticks[beyond]
+    return np.concatenate(values), np.concatenate(counts)
+
+
+class TickHistogram:
+    """
+    Distribuição exata de RTTs como contagens por valor distinto, ordenadas.
+
+    Os clientes gravam o RTT com 5 casas (%.5f ms), então cada valor é um
+    número inteiro de ticks de 10 ns: a contagem é feita com bincount sobre a
+    faixa [mínimo, máximo] dos ticks (tempo linear, sem ordenar a amostra) e
+    só os valores presentes são guardados (_tick_counts divide faixas maiores
+    que TICK_DENSE_SPAN). Valores com mais casas decimais caem em np.unique.
+    Histogramas de arquivos ou processos diferentes podem ser somados
+    (merge). Os quantis são os mesmos da amostra ordenada (bit a bit).
+    """
+
+    def __init__(self, values=None, counts=None, ticks=None):
+        self.values = np.empty(0) if values is None else values      # ms, crescentes
+        self.counts = np.empty(0, dtype=np.int64) if counts is None else counts
+        self.ticks = ticks        # valores em ticks (int64) quando quantizados
+        self._cum = None
+
+    @classmethod
+    def _from_ticks(cls, ticks, counts):
+        return cls(ticks / TICKS_PER_MS, counts, ticks)
+
+    @classmethod
+    def from_values(cls, rtts):
+        rtts = np.asarray(rtts, dtype=np.float64)
+        if rtts.size == 0:
+            return cls()
+        ticks = np.rint(rtts * TICKS_PER_MS)
+        if np.array_equal(ticks / TICKS_PER_MS, rtts):
+            return cls._from_ticks(*_tick_counts(ticks.astype(np.int64)))
+        uniq, counts = np.unique(rtts, return_counts=True)
+        return cls(uniq, counts)
+
+    def merge(self, other):
+        """Soma de dois histogramas (ex.: faixas de um arquivo, clientes de uma rede)."""
+        quantized = self.ticks is not None and other.ticks is not None
+        values = (np.concatenate([self.ticks, other.ticks]) if quantized
+                  else np.concatenate([self.values, other.values]))
+        counts = np.concatenate([self.counts, other.counts])
+        uniq, inverse = np.unique(values, return_inverse=True)
+        merged = np.bincount(inverse.reshape(-1), weights=counts,
+                             minlength=uniq.size).astype(np.int64)
+        if quantized:
+            return TickHistogram._from_ticks(uniq, merged)
+        return TickHistogram(uniq, merged)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def _cumulative(self):
+        if self._cum is None:
+            self._cum = np.cumsum(self.counts)
+        return self._cum
+
+    def order_stat(self, k):
+        """k-ésimo menor valor (k a partir de 0)."""
+        return float(self.values[np.searchsorted(self._cumulative(), k, side="right")])
+
+    def percentile(self, p):
+        """Mesma interpolação linear de compute_percentile."""
+        n = self.n
+        if n == 0:
+            return float("nan")
+        k = (n - 1) * p / 100
+        f = int(k)
+        c = k - f
+        low = self.order_stat(f)
+        if f + 1 < n:
+            return low + c * (self.order_stat(f + 1) - low)
+        return low
+
+    def median(self):
+        n = self.n
+        if n % 2:
+            return self.order_stat(n // 2)
+        return (self.order_stat(n // 2 - 1) + self.order_stat(n // 2)) / 2
+
+    def mean_stdev(self):
+        """Média e desvio padrão amostral calculados com somas exatas."""
+        n = self.n
+        counts = self.counts.tolist()
+        if self.ticks is not None:
+            # Somas inteiras em ticks (inteiros do Python, sem estouro)
+            ticks = self.ticks.tolist()
+            s1 = sum(c * t for c, t in zip(counts, ticks))
+            s2 = sum(c * t * t for c, t in zip(counts, ticks))
+            mean = Fraction(s1, n * TICKS_PER_MS)
+            if n < 2:
+                return float(mean), 0.0
+            var = Fraction(n * s2 - s1 * s1, n * (n - 1) * TICKS_PER_MS ** 2)
+            return float(mean), sqrt(var)
+        values = [Fraction(v) for v in self.values.tolist()]
+        mean = sum(c * v for c, v in zip(counts, values)) / n
+        if n < 2:
+            return float(mean), 0.0
+        ss = sum(c * (v - mean) ** 2 for c, v in zip(counts, values))
+        return float(mean), sqrt(ss / (n - 1))
+
+    def without_outliers(self):
+        """
+        Mesmo critério de detect_outliers (cercas de 1,5 IQR com Q1 e Q3 pelas
+        posições n/4 e 3n/4). Retorna (histograma limpo, valores distintos removidos).
+        """
+        n = self.n
+        if n < 4:
+            return self, 0
+        q1, q3 = self.order_stat(n // 4), self.order_stat(3 * n // 4)
+        iqr = q3 - q1
+        keep = (self.values >= q1 - 1.5 * iqr) & (self.values <= q3 + 1.5 * iqr)
+        ticks = self.ticks[keep] if self.ticks is not None else None
+        return TickHistogram(self.values[keep], self.counts[keep], ticks), int((~keep).sum())
+
+    def samples(self):
+        """Amostra ordenada reconstruída a partir das contagens."""
+        return np.repeat(self.values, self.counts)
+
+
+def remove_outliers(rtts):
+    """Amostra sem os outliers (IQR) usada nas estatísticas e o número removido."""
+    hist = rtts if isinstance(rtts, TickHistogram) else TickHistogram.from_values(rtts)
+    clean, num_outliers = hist.without_outliers()
+    # Se todos os valores foram removidos como outliers, usar dados originais
+    if clean.n == 0:
+        return hist.samples(), 0
+    return clean.samples(), num_outliers
+
+
 def compute_stats(rtts, total_attempts=None):
-    n = len(rtts)
+    """
+    Estatísticas de uma chave a partir da lista de RTTs válidos (ou de um
+    TickHistogram já montado). Percentis, mediana, mínimo e máximo vêm da
+    contagem por valor distinto, sem ordenar a amostra.
+    """
+    hist = rtts if isinstance(rtts, TickHistogram) else TickHistogram.from_values(rtts)
+    n = hist.n
     if n == 0:
         return (0, *(float("nan"),) * 10, 100.0, 0)
 
     # Detectar e remover outliers antes dos cálculos
-    num_outliers, outliers = detect_outliers(rtts)
-    rtts_clean = [x for x in rtts if x not in outliers]
-    
+    clean, num_outliers = hist.without_outliers()
+
     # Se todos os valores foram removidos como outliers, usar dados originais
-    if len(rtts_clean) == 0:
-        rtts_clean = rtts
-        num_outliers = 0
-    
-    rtts_sorted = sorted(rtts_clean)
-    n_clean = len(rtts_sorted)
-    
-    media   = statistics.mean(rtts_sorted)
-    mediana = statistics.median(rtts_sorted)
-    dp      = statistics.stdev(rtts_sorted) if n_clean > 1 else 0.0
-    jitter  = (statistics.mean([abs(rtts_sorted[i] - rtts_sorted[i - 1])
-               for i in range(1, n_clean)]) if n_clean > 1 else 0.0)
+    if clean.n == 0:
+        clean, num_outliers = hist, 0
+
+    n_clean = clean.n
+    min_rtt, max_rtt = float(clean.values[0]), float(clean.values[-1])
+    media, dp = clean.mean_stdev()
+    mediana = clean.median()
+    # Média das diferenças entre RTTs consecutivos da amostra ordenada
+    jitter  = (max_rtt - min_rtt) / (n_clean - 1) if n_clean > 1 else 0.0
     ic_half = Z_98 * (dp / sqrt(n_clean)) if n_clean > 1 else 0.0
     ic_low  = media - ic_half
     ic_up   = media + ic_half
-    p95     = compute_percentile(rtts_sorted, 95)
-    p99     = compute_percentile(rtts_sorted, 99)
-    min_rtt, max_rtt = rtts_sorted[0], rtts_sorted[-1]
+    p95     = clean.percentile(95)
+    p99     = clean.percentile(99)
     taxa_perda = ((total_attempts - n) / total_attempts * 100
                   if total_attempts else 0.0)
 
     return (n_clean, media, mediana, dp, jitter, ic_low, ic_up,
             p95, p99, min_rtt, max_rtt, taxa_perda, num_outliers)
 
-def process_raw_files_by_network(network_speed):
+
+def bootstrap_ci(values, reps, seed_key, chunk_elems=1 << 22):
+    """
+    IC bootstrap percentil (BOOTSTRAP_CONFIDENCE%) da média, mediana, P95 e P99.
+
+    As réplicas são geradas em lotes de até chunk_elems sorteios: cada lote vira
+    uma matriz de contagens (réplica x observação) com um único bincount, e os
+    percentis de todas as réplicas saem da soma acumulada das contagens sobre
+    a amostra ordenada, sem ordenar réplica por réplica. A semente depende da
+    chave (seed_key), então o resultado não muda com a ordem nem com --jobs.
+    Retorna (media_inf, media_sup, mediana_inf, ..., p99_sup).
+    """
+    v = np.sort(np.asarray(values, dtype=np.float64))
+    n = v.size
+    if n < 2 or reps <= 0:
+        return (float("nan"),) * len(BOOTSTRAP_COLUMNS)
+
+    rng = np.random.default_rng([BOOTSTRAP_SEED, *seed_key])
+    ranks = [(n - 1) * p / 100 for p in (50, 95, 99)]   # mesma regra de compute_percentile
+    per_chunk = max(1, chunk_elems // n)
+    est = np.empty((reps, 4))
+    for start in range(0, reps, per_chunk):
+        r = min(per_chunk, reps - start)
+        draws = rng.integers(0, n, size=(r, n)) + (np.arange(r) * n)[:, None]
+        counts = np.bincount(draws.ravel(), minlength=r * n).reshape(r, n)
+        est[start:start + r, 0] = counts @ v / n
+        cum = np.cumsum(counts, axis=1)
+        for j, k in enumerate(ranks, 1):
+            f = int(k)
+            # k-ésima estatística de ordem = v[número de posições com cum <= k]
+            low = v[(cum <= f).sum(axis=1)]
+            high = v[np.minimum((cum <= f + 1).sum(axis=1), n - 1)]
+            est[start:start + r, j] = low + (k - f) * (high - low)
+
+    tail = (100 - BOOTSTRAP_CONFIDENCE) / 2
+    bounds = np.percentile(est, [tail, 100 - tail], axis=0)
+    return tuple(float(x) for x in bounds.T.ravel())
+
+
+def bootstrap_table(data, reps, jobs=1):
+    """
+    bootstrap_ci de cada chave de data sobre a mesma amostra sem outliers usada
+    por compute_stats; com jobs > 1 as chaves são distribuídas entre processos.
+    """
+    keys = sorted(data)
+    samples = [remove_outliers(data[key])[0] for key in keys]
+    seed_keys = [key if isinstance(key, tuple) else (key,) for key in keys]
+    if jobs > 1 and len(keys) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(bootstrap_ci, samples, [reps] * len(keys), seed_keys))
+    else:
+        results = [bootstrap_ci(x, reps, k) for x, k in zip(samples, seed_keys)]
+    return dict(zip(keys, results))
+
+
+def _bootstrap_cells(ci):
+    return [f"{x:.5f}" if x == x else "" for x in ci]
+
+
+def _instance_count(total_per_key, per_instance):
+    """
+    Número de execuções do cliente gravadas no arquivo: maior razão entre as
+    linhas de uma chave e as linhas que cada execução grava para ela
+    (per_instance(chave)).
+    """
+    counts = [-(-total // per_instance(key)) for key, total in total_per_key.items()
+              if per_instance(key) > 0]
+    return max(counts) if counts else None
+
+
+def load_calibration(path, instances=1):
+    """
+    Lê o perfil do calibrate.py e devolve (tamanhos, P50 do RTT em loopback)
+    para a quantidade de instâncias simultâneas mais próxima de 'instances'.
+    """
+    with open(path, newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("p50_ms")]
+    if not rows:
+        raise ValueError(f"{path}: perfil de calibração vazio ou sem a coluna p50_ms")
+    counts = sorted({int(r["instancias"]) for r in rows})
+    count = min(counts, key=lambda c: (abs(c - instances), c))
+    if count != instances:
+        print(f"[WARN] {path}: sem calibração para {instances} instância(s); "
+              f"usando a de {count}")
+    table = sorted((int(r["tamanho_bytes"]), float(r["p50_ms"]))
+                   for r in rows if int(r["instancias"]) == count)
+    sizes, overhead = np.array(table).T
+    return sizes, overhead
+
+
+def write_calibrated(stats_path, key_fields, calibration, out_path):
+    """
+    Acrescenta às estatísticas de stats_path as versões sem o overhead da
+    ferramenta: subtrai a mediana do RTT em loopback do tamanho (interpolada
+    entre os tamanhos calibrados). É um deslocamento, não uma deconvolução:
+    o percentil de uma soma não é a soma dos percentis, então as caudas
+    corrigidas ainda carregam a variação da própria ferramenta.
+    """
+    sizes, overhead = calibration
+    stats = ("media_ms", "mediana_ms", "p95_ms", "p99_ms")
+    outside = set()
+    with open(stats_path, newline="") as fin, open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow([*key_fields, "overhead_ms",
+                         *(c for s in stats for c in (s, s.replace("_ms", "_sem_overhead_ms")))])
+        for row in csv.DictReader(fin):
+            size = int(row["tamanho_bytes"])
+            if not sizes[0] <= size <= sizes[-1]:
+                outside.add(size)
+            shift = float(np.interp(size, sizes, overhead))
+            cells = []
+            for col in stats:
+                value = float(row[col])
+                cells += [f"{value:.5f}", f"{max(value - shift, 0.0):.5f}"]
+            writer.writerow([*(row[k] for k in key_fields), f"{shift:.5f}", *cells])
+    if outside:
+        print(f"[WARN] {stats_path}: tamanhos fora da faixa calibrada (usado o extremo "
+              f"mais próximo): {sorted(outside)}")
+    print(f"[SUCCESS] Estatísticas corrigidas pela calibração salvas em {out_path}")
+
+
+def check_sizes(path, found, sizes):
+    """Avisa quando os tamanhos medidos não batem com a grade da especificação."""
+    missing = sorted(set(sizes) - set(found))
+    extra = sorted(set(found) - set(sizes))
+    if missing:
+        print(f"[WARN] {path}: tamanhos da especificação sem medições: {missing}")
+    if extra:
+        print(f"[WARN] {path}: tamanhos fora da especificação (use --spec com a grade "
+              f"usada pelos clientes): {extra}")
+
+
+def process_raw_files_by_network(network_speed, window=ROLLING_WINDOW, drop_transient=False,
+                                 db=None, bootstrap=0, jobs=1,
+                                 sizes=experiment_spec.DEFAULT_SIZES,
+                                 contention_bin_ms=CONTENTION_BIN_MS, calibration=None,
+                                 analyses=frozenset()):
     pattern = "raw_data_cliente*.csv"
     raw_files = _filter_by_speed(glob.glob(pattern), network_speed)
 
@@ -178,78 +1349,272 @@ def process_raw_files_by_network(network_speed):
         base     = os.path.basename(raw_path).replace("raw_data_", "").replace(".csv", "")
         out_path = f"stats_{base}.csv"
 
-        data, total_per_size = read_raw_data(raw_path)
+        cols = load_client_csv(raw_path, jobs)
+        if cols is None:
+            continue
+        transient = {}
+        if {"rolling", "steady-state"} & analyses:
+            transient = write_rolling_stats(cols, base, window, "rolling" in analyses,
+                                            "steady-state" in analyses)
+        data, total_per_size = group_rtts(cols, ("tamanho_bytes",),
+                                          transient if drop_transient else None)
         if not data:
             print(f"[WARN] Sem dados válidos em {raw_path}")
             continue
+        check_sizes(raw_path, total_per_size, sizes)
+
+        header = [
+            "tamanho_bytes", "n_validos", "media_ms", "mediana_ms",
+            "dp_ms", "jitter_ms", "ic_lower_ms", "ic_upper_ms",
+            "p95_ms", "p99_ms", "min_ms", "max_ms",
+            "taxa_perda_%", "num_outliers", "rtt_ms"
+        ]
+        boot = {}
+        if bootstrap > 0:
+            header += BOOTSTRAP_COLUMNS
+            boot = bootstrap_table(data, bootstrap, jobs)
+        rows = []
+        for size in sorted(data.keys()):
+            rtts = data[size]
+            default_total = EXPECTED_MEASURES - (transient.get(size, 0) if drop_transient else 0)
+            total = total_per_size.get(size, default_total)
+            stats = compute_stats(rtts, total)
+            rows.append([
+                size, stats[0],
+                *(f"{x:.5f}" for x in stats[1:10]),
+                f"{stats[10]:.5f}", f"{stats[11]:.2f}", stats[12],
+                f"{stats[1]:.5f}",  # rtt_ms (mesmo valor que media_ms)
+                *_bootstrap_cells(boot.get(size, ()))
+            ])
 
         with open(out_path, "w", newline="") as fout:
             writer = csv.writer(fout)
-            writer.writerow([
-                "tamanho_bytes", "n_validos", "media_ms", "mediana_ms",
-                "dp_ms", "jitter_ms", "ic_lower_ms", "ic_upper_ms",
-                "p95_ms", "p99_ms", "min_ms", "max_ms",
-                "taxa_perda_%", "num_outliers", "rtt_ms"
-            ])
+            writer.writerow(header)
+            writer.writerows(rows)
 
-            for size in sorted(data.keys()):
-                rtts = data[size]
-                total = total_per_size.get(size, EXPECTED_MEASURES)
-                stats = compute_stats(rtts, total)
-                writer.writerow([
-                    size, stats[0],
-                    *(f"{x:.5f}" for x in stats[1:10]),
-                    f"{stats[10]:.5f}", f"{stats[11]:.2f}", stats[12],
-                    f"{stats[1]:.5f}"  # rtt_ms (mesmo valor que media_ms)
-                ])
+        # Tentativas por execução: fixas (EXPECTED_MEASURES) ou definidas pelo modo --adaptive
+        instances = raw_instances_per_size(cols)
+        attempts = {size: total_per_size[size] / n for size, n in instances.items()
+                    if size in total_per_size and not drop_transient}
+        if any(abs(a - EXPECTED_MEASURES) > 0.5 for a in attempts.values()):
+            print(f"[INFO] {raw_path}: tentativas médias por execução (modo adaptativo): "
+                  + ", ".join(f"{size} B: {a:.0f}" for size, a in sorted(attempts.items())))
+        if db is not None:
+            skipped = transient if drop_transient else {}
+            count = max(instances.values()) if instances else _instance_count(
+                total_per_size, lambda size: EXPECTED_MEASURES - skipped.get(size, 0))
+            run_id = db.add_table(out_path, header, rows, raw_path, count)
+            db.add_histograms(run_id, data, total_per_size)
 
         print(f"[SUCCESS] Estatísticas salvas em {out_path}")
+        if calibration is not None:
+            write_calibrated(out_path, ("tamanho_bytes",), calibration, f"calibrated_{base}.csv")
+        if "kernel-overhead" in analyses:
+            write_kernel_overhead(cols, ("tamanho_bytes",), f"overhead_kernel_{base}.csv")
+        if "dwell" in analyses:
+            write_dwell(cols, ("tamanho_bytes",), f"dwell_{base}.csv")
+        if "loss" in analyses:
+            write_loss_patterns(cols, f"loss_{base}.csv", f"loss_hist_{base}.csv")
+        if "contention" in analyses:
+            write_contention(cols, f"contention_{base}.csv", f"load_timeline_{base}.csv",
+                             contention_bin_ms)
     return True
 
-def process_ramp_files_by_network(network_speed):
+def process_ramp_files_by_network(network_speed, db=None, bootstrap=0, jobs=1,
+                                  sizes=experiment_spec.DEFAULT_SIZES,
+                                  contention_bin_ms=CONTENTION_BIN_MS, calibration=None,
+                                  analyses=frozenset()):
+    """
+    Estatísticas e análises de cada ramp_data_cliente*.csv da rede. Retorna
+    as colunas (arquivo, tamanho, nível, RTT) de cada arquivo lido, usadas
+    pela rampa agregada (lista vazia sem arquivos).
+    """
     pattern = "ramp_data_cliente*.csv"
     ramp_files = _filter_by_speed(glob.glob(pattern), network_speed)
 
     if not ramp_files:
         print(f"[INFO] Nenhum arquivo RAMPA para rede {network_speed} Mbps.")
-        return False
+        return []
 
     print(f"\n[INFO] Processando {len(ramp_files)} arquivo(s) RAMPA "
           f"para rede {network_speed} Mbps...")
 
+    tables = []
     for ramp_path in sorted(ramp_files):
         base     = os.path.basename(ramp_path).replace("ramp_data_", "").replace(".csv", "")
         out_path = f"stats_ramp_{base}.csv"
 
-        data, total_per_key = read_ramp_data(ramp_path)
+        cols = load_client_csv(ramp_path, jobs)
+        if cols is None:
+            continue
+        tables.append((ramp_path, cols["tamanho_bytes"], cols["nivel"], cols["rtt_ms"]))
+        data, total_per_key = group_rtts(cols, ("tamanho_bytes", "nivel"))
         if not data:
             print(f"[WARN] Sem dados válidos em {ramp_path}")
             continue
+        check_sizes(ramp_path, {size for size, _ in total_per_key}, sizes)
 
-        with open(out_path, "w", newline="") as fout:
-            writer = csv.writer(fout)
-            writer.writerow([
-                "tamanho_bytes", "nivel", "n_validos", "media_ms", "mediana_ms",
-                "dp_ms", "jitter_ms", "ic_lower_ms", "ic_upper_ms",
-                "p95_ms", "p99_ms", "min_ms", "max_ms",
-                "taxa_perda_%", "num_outliers", "rtt_ms"
+        header = [
+            "tamanho_bytes", "nivel", "n_validos", "media_ms", "mediana_ms",
+            "dp_ms", "jitter_ms", "ic_lower_ms", "ic_upper_ms",
+            "p95_ms", "p99_ms", "min_ms", "max_ms",
+            "taxa_perda_%", "num_outliers", "rtt_ms"
+        ]
+        boot = {}
+        if bootstrap > 0:
+            header += BOOTSTRAP_COLUMNS
+            boot = bootstrap_table(data, bootstrap, jobs)
+        rows = []
+        for (size, nivel) in sorted(data.keys(), key=lambda x: (x[0], x[1])):
+            rtts  = data[(size, nivel)]
+            total = total_per_key.get((size, nivel), EXPECTED_MEASURES_PER_LEVEL)
+            stats = compute_stats(rtts, total)
+            rows.append([
+                size, nivel, stats[0],
+                *(f"{x:.5f}" for x in stats[1:10]),
+                f"{stats[10]:.5f}", f"{stats[11]:.2f}", stats[12],
+                f"{stats[1]:.5f}",  # rtt_ms (mesmo valor que media_ms)
+                *_bootstrap_cells(boot.get((size, nivel), ()))
             ])
 
-            for (size, nivel) in sorted(data.keys(), key=lambda x: (x[0], x[1])):
-                rtts  = data[(size, nivel)]
-                total = total_per_key.get((size, nivel), EXPECTED_MEASURES_PER_LEVEL)
-                stats = compute_stats(rtts, total)
-                writer.writerow([
-                    size, nivel, stats[0],
-                    *(f"{x:.5f}" for x in stats[1:10]),
-                    f"{stats[10]:.5f}", f"{stats[11]:.2f}", stats[12],
-                    f"{stats[1]:.5f}"  # rtt_ms (mesmo valor que media_ms)
-                ])
+        with open(out_path, "w", newline="") as fout:
+            writer = csv.writer(fout)
+            writer.writerow(header)
+            writer.writerows(rows)
+        if db is not None:
+            run_id = db.add_table(out_path, header, rows, ramp_path,
+                                  _instance_count(total_per_key,
+                                                  lambda key: EXPECTED_MEASURES_PER_LEVEL))
+            db.add_histograms(run_id, data, total_per_key)
 
         print(f"[SUCCESS] Estatísticas de rampa salvas em {out_path}")
+        if calibration is not None:
+            write_calibrated(out_path, ("tamanho_bytes", "nivel"), calibration,
+                             f"calibrated_ramp_{base}.csv")
+        if "saturation" in analyses:
+            write_saturation(data, total_per_key, f"saturation_{base}.csv")
+        if "kernel-overhead" in analyses:
+            write_kernel_overhead(cols, ("tamanho_bytes", "nivel"),
+                                  f"overhead_kernel_ramp_{base}.csv")
+        if "dwell" in analyses:
+            write_dwell(cols, ("tamanho_bytes", "nivel"), f"dwell_ramp_{base}.csv")
+        if "loss" in analyses:
+            write_loss_patterns(cols, f"loss_ramp_{base}.csv", f"loss_hist_ramp_{base}.csv")
+        if "contention" in analyses:
+            write_contention(cols, f"contention_ramp_{base}.csv",
+                             f"load_timeline_ramp_{base}.csv", contention_bin_ms)
+    return tables
+
+
+def pooled_group_stats(keys, rtts):
+    """
+    Estatísticas de todas as chaves de uma vez, com as mesmas definições de
+    compute_stats (IQR pelas posições n/4 e 3n/4, percentis interpolados)
+    sobre a amostra combinada. keys: matriz (linhas x colunas da chave);
+    rtts: RTTs válidos. Uma única ordenação por (chave, RTT); o resto são
+    índices e somas por grupo. Retorna (chaves únicas, dict de arrays).
+    """
+    uniq, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    order = np.lexsort((rtts, group))
+    g, v = group[order], rtts[order]
+    n_groups = uniq.shape[0]
+
+    def starts_of(counts):
+        return np.r_[0, np.cumsum(counts)[:-1]]
+
+    # Cercas do IQR por grupo e remoção dos outliers (os grupos seguem contíguos e ordenados)
+    n_all = np.bincount(g, minlength=n_groups)
+    start = starts_of(n_all)
+    q1, q3 = v[start + n_all // 4], v[start + 3 * n_all // 4]
+    iqr = q3 - q1
+    low, up = (q1 - 1.5 * iqr)[g], (q3 + 1.5 * iqr)[g]
+    outside = ((v < low) | (v > up)) & np.repeat(n_all >= 4, n_all)
+    new_value = np.r_[True, (g[1:] != g[:-1]) | (v[1:] != v[:-1])]
+    num_outliers = np.bincount(g[outside & new_value], minlength=n_groups)
+    g, v = g[~outside], v[~outside]
+
+    n = np.bincount(g, minlength=n_groups)
+    start = starts_of(n)
+
+    def percentile(p):
+        k = (n - 1) * p / 100
+        f = k.astype(np.int64)
+        lo = v[start + f]
+        hi = v[start + np.minimum(f + 1, n - 1)]
+        return lo + (k - f) * (hi - lo)
+
+    media = np.bincount(g, weights=v, minlength=n_groups) / n
+    ss = np.bincount(g, weights=(v - media[g]) ** 2, minlength=n_groups)
+    dp = np.sqrt(np.divide(ss, n - 1, out=np.zeros(n_groups), where=n > 1))
+    mid = start + n // 2
+    mediana = np.where(n % 2 == 1, v[mid], (v[np.maximum(mid - 1, start)] + v[mid]) / 2)
+    ic_half = np.where(n > 1, Z_98 * dp / np.sqrt(n), 0.0)
+    low, high = v[start], v[start + n - 1]
+    jitter = np.divide(high - low, n - 1, out=np.zeros(n_groups), where=n > 1)
+    return uniq, {
+        "n": n, "media": media, "mediana": mediana, "dp": dp, "jitter": jitter,
+        "ic_low": media - ic_half, "ic_up": media + ic_half,
+        "p95": percentile(95), "p99": percentile(99),
+        "min": low, "max": high, "num_outliers": num_outliers,
+        "n_total": n_all,
+    }
+
+
+def aggregate_ramp_by_network(network_speed, tables, db=None):
+    """
+    Junta os ramp_data_cliente*.csv da rede (todos os clientes e execuções)
+    e grava stats_ramp_aggregated_clientes_<rede>mbps.csv com as estatísticas
+    da amostra combinada de cada (tamanho, nível): quantis da amostra
+    combinada, e não a média dos quantis de cada cliente. tables: colunas já
+    lidas por process_ramp_files_by_network.
+    """
+    if not tables:
+        return False
+
+    ramp_files = [path for path, *_ in tables]
+    keys = np.column_stack([np.concatenate([t[1] for t in tables]),
+                            np.concatenate([t[2] for t in tables])]).astype(np.int64)
+    rtts = np.concatenate([t[3] for t in tables])
+    valid = rtts >= 0
+    all_keys, totals = np.unique(keys, axis=0, return_counts=True)
+    uniq, st = pooled_group_stats(keys[valid], rtts[valid])
+    row_of = {tuple(k): i for i, k in enumerate(uniq.tolist())}
+
+    out_path = f"stats_ramp_aggregated_clientes_{network_speed}mbps.csv"
+    header = [
+        "tamanho_bytes", "nivel", "n_validos", "media_ms", "mediana_ms",
+        "dp_ms", "jitter_ms", "ic_lower_ms", "ic_upper_ms", "p95_ms", "p99_ms",
+        "min_ms", "max_ms", "taxa_perda_%", "num_outliers", "rtt_ms", "n_arquivos",
+    ]
+    rows = []
+    for (size, nivel), total in zip(all_keys.tolist(), totals.tolist()):
+        i = row_of.get((size, nivel))
+        if i is None:       # só timeouts
+            rows.append([size, nivel, 0, *[""] * 10, "100.00", 0, "", len(tables)])
+            continue
+        taxa_perda = (total - int(st["n_total"][i])) / total * 100
+        rows.append([
+            size, nivel, int(st["n"][i]),
+            *(f"{st[c][i]:.5f}" for c in ("media", "mediana", "dp", "jitter", "ic_low",
+                                          "ic_up", "p95", "p99", "min", "max")),
+            f"{taxa_perda:.2f}", int(st["num_outliers"][i]), f"{st['media'][i]:.5f}",
+            len(tables),
+        ])
+
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(header)
+        writer.writerows(rows)
+    if db is not None:
+        db.add_table(out_path, header, rows, ",".join(ramp_files))
+
+    print(f"[SUCCESS] Rampa agregada ({len(tables)} arquivo(s), {len(rows)} pares "
+          f"tamanho/nível) salva em {out_path}")
     return True
 
-def aggregate_clients_by_network(network_speed):
+
+def aggregate_clients_by_network(network_speed, db=None):
     pattern = "stats_cliente*.csv"
     stats_files = _filter_by_speed(glob.glob(pattern), network_speed)
 
@@ -277,29 +1642,34 @@ def aggregate_clients_by_network(network_speed):
                 agg["taxa_perda"].append(float(row["taxa_perda_%"]))
                 agg["n_total"] += int(row["n_validos"])
 
-    with open(out_path, "w", newline="") as fout:
-        writer = csv.writer(fout)
-        writer.writerow([
-            "tamanho_bytes", "media_agregada_ms", "mediana_agregada_ms",
-            "p95_agregado_ms", "p99_agregado_ms", "jitter_agregado_ms",
-            "taxa_perda_agregada_%", "dp_perda_agregada", "n_total_amostras", "rtt_ms", "dp_agregado_ms"
+    header = [
+        "tamanho_bytes", "media_agregada_ms", "mediana_agregada_ms",
+        "p95_agregado_ms", "p99_agregado_ms", "jitter_agregado_ms",
+        "taxa_perda_agregada_%", "dp_perda_agregada", "n_total_amostras", "rtt_ms", "dp_agregado_ms"
+    ]
+    rows = []
+    for size in sorted(aggregated):
+        agg = aggregated[size]
+        media_mean = statistics.mean(agg["media"])
+        media_std = statistics.stdev(agg["media"]) if len(agg["media"]) > 1 else 0.0
+        perda_std = statistics.stdev(agg["taxa_perda"]) if len(agg["taxa_perda"]) > 1 else 0.0
+        rows.append([
+            size,
+            *(f"{statistics.mean(agg[key]):.5f}" for key in
+              ("media", "mediana", "p95", "p99", "jitter")),
+            f"{statistics.mean(agg['taxa_perda']):.2f}",
+            f"{perda_std:.5f}",
+            agg["n_total"],
+            f"{media_mean:.5f}",
+            f"{media_std:.5f}"
         ])
 
-        for size in sorted(aggregated):
-            agg = aggregated[size]
-            media_mean = statistics.mean(agg["media"])
-            media_std = statistics.stdev(agg["media"]) if len(agg["media"]) > 1 else 0.0
-            perda_std = statistics.stdev(agg["taxa_perda"]) if len(agg["taxa_perda"]) > 1 else 0.0
-            writer.writerow([
-                size,
-                *(f"{statistics.mean(agg[key]):.5f}" for key in
-                  ("media", "mediana", "p95", "p99", "jitter")),
-                f"{statistics.mean(agg['taxa_perda']):.2f}",
-                f"{perda_std:.5f}",
-                agg["n_total"],
-                f"{media_mean:.5f}",
-                f"{media_std:.5f}"
-            ])
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(header)
+        writer.writerows(rows)
+    if db is not None:
+        db.add_table(out_path, header, rows, ",".join(sorted(stats_files)))
 
     print(f"[SUCCESS] Dados agregados salvos em {out_path}")
     return True
@@ -419,16 +1789,151 @@ def generate_summary_report():
     
     print("\n" + "="*60)
 
+def correlate_server_stats(stats_path, network_speed):
+    """
+    Cruza os contadores do servidor (server_stats.py) com as tentativas e os
+    RTTs válidos dos clientes da mesma rede, separando a perda em ida
+    (datagrama não chegou ao servidor) e volta (eco não chegou ao cliente).
+    O aquecimento e o PING do client_udp também passam pelo servidor e são
+    descontados com base no número estimado de instâncias.
+    """
+    from server_stats import read_server_stats
+
+    try:
+        server = read_server_stats(stats_path)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERROR] Não foi possível ler {stats_path}: {e}")
+        return False
+
+    attempts, valid, warmup = {}, {}, {}
+    for pattern, key_fields in (("raw_data_cliente*.csv", ("tamanho_bytes",)),
+                                ("ramp_data_cliente*.csv", ("tamanho_bytes", "nivel"))):
+        raw = len(key_fields) == 1
+        for path in sorted(_filter_by_speed(glob.glob(pattern), network_speed)):
+            cols = load_client_csv(path)
+            data, totals = group_rtts(cols, key_fields)
+            instances_per_size = raw_instances_per_size(cols) if raw else {}
+            for key, total in totals.items():
+                size = key[0] if isinstance(key, tuple) else key
+                attempts[size] = attempts.get(size, 0) + total
+                valid[size] = valid.get(size, 0) + len(data.get(key, []))
+                if raw:
+                    instances = instances_per_size.get(size, round(total / EXPECTED_MEASURES))
+                    extra = instances * WARMUP_PER_SIZE + (instances if size == PING_SIZE else 0)
+                    warmup[size] = warmup.get(size, 0) + extra
+
+    if not attempts:
+        print(f"[WARN] Sem dados de cliente para a rede {network_speed} Mbps")
+        return False
+
+    out_path = f"server_correlation_{network_speed}mbps.csv"
+    with open(out_path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow([
+            "tamanho_bytes", "tentativas_cliente", "validos_cliente",
+            "recebidos_servidor", "extras_estimados", "perda_ida", "perda_volta",
+            "perda_ida_%", "perda_volta_%"
+        ])
+        for size in sorted(attempts):
+            total = attempts[size]
+            received = server["size_count"].get(size, 0) - warmup.get(size, 0)
+            lost_out = max(total - received, 0)
+            lost_back = max(min(received, total) - valid[size], 0)
+            writer.writerow([
+                size, total, valid[size], server["size_count"].get(size, 0),
+                warmup.get(size, 0), lost_out, lost_back,
+                f"{lost_out / total * 100:.2f}", f"{lost_back / total * 100:.2f}"
+            ])
+
+    print(f"[INFO] Servidor ({stats_path}): {server['packets_in']} recebidos, "
+          f"{server['packets_out']} enviados, {server['send_errors']} erros de envio, "
+          f"{server['short_sends']} envios parciais")
+    print(f"[SUCCESS] Correlação servidor/cliente salva em {out_path}")
+    return True
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Processa os CSVs dos clientes UDP e gera as estatísticas")
+    parser.add_argument("--server-stats", action="append", default=[],
+                        metavar="REDE:ARQUIVO",
+                        help="cruza o arquivo --stats-file do server_udp com os "
+                             "clientes da rede (ex.: 10:server_stats_10.bin)")
+    parser.add_argument("--window", type=int, default=ROLLING_WINDOW,
+                        help="janela, em iterações, das estatísticas móveis "
+                             f"(padrão: {ROLLING_WINDOW})")
+    parser.add_argument("--db", metavar="ARQUIVO",
+                        help="grava também as estatísticas desta execução no banco "
+                             "SQLite de resultados (histórico consultado pelo plot.py)")
+    parser.add_argument("--drop-transient", action="store_true",
+                        help="descarta o transiente detectado (MSER) antes das "
+                             "estatísticas resumidas")
+    parser.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                        help=f"acrescenta aos stats_*.csv ICs bootstrap ({BOOTSTRAP_CONFIDENCE}%%) "
+                             "de média, mediana, P95 e P99 com N reamostragens (padrão: desligado)")
+    parser.add_argument("--spec", metavar="ARQUIVO",
+                        help="especificação do experimento (experimento.conf) com a grade de "
+                             "tamanhos usada pelos clientes (padrão: a grade padrão)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="processos usados na leitura de CSVs grandes (faixas do "
+                             "mesmo arquivo em paralelo) e no bootstrap (padrão: 1)")
+    parser.add_argument("--contention-bin-ms", type=float, default=CONTENTION_BIN_MS,
+                        help="janela do eixo de tempo comum na análise de contenção dos "
+                             f"CSVs gravados com --send-ts (padrão: {CONTENTION_BIN_MS} ms)")
+    parser.add_argument("--calibration", metavar="ARQUIVO",
+                        help="perfil do calibrate.py: gera calibrated_*.csv com média, "
+                             "mediana, P95 e P99 sem o overhead da ferramenta")
+    parser.add_argument("--calibration-instances", type=int, default=1, metavar="N",
+                        help="instâncias simultâneas do experimento, para escolher a linha "
+                             "do perfil (padrão: 1)")
+    for name, help_text in ANALYSES.items():
+        parser.add_argument(f"--{name}", action="store_true", help=help_text)
+    args = parser.parse_args()
+    if args.contention_bin_ms <= 0:
+        parser.error("--contention-bin-ms deve ser positivo")
+    return args
+
 def main():
+    args = parse_args()
     print("[ANALYZE] Iniciando processamento…\n")
 
-    if process_raw_files_by_network("10"):
-        aggregate_clients_by_network("10")
-    process_ramp_files_by_network("10")
+    try:
+        sizes = experiment_spec.load_sizes(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+    calibration = None
+    if args.calibration:
+        try:
+            calibration = load_calibration(args.calibration, args.calibration_instances)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(2)
+    db = ResultsDB(args.db, " ".join(sys.argv[1:])) if args.db else None
+    analyses = {name for name in ANALYSES if getattr(args, name.replace("-", "_"))}
+    if args.drop_transient:
+        # O descarte usa o transiente detectado pela análise de regime permanente
+        analyses.add("steady-state")
+
+    for network_speed in ("10", "100"):
+        if process_raw_files_by_network(network_speed, args.window, args.drop_transient, db,
+                                        args.bootstrap, args.jobs, sizes,
+                                        args.contention_bin_ms, calibration, analyses):
+            aggregate_clients_by_network(network_speed, db)
+        ramp_tables = process_ramp_files_by_network(network_speed, db, args.bootstrap,
+                                                    args.jobs, sizes, args.contention_bin_ms,
+                                                    calibration, analyses)
+        aggregate_ramp_by_network(network_speed, ramp_tables, db)
+
+    for spec in args.server_stats:
+        network_speed, _, stats_path = spec.partition(":")
+        if network_speed not in ("10", "100") or not stats_path:
+            print(f"[WARN] --server-stats inválido: {spec} (use 10:ARQ ou 100:ARQ)")
+            continue
+        correlate_server_stats(stats_path, network_speed)
 
-    if process_raw_files_by_network("100"):
-        aggregate_clients_by_network("100")
-    process_ramp_files_by_network("100")
+    if db is not None:
+        db.close()
+        print(f"[SUCCESS] Análise {db.analise_id} registrada em {args.db}")
 
     generate_summary_report()
 
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibração do overhead de medição em loopback.
+
+Em loopback não há enlace: o RTT medido é quase todo da própria ferramenta
+(sendto/recvfrom, clock_gettime, fprintf por amostra, escalonamento das
+instâncias) e da pilha de rede do host. Este script sobe um server_udp em
+127.0.0.1, roda o client_udp com 1, 2, 4, ... instâncias simultâneas para
+cada tamanho da grade e grava a distribuição desse RTT por (instâncias,
+tamanho) em um perfil de calibração, que o analyze.py --calibration usa para
+descontar o overhead das estatísticas do experimento.
+
+Uso:
+    python3 calibrate.py
+    python3 calibrate.py --instances 1,4,16 --spec experimento.conf --output calibracao.csv
+"""
+
+import argparse
+import csv
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import experiment_spec
+from analyze import _load_columns
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Tamanho de amostra limitado pelo modo adaptativo: basta o P99 com ~2% de precisão
+DEFAULT_CLIENT_ARGS = "--adaptive p99 --ci-target 2 --min-samples 400 --max-samples 3000"
+PROFILE_HEADER = ["instancias", "tamanho_bytes", "n_amostras", "perdas", "media_ms", "dp_ms",
+                  "min_ms", "p05_ms", "p50_ms", "p95_ms", "p99_ms"]
+SERVER_START_S = 0.5
+
+
+def parse_counts(text):
+    try:
+        counts = sorted({int(tok) for tok in text.split(",") if tok.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"lista de instâncias inválida: {text}")
+    if not counts or counts[0] < 1:
+        raise argparse.ArgumentTypeError("use contagens >= 1 (ex.: 1,2,4)")
+    return counts
+
+
+def run_instances(args, workdir, count):
+    """Roda 'count' client_udp simultâneos; devolve os CSVs das instâncias bem-sucedidas."""
+    binary = os.path.join(REPO_DIR, "client_udp")
+    spec = ["--spec", os.path.abspath(args.spec)] if args.spec else []
+    procs = []
+    for i in range(count):
+        inst_dir = os.path.join(workdir, f"instancias_{count:03d}", f"cliente_{i:03d}")
+        os.makedirs(inst_dir, exist_ok=True)
+        cmd = [binary, *shlex.split(args.client_args), *spec,
+               "127.0.0.1", "127.0.0.1", str(args.port), "1"]
+        log = open(os.path.join(inst_dir, "saida.log"), "wb")
+        procs.append((inst_dir, log, subprocess.Popen(cmd, cwd=inst_dir, stdout=log,
+                                                      stderr=subprocess.STDOUT,
+                                                      stdin=subprocess.DEVNULL)))
+    paths = []
+    deadline = time.monotonic() + args.timeout_s
+    for inst_dir, log, proc in procs:
+        try:
+            code = proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            code = proc.wait()
+            print(f"[WARN] {inst_dir}: tempo limite de {args.timeout_s} s esgotado")
+        log.close()
+        if code == 0:
+            paths.append(os.path.join(inst_dir, "raw_data_cliente1.csv"))
+        else:
+            print(f"[ERROR] {inst_dir}: client_udp saiu com código {code} (veja saida.log)")
+    return paths
+
+
+def profile_rows(count, paths):
+    """Linhas do perfil (uma por tamanho) a partir dos CSVs de uma contagem de instâncias."""
+    tables = [t for t in (_load_columns(p, ("tamanho_bytes", "rtt_ms"), "na calibração")
+                          for p in paths if os.path.exists(p)) if t is not None]
+    if not tables:
+        return []
+    table = np.concatenate(tables)
+    sizes = table[:, 0].astype(np.int64)
+    rows = []
+    for size in np.unique(sizes):
+        rtts = table[sizes == size, 1]
+        valid = rtts[rtts >= 0]
+        if not valid.size:
+            rows.append([count, int(size), 0, int(rtts.size)] + [""] * 7)
+            continue
+        p05, p50, p95, p99 = np.percentile(valid, (5, 50, 95, 99))
+        rows.append([count, int(size), int(valid.size), int(rtts.size - valid.size),
+                     f"{valid.mean():.5f}",
+                     f"{valid.std(ddof=1) if valid.size > 1 else 0.0:.5f}",
+                     f"{valid.min():.5f}", f"{p05:.5f}", f"{p50:.5f}", f"{p95:.5f}",
+                     f"{p99:.5f}"])
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Mede o overhead da ferramenta em loopback e grava o perfil de calibração")
+    parser.add_argument("--instances", type=parse_counts, default=[1, 2, 4], metavar="N,N,...",
+                        help="quantidades de client_udp simultâneos (padrão: 1,2,4)")
+    parser.add_argument("--spec", metavar="ARQUIVO",
+                        help="especificação com a grade de tamanhos (padrão: a grade padrão)")
+    parser.add_argument("--output", default="calibracao.csv", metavar="ARQUIVO",
+                        help="perfil de calibração (padrão: calibracao.csv)")
+    parser.add_argument("--port", type=int, default=9590,
+                        help="porta do server_udp em 127.0.0.1 (padrão: 9590)")
+    parser.add_argument("--client-args", default=DEFAULT_CLIENT_ARGS,
+                        help=f"opções do client_udp (padrão: \"{DEFAULT_CLIENT_ARGS}\"); "
+                             "use as mesmas do experimento, ex. --low-jitter")
+    parser.add_argument("--server-args", default="",
+                        help="opções extras do server_udp (ex.: \"--workers 2\")")
+    parser.add_argument("--timeout-s", type=float, default=1800,
+                        help="tempo máximo de cada rodada (padrão: 1800 s)")
+    parser.add_argument("--workdir",
+                        help="diretório dos CSVs e logs (padrão: calibracao_<data_hora>)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        sizes = experiment_spec.load_sizes(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 2
+    for binary in ("server_udp", "client_udp"):
+        if not os.path.exists(os.path.join(REPO_DIR, binary)):
+            print(f"[ERROR] {binary} não encontrado (rode 'make')")
+            return 2
+
+    workdir = args.workdir or f"calibracao_{datetime.now():%Y%m%d_%H%M%S}"
+    os.makedirs(workdir, exist_ok=True)
+    print(f"[INFO] Calibração em {platform.node()} ({platform.system()} {platform.release()}, "
+          f"{os.cpu_count()} CPUs): {len(sizes)} tamanhos, instâncias {args.instances}")
+
+    server_log = open(os.path.join(workdir, "servidor.log"), "wb")
+    server = subprocess.Popen([os.path.join(REPO_DIR, "server_udp"), "127.0.0.1",
+                               str(args.port), *shlex.split(args.server_args)],
+                              stdout=server_log, stderr=subprocess.STDOUT,
+                              stdin=subprocess.DEVNULL)
+    rows = []
+    try:
+        time.sleep(SERVER_START_S)
+        if server.poll() is not None:
+            print(f"[ERROR] server_udp saiu com código {server.returncode} "
+                  f"(veja {workdir}/servidor.log)")
+            return 1
+        for count in args.instances:
+            t0 = time.monotonic()
+            print(f"[INFO] {count} instância(s) simultânea(s)...")
+            paths = run_instances(args, workdir, count)
+            new = profile_rows(count, paths)
+            if not new:
+                print(f"[WARN] Nenhuma amostra com {count} instância(s)")
+            rows += new
+            print(f"[INFO] {count} instância(s): {len(paths)} concluída(s) em "
+                  f"{time.monotonic() - t0:.1f} s")
+    except KeyboardInterrupt:
+        print("\n[WARN] Interrompido; gravando o que foi medido")
+    finally:
+        server.terminate()
+        server.wait()
+        server_log.close()
+
+    if not rows:
+        print("[ERROR] Nenhuma medição; perfil não gravado")
+        return 1
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(PROFILE_HEADER)
+        writer.writerows(rows)
+
+    print(f"\n{'Inst.':>5} | {'Tamanho':>8} | {'P50 (ms)':>9} | {'P99 (ms)':>9}")
+    for row in rows:
+        print(f"{row[0]:>5} | {row[1]:>8} | {row[8] or '-':>9} | {row[10] or '-':>9}")
+    print(f"\n[SUCCESS] Perfil de calibração salvo em {args.output} "
+          f"(medições em {workdir})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
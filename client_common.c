@@ -0,0 +1,418 @@
+/*
+ * Código comum ao client_udp e ao client_udp_ramp: grade de tamanhos (--spec),
+ * CSV de amostras, timestamps do kernel (--kernel-ts), tempo no servidor
+ * (--dwell) e modo de baixo jitter (--low-jitter).
+ */
+#define _GNU_SOURCE
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <sched.h>
+#include <time.h>
+#include <stdint.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <sys/socket.h>
+
+#include "client_common.h"
+
+static const int default_sizes[] = {
+    2, 4, 8, 16, 32, 64, 128, 256,
+    512, 1024, 2048, 4096, 8192, 16384, 32768, MAX_UDP_PAYLOAD};
+/*
+ * Grade de tamanhos: a padrão acima ou a da chave 'tamanhos' do arquivo de
+ * especificação (--spec, mesmo formato lido por experiment_spec.py).
+ */
+static int spec_sizes[MAX_SPEC_SIZES];
+const int *sizes = default_sizes;
+int nsizes = sizeof(default_sizes) / sizeof(default_sizes[0]);
+
+static char *trim(char *s)
+{
+    while (*s == ' ' || *s == '\t')
+    {
+        s++;
+    }
+    char *end = s + strlen(s);
+    while (end > s && (end[-1] == ' ' || end[-1] == '\t' || end[-1] == '\r' || end[-1] == '\n'))
+    {
+        *--end = '\0';
+    }
+    return s;
+}
+
+int load_spec(const char *path)
+{
+    FILE *f = fopen(path, "r");
+    if (!f)
+    {
+        fprintf(stderr, "[ERROR] Não foi possível abrir %s: %s\n", path, strerror(errno));
+        return -1;
+    }
+    char line[4096];
+    int found = 0, count = 0, lineno = 0;
+    while (fgets(line, sizeof(line), f))
+    {
+        lineno++;
+        line[strcspn(line, "#")] = '\0';
+        char *eq = strchr(line, '=');
+        if (!eq)
+        {
+            continue;
+        }
+        *eq = '\0';
+        if (strcmp(trim(line), "tamanhos") != 0)
+        {
+            continue;
+        }
+        found = 1;
+        count = 0;
+        char *save = NULL;
+        for (char *tok = strtok_r(eq + 1, ", \t\r\n", &save); tok;
+             tok = strtok_r(NULL, ", \t\r\n", &save))
+        {
+            char *endp;
+            long v = strtol(tok, &endp, 10);
+            if (*endp != '\0' || v < 1 || v > MAX_UDP_PAYLOAD || count == MAX_SPEC_SIZES)
+            {
+                fprintf(stderr, "[ERROR] %s:%d: tamanho inválido '%s' (1..%d, no máximo %d)\n",
+                        path, lineno, tok, MAX_UDP_PAYLOAD, MAX_SPEC_SIZES);
+                fclose(f);
+                return -1;
+            }
+            spec_sizes[count++] = (int)v;
+        }
+    }
+    fclose(f);
+    if (!found)
+    {
+        printf("[INFO] %s sem a chave 'tamanhos': usando a grade padrão\n", path);
+        return 0;
+    }
+    if (count == 0)
+    {
+        fprintf(stderr, "[ERROR] %s: 'tamanhos' vazio\n", path);
+        return -1;
+    }
+    sizes = spec_sizes;
+    nsizes = count;
+    printf("[INFO] %d tamanhos lidos de %s\n", nsizes, path);
+    return 0;
+}
+
+int use_kernel_ts = 0;
+int use_send_ts = 0;
+int use_dwell = 0;
+long instance_id = -1;
+static int dwell_warned = 0;
+/* O CSV aberto tem as colunas nivel e iteracao_no_nivel (client_udp_ramp) */
+static int csv_with_level = 0;
+
+struct low_jitter lj = {.cpu = -1};
+unsigned char io_buffer[MAX_BUFFER];
+static char csv_buffer[1 << 16];
+
+double diff_ms(const struct timespec *start, const struct timespec *end)
+{
+    time_t sec_diff = end->tv_sec - start->tv_sec;
+    long nsec_diff = end->tv_nsec - start->tv_nsec;
+    return (double)sec_diff * 1e3 + (double)nsec_diff / 1e6;
+}
+
+long long timespec_ns(const struct timespec *ts)
+{
+    return (long long)ts->tv_sec * 1000000000LL + ts->tv_nsec;
+}
+
+static uint64_t get_be64(const unsigned char *p)
+{
+    uint64_t v = 0;
+    for (int i = 0; i < 8; i++)
+    {
+        v = (v << 8) | p[i];
+    }
+    return v;
+}
+
+/*
+ * Tempo no servidor (ms) lido do cabeçalho do eco, ou -1 se o eco não o
+ * trouxer. O cliente zera o cabeçalho antes de cada envio, então um servidor
+ * sem --dwell devolve zeros.
+ */
+double parse_dwell(const unsigned char *buffer, ssize_t rec)
+{
+    if (rec < DWELL_HEADER)
+    {
+        return -1.0;
+    }
+    uint64_t rx_ns = get_be64(buffer);
+    uint64_t tx_ns = get_be64(buffer + 8);
+    if (rx_ns == 0 || tx_ns < rx_ns)
+    {
+        if (!dwell_warned)
+        {
+            fprintf(stderr, "[WARN] Eco sem os instantes do servidor (inicie o server_udp com --dwell)\n");
+            dwell_warned = 1;
+        }
+        return -1.0;
+    }
+    return (double)(tx_ns - rx_ns) / 1e6;
+}
+
+static int file_exists(const char *path)
+{
+    struct stat buf;
+    return (stat(path, &buf) == 0);
+}
+
+static void build_header(char *header, size_t len)
+{
+    snprintf(header, len, "%s%s%s%s",
+             csv_with_level ? "tamanho_bytes,nivel,iteracao_no_nivel,rtt_ms"
+                            : "tamanho_bytes,iteracao,rtt_ms",
+             use_kernel_ts ? ",rtt_kernel_ms" : "",
+             use_dwell ? ",dwell_ms" : "",
+             use_send_ts ? ",instancia,t_envio_ns" : "");
+}
+
+FILE *open_csv(const char *filename, int with_level)
+{
+    char header[256];
+    csv_with_level = with_level;
+    build_header(header, sizeof(header));
+
+    int exists = file_exists(filename);
+    if (exists)
+    {
+        /* Várias instâncias anexam ao mesmo CSV: as colunas precisam ser as mesmas */
+        char existing[256] = "";
+        FILE *check = fopen(filename, "r");
+        if (check && fgets(existing, sizeof(existing), check))
+        {
+            existing[strcspn(existing, "\r\n")] = '\0';
+            if (existing[0] != '\0' && strcmp(existing, header) != 0)
+            {
+                fprintf(stderr, "[ERROR] %s tem colunas \"%s\", esperado \"%s\"\n",
+                        filename, existing, header);
+                fclose(check);
+                return NULL;
+            }
+        }
+        if (check)
+        {
+            fclose(check);
+        }
+    }
+
+    FILE *fp = fopen(filename, "a");
+    if (!fp)
+    {
+        perror("fopen");
+        return NULL;
+    }
+    /* Com --send-ts, uma write() com O_APPEND por linha: execuções simultâneas
+     * no mesmo CSV intercalam linhas inteiras, nunca pedaços de linha */
+    int mode = use_send_ts ? _IOLBF : _IOFBF;
+    if (lj.cpu >= 0)
+    {
+        /* Buffer de stdio pré-alocado (e já tocado): fprintf não aloca durante a medição */
+        setvbuf(fp, csv_buffer, mode, sizeof(csv_buffer));
+    }
+    else if (use_send_ts)
+    {
+        setvbuf(fp, NULL, mode, 0);
+    }
+    if (!exists)
+    {
+        fprintf(fp, "%s\n", header);
+    }
+    return fp;
+}
+
+void write_sample(FILE *fp, const struct sample *smp)
+{
+    /* Timeouts mantêm o formato histórico -1.000 */
+    if (csv_with_level)
+    {
+        fprintf(fp, smp->rtt_ms < 0 ? "%d,%d,%d,%.3f" : "%d,%d,%d,%.5f",
+                smp->payload_size, smp->level, smp->iter, smp->rtt_ms);
+    }
+    else
+    {
+        fprintf(fp, smp->rtt_ms < 0 ? "%d,%d,%.3f" : "%d,%d,%.5f",
+                smp->payload_size, smp->iter, smp->rtt_ms);
+    }
+    if (use_kernel_ts)
+    {
+        fprintf(fp, smp->rtt_kernel_ms < 0 ? ",%.3f" : ",%.5f", smp->rtt_kernel_ms);
+    }
+    if (use_dwell)
+    {
+        fprintf(fp, smp->dwell_ms < 0 ? ",%.3f" : ",%.5f", smp->dwell_ms);
+    }
+    if (use_send_ts)
+    {
+        fprintf(fp, ",%ld,%lld", instance_id, smp->t_send_ns);
+    }
+    fputc('\n', fp);
+}
+
+int enable_kernel_timestamps(int sockfd)
+{
+    int on = 1;
+    if (setsockopt(sockfd, SOL_SOCKET, SO_TIMESTAMPNS, &on, sizeof(on)) < 0)
+    {
+        perror("setsockopt SO_TIMESTAMPNS");
+        return -1;
+    }
+    return 0;
+}
+
+/*
+ * recvfrom() que também devolve o instante (CLOCK_REALTIME) em que o kernel
+ * recebeu o datagrama. kernel_ts fica zerado se o timestamp não vier.
+ */
+ssize_t recv_with_timestamp(int sockfd, unsigned char *buffer, size_t len,
+                            struct timespec *kernel_ts)
+{
+    struct iovec iov = {.iov_base = buffer, .iov_len = len};
+    char control[CMSG_SPACE(sizeof(struct timespec))];
+    struct msghdr msg;
+    memset(&msg, 0, sizeof(msg));
+    msg.msg_iov = &iov;
+    msg.msg_iovlen = 1;
+    msg.msg_control = control;
+    msg.msg_controllen = sizeof(control);
+
+    kernel_ts->tv_sec = 0;
+    kernel_ts->tv_nsec = 0;
+    ssize_t rec = recvmsg(sockfd, &msg, 0);
+    if (rec < 0)
+    {
+        return rec;
+    }
+    for (struct cmsghdr *cm = CMSG_FIRSTHDR(&msg); cm; cm = CMSG_NXTHDR(&msg, cm))
+    {
+        if (cm->cmsg_level == SOL_SOCKET && cm->cmsg_type == SCM_TIMESTAMPNS)
+        {
+            memcpy(kernel_ts, CMSG_DATA(cm), sizeof(*kernel_ts));
+        }
+    }
+    return rec;
+}
+
+void low_jitter_setup_process(void)
+{
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    CPU_SET(lj.cpu, &set);
+    if (sched_setaffinity(0, sizeof(set), &set) == 0)
+    {
+        lj.pinned = 1;
+    }
+    else
+    {
+        perror("sched_setaffinity (ignorando erro)");
+    }
+
+    if (mlockall(MCL_CURRENT | MCL_FUTURE) == 0)
+    {
+        lj.mlocked = 1;
+    }
+    else
+    {
+        perror("mlockall (ignorando erro)");
+    }
+
+    /* Toca todas as páginas agora para não haver page fault durante a medição */
+    memset(io_buffer, 'A', sizeof(io_buffer));
+    memset(csv_buffer, 0, sizeof(csv_buffer));
+    lj.prefaulted = 1;
+}
+
+void low_jitter_setup_socket(int sockfd)
+{
+    int flags = fcntl(sockfd, F_GETFL, 0);
+    if (flags >= 0 && fcntl(sockfd, F_SETFL, flags | O_NONBLOCK) == 0)
+    {
+        lj.nonblocking = 1;
+    }
+    else
+    {
+        perror("fcntl O_NONBLOCK (ignorando erro)");
+    }
+
+    /* Aumentar SO_BUSY_POLL acima do padrão do sistema exige CAP_NET_ADMIN */
+    int busy_us = BUSY_POLL_US;
+    if (setsockopt(sockfd, SOL_SOCKET, SO_BUSY_POLL, &busy_us, sizeof(busy_us)) == 0)
+    {
+        lj.busy_poll = 1;
+    }
+    else
+    {
+        perror("setsockopt SO_BUSY_POLL (ignorando erro)");
+    }
+}
+
+/*
+ * Imprime o que ficou ativo no modo --low-jitter e anexa a mesma linha a
+ * <csv>.meta, junto dos dados: uma linha por execução, com a instância e o
+ * início (tempo Unix) para casar com as linhas do CSV.
+ */
+void print_low_jitter_header(const char *csv_name)
+{
+    char settings[160];
+    snprintf(settings, sizeof(settings),
+             "cpu=%d afinidade=%s mlockall=%s prefault=%s "
+             "recv_nao_bloqueante=%s so_busy_poll=%s",
+             lj.cpu, lj.pinned ? "ok" : "falhou", lj.mlocked ? "ok" : "falhou",
+             lj.prefaulted ? "ok" : "falhou", lj.nonblocking ? "ok" : "falhou",
+             lj.busy_poll ? "ok" : "falhou");
+    printf("[LOW-JITTER] %s\n", settings);
+
+    char meta_name[80];
+    snprintf(meta_name, sizeof(meta_name), "%s.meta", csv_name);
+    FILE *meta = fopen(meta_name, "a");
+    if (!meta)
+    {
+        perror("fopen .meta (ignorando erro)");
+        return;
+    }
+    fprintf(meta, "[LOW-JITTER] instancia=%ld inicio=%ld %s\n", instance_id,
+            (long)time(NULL), settings);
+    fclose(meta);
+}
+
+/*
+ * Recebe o eco. No modo --low-jitter o socket é não bloqueante e a espera é
+ * feita girando na CPU até timeout_s (o mesmo SO_RCVTIMEO do socket), em vez
+ * de dormir no recvfrom.
+ */
+ssize_t recv_reply(int sockfd, unsigned char *buffer, size_t len,
+                   struct timespec *kernel_ts, int timeout_s)
+{
+    if (!lj.nonblocking)
+    {
+        return recv_with_timestamp(sockfd, buffer, len, kernel_ts);
+    }
+
+    struct timespec start, now;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (;;)
+    {
+        ssize_t rec = recv_with_timestamp(sockfd, buffer, len, kernel_ts);
+        if (rec >= 0 || (errno != EAGAIN && errno != EWOULDBLOCK))
+        {
+            return rec;
+        }
+        clock_gettime(CLOCK_MONOTONIC, &now);
+        if (diff_ms(&start, &now) >= timeout_s * 1000.0)
+        {
+            errno = EAGAIN;
+            return -1;
+        }
+    }
+}
@@ -0,0 +1,78 @@
+/*
+ * Código comum ao client_udp e ao client_udp_ramp (client_common.c).
+ */
+#ifndef CLIENT_COMMON_H
+#define CLIENT_COMMON_H
+
+#include <stdio.h>
+#include <time.h>
+#include <sys/types.h>
+
+#define MAX_BUFFER 65536
+#define MAX_UDP_PAYLOAD 65507
+#define MAX_SPEC_SIZES 256
+#define DWELL_HEADER 16 /* instantes de chegada e envio gravados pelo server_udp --dwell */
+#define BUSY_POLL_US 50
+
+/*
+ * Grade de tamanhos: a padrão ou a da chave 'tamanhos' do arquivo de
+ * especificação (--spec, mesmo formato lido por experiment_spec.py).
+ */
+extern const int *sizes;
+extern int nsizes;
+
+/* --kernel-ts: RTT também pelo instante em que o kernel recebeu o eco */
+extern int use_kernel_ts;
+/* --send-ts: instante de envio (CLOCK_MONOTONIC, comum a todos os processos do
+ * host) e identificador da execução em cada linha, para alinhar instâncias */
+extern int use_send_ts;
+/* --dwell: o eco traz o tempo que o datagrama passou no servidor (coluna dwell_ms) */
+extern int use_dwell;
+extern long instance_id;
+
+/* Estado do modo --low-jitter: o que foi pedido e o que o sistema aceitou */
+struct low_jitter
+{
+    int cpu;
+    int pinned;
+    int mlocked;
+    int prefaulted;
+    int nonblocking;
+    int busy_poll;
+};
+
+extern struct low_jitter lj;
+extern unsigned char io_buffer[MAX_BUFFER];
+
+/* Uma linha do CSV; level é o nível da rampa (ignorado sem a coluna nivel) */
+struct sample
+{
+    int payload_size;
+    int level;
+    int iter;
+    double rtt_ms;
+    double rtt_kernel_ms;
+    double dwell_ms;
+    long long t_send_ns;
+};
+
+int load_spec(const char *path);
+
+double diff_ms(const struct timespec *start, const struct timespec *end);
+long long timespec_ns(const struct timespec *ts);
+double parse_dwell(const unsigned char *buffer, ssize_t rec);
+
+FILE *open_csv(const char *filename, int with_level);
+void write_sample(FILE *fp, const struct sample *smp);
+
+int enable_kernel_timestamps(int sockfd);
+ssize_t recv_with_timestamp(int sockfd, unsigned char *buffer, size_t len,
+                            struct timespec *kernel_ts);
+ssize_t recv_reply(int sockfd, unsigned char *buffer, size_t len,
+                   struct timespec *kernel_ts, int timeout_s);
+
+void low_jitter_setup_process(void);
+void low_jitter_setup_socket(int sockfd);
+void print_low_jitter_header(const char *csv_name);
+
+#endif
@@ -1,51 +1,56 @@
+#define _GNU_SOURCE
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <unistd.h>
 #include <errno.h>
+#include <getopt.h>
+#include <math.h>
 #include <time.h>
 #include <arpa/inet.h>
-#include <sys/stat.h>
 #include <sys/socket.h>
 
+#include "client_common.h"
+
 #define NUM_MEASURES 1000
 #define WARMUP 50
-#define MAX_BUFFER 65536
-#define MAX_UDP_PAYLOAD 65507
-
-static const int sizes[] = {
-    2, 4, 8, 16, 32, 64, 128, 256,
-    512, 1024, 2048, 4096, 8192, 16384, 32768, MAX_UDP_PAYLOAD};
-static const int NSIZES = sizeof(sizes) / sizeof(sizes[0]);
-
-static double diff_ms(const struct timespec *start, const struct timespec *end)
+#define RECV_TIMEOUT_S 10
+
+/* Modo --adaptive: grade logarítmica do histograma igual à do results_db.py */
+#define HIST_MIN_MS 1e-3
+#define HIST_BINS_PER_DECADE 1000
+#define HIST_BINS (7 * HIST_BINS_PER_DECADE)
+#define ADAPTIVE_Z 1.959964 /* IC de 95% */
+#define ADAPTIVE_CHECK_EVERY 10
+
+/*
+ * Parada antecipada por tamanho (--adaptive): a medição de um tamanho termina
+ * quando a meia largura do IC de 95% da estatística alvo fica abaixo de
+ * target_pct % da estimativa, respeitando min_samples válidas e max_samples
+ * tentativas. quantile < 0 => média.
+ */
+struct adaptive
 {
-    time_t sec_diff = end->tv_sec - start->tv_sec;
-    long nsec_diff = end->tv_nsec - start->tv_nsec;
-    return (double)sec_diff * 1e3 + (double)nsec_diff / 1e6;
-}
-
-static int file_exists(const char *path)
+    int enabled;
+    const char *name;
+    double quantile;
+    double target_pct;
+    int min_samples;
+    int max_samples;
+};
+
+static struct adaptive adp = {0, "media", -1.0, 1.0, 100, 5000};
+
+/* Estado da estatística alvo durante um tamanho: Welford e histograma log */
+struct running_stats
 {
-    struct stat buf;
-    return (stat(path, &buf) == 0);
-}
+    int n;
+    double mean;
+    double m2;
+    unsigned int hist[HIST_BINS];
+};
 
-static FILE *open_csv(const char *filename)
-{
-    int exists = file_exists(filename);
-    FILE *fp = fopen(filename, "a");
-    if (!fp)
-    {
-        perror("fopen");
-        return NULL;
-    }
-    if (!exists)
-    {
-        fprintf(fp, "tamanho_bytes,iteracao,rtt_ms\n");
-    }
-    return fp;
-}
+static struct running_stats rs;
 
 static int setup_socket(const char *local_ip)
 {
@@ -89,7 +94,7 @@ static int setup_socket(const char *local_ip)
     }
 
     struct timeval tv;
-    tv.tv_sec = 10;
+    tv.tv_sec = RECV_TIMEOUT_S;
     tv.tv_usec = 0;
     if (setsockopt(sockfd, SOL_SOCKET, SO_RCVTIMEO, &tv, sizeof(tv)) < 0)
     {
@@ -109,6 +114,111 @@ static int setup_socket(const char *local_ip)
     return sockfd;
 }
 
+static int hist_bin(double rtt_ms)
+{
+    if (rtt_ms <= HIST_MIN_MS)
+    {
+        return 0;
+    }
+    int bin = (int)(log10(rtt_ms / HIST_MIN_MS) * HIST_BINS_PER_DECADE);
+    return bin < HIST_BINS ? bin : HIST_BINS - 1;
+}
+
+static double hist_edge(int bin)
+{
+    return HIST_MIN_MS * pow(10.0, (double)bin / HIST_BINS_PER_DECADE);
+}
+
+static void running_reset(void)
+{
+    memset(&rs, 0, sizeof(rs));
+}
+
+static void running_add(double rtt_ms)
+{
+    rs.n++;
+    double delta = rtt_ms - rs.mean;
+    rs.mean += delta / rs.n;
+    rs.m2 += delta * (rtt_ms - rs.mean);
+    rs.hist[hist_bin(rtt_ms)]++;
+}
+
+/* Classe do histograma que contém a amostra de posição 'rank' (1..n) */
+static int hist_rank_bin(long rank)
+{
+    long cum = 0;
+    for (int b = 0; b < HIST_BINS; b++)
+    {
+        cum += rs.hist[b];
+        if (cum >= rank)
+        {
+            return b;
+        }
+    }
+    return HIST_BINS - 1;
+}
+
+/*
+ * Estimativa e meia largura do IC de 95% da estatística alvo. Para a média,
+ * IC normal; para um quantil, IC sem hipótese de distribuição pelas
+ * estatísticas de ordem n*q -/+ z*sqrt(n*q*(1-q)), lidas nas bordas das
+ * classes do histograma (resolução de 0,23%, então o IC nunca é menor que isso).
+ * Enquanto a amostra não tem as duas estatísticas de ordem (p99 exige ~380
+ * amostras) a meia largura é infinita.
+ */
+static void running_ci(double *estimate, double *half_width)
+{
+    if (adp.quantile < 0)
+    {
+        double sd = rs.n > 1 ? sqrt(rs.m2 / (rs.n - 1)) : 0.0;
+        *estimate = rs.mean;
+        *half_width = ADAPTIVE_Z * sd / sqrt((double)rs.n);
+        return;
+    }
+    double q = adp.quantile, n = rs.n;
+    double spread = ADAPTIVE_Z * sqrt(n * q * (1.0 - q));
+    long lo = (long)floor(n * q - spread), hi = (long)ceil(n * q + spread);
+    long mid = (long)ceil(n * q);
+    int b = hist_rank_bin(mid < 1 ? 1 : mid);
+    *estimate = sqrt(hist_edge(b) * hist_edge(b + 1));
+    if (lo < 1 || hi > rs.n)
+    {
+        *half_width = HUGE_VAL;
+        return;
+    }
+    *half_width = (hist_edge(hist_rank_bin(hi) + 1) - hist_edge(hist_rank_bin(lo))) / 2.0;
+}
+
+static int adaptive_converged(void)
+{
+    if (rs.n < adp.min_samples || rs.n % ADAPTIVE_CHECK_EVERY != 0)
+    {
+        return 0;
+    }
+    double estimate, half_width;
+    running_ci(&estimate, &half_width);
+    return estimate > 0 && half_width <= estimate * adp.target_pct / 100.0;
+}
+
+static int parse_adaptive_stat(const char *arg)
+{
+    static const struct
+    {
+        const char *name;
+        double quantile;
+    } stats[] = {{"media", -1.0}, {"mediana", 0.5}, {"p50", 0.5}, {"p95", 0.95}, {"p99", 0.99}};
+    for (size_t i = 0; i < sizeof(stats) / sizeof(stats[0]); i++)
+    {
+        if (strcmp(arg, stats[i].name) == 0)
+        {
+            adp.name = stats[i].name;
+            adp.quantile = stats[i].quantile;
+            return 0;
+        }
+    }
+    return -1;
+}
+
 static void do_warmup(int sockfd, struct sockaddr_in *servaddr, int payload_size, unsigned char *buffer)
 {
     for (int w = 0; w < WARMUP; w++)
@@ -119,29 +229,49 @@ static void do_warmup(int sockfd, struct sockaddr_in *servaddr, int payload_size
         {
             perror("sendto (warmup)");
         }
-        (void)recvfrom(sockfd, buffer, payload_size, 0, NULL, NULL);
+        struct timespec ignored;
+        (void)recv_reply(sockfd, buffer, payload_size, &ignored, RECV_TIMEOUT_S);
     }
 }
 
 static void measure_for_size(int sockfd, struct sockaddr_in *servaddr, int payload_size, FILE *fp)
 {
-    unsigned char buffer[MAX_BUFFER];
+    unsigned char *buffer = io_buffer;
     memset(buffer, 'A', payload_size);
     do_warmup(sockfd, servaddr, payload_size, buffer);
 
     int success_count = 0;
     int timeout_count = 0;
     int error_count = 0;
+    int attempts = 0;
+    int converged = 0;
+    int max_attempts = adp.enabled ? adp.max_samples : NUM_MEASURES;
+    if (adp.enabled)
+    {
+        running_reset();
+    }
 
-    for (int i = 1; i <= NUM_MEASURES; i++)
+    for (int i = 1; i <= max_attempts && !converged; i++)
     {
-        struct timespec t_start, t_end;
-        double rtt_ms;
+        attempts = i;
+        struct sample smp = {payload_size, 0, i, -1.0, -1.0, -1.0, 0};
+        struct timespec t_start, t_end, t_send_rt, t_kernel;
+        if (use_dwell)
+        {
+            /* O eco anterior sobrescreveu o buffer: zera o cabeçalho do servidor */
+            memset(buffer, 0, payload_size < DWELL_HEADER ? payload_size : DWELL_HEADER);
+        }
         if (clock_gettime(CLOCK_MONOTONIC, &t_start) < 0)
         {
             perror("clock_gettime start");
             continue;
         }
+        smp.t_send_ns = timespec_ns(&t_start);
+        /* O timestamp do kernel vem em CLOCK_REALTIME: o envio precisa do mesmo relógio */
+        if (use_kernel_ts)
+        {
+            clock_gettime(CLOCK_REALTIME, &t_send_rt);
+        }
 
         ssize_t sent = sendto(sockfd, buffer, payload_size, 0,
                               (struct sockaddr *)servaddr, sizeof(*servaddr));
@@ -149,7 +279,7 @@ static void measure_for_size(int sockfd, struct sockaddr_in *servaddr, int paylo
         {
             perror("sendto");
             printf("[ERROR] Falha ao enviar pacote %d (erro: %s)\n", i, strerror(errno));
-            fprintf(fp, "%d,%d,%.3f\n", payload_size, i, -1.0);
+            write_sample(fp, &smp);
             error_count++;
             continue;
         }
@@ -158,7 +288,7 @@ static void measure_for_size(int sockfd, struct sockaddr_in *servaddr, int paylo
             printf("[WARN] Enviado apenas %zd de %d bytes\n", sent, payload_size);
         }
 
-        ssize_t rec = recvfrom(sockfd, buffer, payload_size, 0, NULL, NULL);
+        ssize_t rec = recv_reply(sockfd, buffer, payload_size, &t_kernel, RECV_TIMEOUT_S);
         if (rec < 0)
         {
             if (errno == EWOULDBLOCK || errno == EAGAIN)
@@ -172,32 +302,58 @@ static void measure_for_size(int sockfd, struct sockaddr_in *servaddr, int paylo
                 printf("[ERROR] Erro no recvfrom do pacote %d: %s\n", i, strerror(errno));
                 error_count++;
             }
-            fprintf(fp, "%d,%d,%.3f\n", payload_size, i, -1.0);
+            write_sample(fp, &smp);
             continue;
         }
 
         if (clock_gettime(CLOCK_MONOTONIC, &t_end) < 0)
         {
             perror("clock_gettime end");
-            fprintf(fp, "%d,%d,%.3f\n", payload_size, i, -1.0);
+            write_sample(fp, &smp);
             continue;
         }
         if (rec != payload_size)
         {
             printf("[WARN] Recebido %zd bytes (esperavam %d)\n", rec, payload_size);
         }
-        rtt_ms = diff_ms(&t_start, &t_end);
-        fprintf(fp, "%d,%d,%.5f\n", payload_size, i, rtt_ms);
+        smp.rtt_ms = diff_ms(&t_start, &t_end);
+        if (use_kernel_ts && t_kernel.tv_sec != 0)
+        {
+            smp.rtt_kernel_ms = diff_ms(&t_send_rt, &t_kernel);
+        }
+        if (use_dwell)
+        {
+            smp.dwell_ms = parse_dwell(buffer, rec);
+        }
+        write_sample(fp, &smp);
         success_count++;
+        if (adp.enabled)
+        {
+            running_add(smp.rtt_ms);
+            converged = adaptive_converged();
+        }
     }
 
     printf("[STATS] Para %d bytes: %d sucessos, %d timeouts, %d erros\n",
            payload_size, success_count, timeout_count, error_count);
+    if (adp.enabled)
+    {
+        double estimate = 0.0, half_width = 0.0;
+        if (rs.n > 0)
+        {
+            running_ci(&estimate, &half_width);
+        }
+        printf("[ADAPTIVE] %d bytes: parou em %d tentativas (%d válidas), %s = %.5f ms "
+               "+/- %.5f ms (%.2f%%) - %s\n",
+               payload_size, attempts, rs.n, adp.name, estimate, half_width,
+               estimate > 0 ? half_width * 100.0 / estimate : 0.0,
+               converged ? "convergiu" : "limite de tentativas");
+    }
 }
 
 static void run_tests(int sockfd, struct sockaddr_in *servaddr, FILE *fp)
 {
-    for (int idx = 0; idx < NSIZES; idx++)
+    for (int idx = 0; idx < nsizes; idx++)
     {
         int payload_size = sizes[idx];
         measure_for_size(sockfd, servaddr, payload_size, fp);
@@ -205,24 +361,137 @@ static void run_tests(int sockfd, struct sockaddr_in *servaddr, FILE *fp)
     }
 }
 
+static void print_usage(const char *prog)
+{
+    fprintf(stderr,
+            "Uso: %s [opções] <local_ip> <server_ip> <server_port> <client_id>\n"
+            "  <local_ip>   : IP do cliente (ex.: 10.0.0.11) ou 'auto' para automático\n"
+            "  <server_ip>  : IP do servidor UDP (ex.: 10.0.0.12)\n"
+            "  <server_port>: Porta UDP do servidor (ex.: 50000)\n"
+            "  <client_id>  : ID do cliente (1 ou 2)\n"
+            "Opções:\n"
+            "  --kernel-ts  : registra também o RTT com o timestamp de recepção do kernel\n"
+            "                 (SO_TIMESTAMPNS), coluna rtt_kernel_ms\n"
+            "  --low-jitter CPU: fixa o processo na CPU, trava a memória (mlockall),\n"
+            "                 pré-aloca buffers e recebe por busy-poll não bloqueante\n"
+            "  --spec ARQ   : lê a grade de tamanhos da chave 'tamanhos' de ARQ\n"
+            "                 (ex.: experimento.conf)\n"
+            "  --send-ts    : registra em cada linha a execução e o instante de envio\n"
+            "                 (CLOCK_MONOTONIC, ns), colunas instancia e t_envio_ns\n"
+            "  --instance N : identificador da execução na coluna instancia (padrão: PID)\n"
+            "  --dwell      : lê do eco o tempo no servidor (server_udp --dwell; payloads\n"
+            "                 de pelo menos 16 bytes), coluna dwell_ms\n"
+            "  --adaptive ESTAT: para cada tamanho assim que o IC de 95%% de ESTAT\n"
+            "                 (media, mediana, p95, p99) ficar estreito o bastante\n"
+            "  --ci-target PCT: meia largura do IC aceita, em %% da estimativa (padrão: 1)\n"
+            "  --min-samples N: amostras válidas antes de testar a parada (padrão: 100)\n"
+            "  --max-samples N: tentativas máximas por tamanho no modo adaptativo (padrão: 5000)\n",
+            prog);
+}
+
 int main(int argc, char *argv[])
 {
-    if (argc != 5)
+    static const struct option long_opts[] = {
+        {"kernel-ts", no_argument, NULL, 'k'},
+        {"low-jitter", required_argument, NULL, 'j'},
+        {"spec", required_argument, NULL, 's'},
+        {"send-ts", no_argument, NULL, 'e'},
+        {"dwell", no_argument, NULL, 'd'},
+        {"instance", required_argument, NULL, 'i'},
+        {"adaptive", required_argument, NULL, 'a'},
+        {"ci-target", required_argument, NULL, 't'},
+        {"min-samples", required_argument, NULL, 'n'},
+        {"max-samples", required_argument, NULL, 'x'},
+        {NULL, 0, NULL, 0}};
+
+    int opt;
+    while ((opt = getopt_long(argc, argv, "", long_opts, NULL)) != -1)
     {
-        fprintf(stderr,
-                "Uso: %s <local_ip> <server_ip> <server_port> <client_id>\n"
-                "  <local_ip>   : IP do cliente (ex.: 10.0.0.11) ou 'auto' para automático\n"
-                "  <server_ip>  : IP do servidor UDP (ex.: 10.0.0.12)\n"
-                "  <server_port>: Porta UDP do servidor (ex.: 50000)\n"
-                "  <client_id>  : ID do cliente (1 ou 2)\n",
-                argv[0]);
+        switch (opt)
+        {
+        case 'k':
+            use_kernel_ts = 1;
+            break;
+        case 'j':
+            lj.cpu = atoi(optarg);
+            if (lj.cpu < 0)
+            {
+                fprintf(stderr, "CPU inválida para --low-jitter: %s\n", optarg);
+                return EXIT_FAILURE;
+            }
+            break;
+        case 's':
+            if (load_spec(optarg) < 0)
+            {
+                return EXIT_FAILURE;
+            }
+            break;
+        case 'e':
+            use_send_ts = 1;
+            break;
+        case 'd':
+            use_dwell = 1;
+            break;
+        case 'i':
+            instance_id = atol(optarg);
+            if (instance_id < 0)
+            {
+                fprintf(stderr, "--instance deve ser >= 0: %s\n", optarg);
+                return EXIT_FAILURE;
+            }
+            break;
+        case 'a':
+            if (parse_adaptive_stat(optarg) < 0)
+            {
+                fprintf(stderr, "Estatística inválida para --adaptive: %s "
+                                "(use media, mediana, p95 ou p99)\n", optarg);
+                return EXIT_FAILURE;
+            }
+            adp.enabled = 1;
+            break;
+        case 't':
+            adp.target_pct = atof(optarg);
+            if (adp.target_pct <= 0)
+            {
+                fprintf(stderr, "--ci-target deve ser positivo: %s\n", optarg);
+                return EXIT_FAILURE;
+            }
+            break;
+        case 'n':
+            adp.min_samples = atoi(optarg);
+            break;
+        case 'x':
+            adp.max_samples = atoi(optarg);
+            break;
+        default:
+            print_usage(argv[0]);
+            return EXIT_FAILURE;
+        }
+    }
+
+    if (argc - optind != 4)
+    {
+        print_usage(argv[0]);
         return EXIT_FAILURE;
     }
+    if (instance_id < 0)
+    {
+        instance_id = (long)getpid();
+    }
+    if (adp.min_samples < 2 || adp.max_samples < adp.min_samples)
+    {
+        fprintf(stderr, "Use 2 <= --min-samples <= --max-samples\n");
+        return EXIT_FAILURE;
+    }
+    if (lj.cpu >= 0)
+    {
+        low_jitter_setup_process();
+    }
 
-    const char *local_ip = argv[1];
-    const char *server_ip = argv[2];
-    int server_port = atoi(argv[3]);
-    int client_id = atoi(argv[4]);
+    const char *local_ip = argv[optind];
+    const char *server_ip = argv[optind + 1];
+    int server_port = atoi(argv[optind + 2]);
+    int client_id = atoi(argv[optind + 3]);
     if (!(client_id == 1 || client_id == 2))
     {
         fprintf(stderr, "client_id deve ser 1 ou 2\n");
@@ -237,6 +506,11 @@ int main(int argc, char *argv[])
     {
         return EXIT_FAILURE;
     }
+    if (use_kernel_ts && enable_kernel_timestamps(sockfd) < 0)
+    {
+        close(sockfd);
+        return EXIT_FAILURE;
+    }
 
     struct sockaddr_in servaddr;
     memset(&servaddr, 0, sizeof(servaddr));
@@ -283,13 +557,19 @@ int main(int argc, char *argv[])
 
     char filename[64];
     snprintf(filename, sizeof(filename), "raw_data_cliente%d.csv", client_id);
-    FILE *fp = open_csv(filename);
+    FILE *fp = open_csv(filename, 0);
     if (!fp)
     {
         close(sockfd);
         return EXIT_FAILURE;
     }
 
+    if (lj.cpu >= 0)
+    {
+        low_jitter_setup_socket(sockfd);
+        print_low_jitter_header(filename);
+    }
+
     run_tests(sockfd, &servaddr, fp);
 
     printf("[CLIENT %d] Testes concluídos. Dados em: %s\n", client_id, filename);
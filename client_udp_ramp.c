@@ -1,55 +1,23 @@
+#define _GNU_SOURCE
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <unistd.h>
 #include <errno.h>
+#include <getopt.h>
 #include <time.h>
 #include <arpa/inet.h>
-#include <sys/stat.h>
 #include <sys/socket.h>
 
-#define MAX_BUFFER 65536
-#define MAX_UDP_PAYLOAD 65507
+#include "client_common.h"
+
+#define RECV_TIMEOUT_S 5
 
 #define TAXA_MIN 10
 #define TAXA_MAX 100
 #define NIVEIS 10
 #define NUM_PER_LEVEL 100
 
-static const int sizes[] = {
-    2, 4, 8, 16, 32, 64, 128, 256,
-    512, 1024, 2048, 4096, 8192, 16384, 32768, MAX_UDP_PAYLOAD};
-static const int NSIZES = sizeof(sizes) / sizeof(sizes[0]);
-
-static double diff_ms(const struct timespec *start, const struct timespec *end)
-{
-    time_t sec_diff = end->tv_sec - start->tv_sec;
-    long nsec_diff = end->tv_nsec - start->tv_nsec;
-    return (double)sec_diff * 1e3 + (double)nsec_diff / 1e6;
-}
-
-static int file_exists(const char *path)
-{
-    struct stat buf;
-    return (stat(path, &buf) == 0);
-}
-
-static FILE *open_csv(const char *filename)
-{
-    int exists = file_exists(filename);
-    FILE *fp = fopen(filename, "a");
-    if (!fp)
-    {
-        perror("fopen");
-        return NULL;
-    }
-    if (!exists)
-    {
-        fprintf(fp, "tamanho_bytes,nivel,iteracao_no_nivel,rtt_ms\n");
-    }
-    return fp;
-}
-
 static struct timespec make_timespec_from_us(long micros)
 {
     struct timespec ts;
@@ -123,7 +91,7 @@ static int setup_socket(const char *local_ip)
         }
     }
 
-    struct timeval tv = {.tv_sec = 5, .tv_usec = 0};
+    struct timeval tv = {.tv_sec = RECV_TIMEOUT_S, .tv_usec = 0};
     if (setsockopt(sockfd, SOL_SOCKET, SO_RCVTIMEO, &tv, sizeof(tv)) < 0)
     {
         perror("setsockopt");
@@ -146,7 +114,7 @@ static void ramp_for_size(int sockfd, struct sockaddr_in *servaddr,
                           int payload_size, long *intervals, int n_intervals,
                           FILE *fp)
 {
-    unsigned char buffer[MAX_BUFFER];
+    unsigned char *buffer = io_buffer;
     memset(buffer, 'A', payload_size);
 
     for (int lvl = 0; lvl < n_intervals; lvl++)
@@ -156,36 +124,47 @@ static void ramp_for_size(int sockfd, struct sockaddr_in *servaddr,
 
         for (int iter = 1; iter <= NUM_PER_LEVEL; iter++)
         {
-            struct timespec t_start, t_end;
-            double rtt_ms;
+            struct sample smp = {payload_size, lvl + 1, iter, -1.0, -1.0, -1.0, 0};
+            struct timespec t_start, t_end, t_send_rt, t_kernel;
+            if (use_dwell)
+            {
+                /* O eco anterior sobrescreveu o buffer: zera o cabeçalho do servidor */
+                memset(buffer, 0, payload_size < DWELL_HEADER ? payload_size : DWELL_HEADER);
+            }
 
             if (clock_gettime(CLOCK_MONOTONIC, &t_start) < 0)
             {
                 perror("clock_gettime start");
                 continue;
             }
+            smp.t_send_ns = timespec_ns(&t_start);
+            /* O timestamp do kernel vem em CLOCK_REALTIME: o envio precisa do mesmo relógio */
+            if (use_kernel_ts)
+            {
+                clock_gettime(CLOCK_REALTIME, &t_send_rt);
+            }
 
             ssize_t sent = sendto(sockfd, buffer, payload_size, 0,
                                   (struct sockaddr *)servaddr, sizeof(*servaddr));
             if (sent < 0)
             {
                 perror("sendto");
-                fprintf(fp, "%d,%d,%d,%.3f\n", payload_size, lvl + 1, iter, -1.0);
+                write_sample(fp, &smp);
                 nanosleep(&sleep_ts, NULL);
                 continue;
             }
 
-            ssize_t rec = recvfrom(sockfd, buffer, payload_size, 0, NULL, NULL);
+            ssize_t rec = recv_reply(sockfd, buffer, payload_size, &t_kernel, RECV_TIMEOUT_S);
             if (rec < 0)
             {
                 if (errno == EWOULDBLOCK || errno == EAGAIN)
                 {
-                    fprintf(fp, "%d,%d,%d,%.3f\n", payload_size, lvl + 1, iter, -1.0);
+                    write_sample(fp, &smp);
                 }
                 else
                 {
                     perror("recvfrom");
-                    fprintf(fp, "%d,%d,%d,%.3f\n", payload_size, lvl + 1, iter, -1.0);
+                    write_sample(fp, &smp);
                 }
                 nanosleep(&sleep_ts, NULL);
                 continue;
@@ -194,7 +173,7 @@ static void ramp_for_size(int sockfd, struct sockaddr_in *servaddr,
             if (clock_gettime(CLOCK_MONOTONIC, &t_end) < 0)
             {
                 perror("clock_gettime end");
-                fprintf(fp, "%d,%d,%d,%.3f\n", payload_size, lvl + 1, iter, -1.0);
+                write_sample(fp, &smp);
                 nanosleep(&sleep_ts, NULL);
                 continue;
             }
@@ -206,8 +185,16 @@ static void ramp_for_size(int sockfd, struct sockaddr_in *servaddr,
                         rec, payload_size);
             }
 
-            rtt_ms = diff_ms(&t_start, &t_end);
-            fprintf(fp, "%d,%d,%d,%.5f\n", payload_size, lvl + 1, iter, rtt_ms);
+            smp.rtt_ms = diff_ms(&t_start, &t_end);
+            if (use_kernel_ts && t_kernel.tv_sec != 0)
+            {
+                smp.rtt_kernel_ms = diff_ms(&t_send_rt, &t_kernel);
+            }
+            if (use_dwell)
+            {
+                smp.dwell_ms = parse_dwell(buffer, rec);
+            }
+            write_sample(fp, &smp);
 
             nanosleep(&sleep_ts, NULL);
         }
@@ -224,7 +211,7 @@ static void run_ramp_experiment(int sockfd, struct sockaddr_in *servaddr, FILE *
         return;
     }
 
-    for (int idx = 0; idx < NSIZES; idx++)
+    for (int idx = 0; idx < nsizes; idx++)
     {
         int payload_size = sizes[idx];
         printf("[CLIENT] Iniciando rampa para payload = %d bytes\n", payload_size);
@@ -235,24 +222,100 @@ static void run_ramp_experiment(int sockfd, struct sockaddr_in *servaddr, FILE *
     free(intervals);
 }
 
+static void print_usage(const char *prog)
+{
+    fprintf(stderr,
+            "Uso: %s [opções] <local_ip> <server_ip> <server_port> <client_id>\n"
+            "  <local_ip>   : IP do cliente (ex.: 10.0.0.11) ou 'auto' para automático\n"
+            "  <server_ip>  : IP do servidor (ex.: 10.0.10.12)\n"
+            "  <server_port>: Porta UDP do servidor (ex.: 50000)\n"
+            "  <client_id>  : ID do cliente (1 ou 2)\n"
+            "Opções:\n"
+            "  --kernel-ts  : registra também o RTT com o timestamp de recepção do kernel\n"
+            "                 (SO_TIMESTAMPNS), coluna rtt_kernel_ms\n"
+            "  --low-jitter CPU: fixa o processo na CPU, trava a memória (mlockall),\n"
+            "                 pré-aloca buffers e recebe por busy-poll não bloqueante\n"
+            "  --spec ARQ   : lê a grade de tamanhos da chave 'tamanhos' de ARQ\n"
+            "                 (ex.: experimento.conf)\n"
+            "  --send-ts    : registra em cada linha a execução e o instante de envio\n"
+            "                 (CLOCK_MONOTONIC, ns), colunas instancia e t_envio_ns\n"
+            "  --instance N : identificador da execução na coluna instancia (padrão: PID)\n"
+            "  --dwell      : lê do eco o tempo no servidor (server_udp --dwell; payloads\n"
+            "                 de pelo menos 16 bytes), coluna dwell_ms\n",
+            prog);
+}
+
 int main(int argc, char *argv[])
 {
-    if (argc != 5)
+    static const struct option long_opts[] = {
+        {"kernel-ts", no_argument, NULL, 'k'},
+        {"low-jitter", required_argument, NULL, 'j'},
+        {"spec", required_argument, NULL, 's'},
+        {"send-ts", no_argument, NULL, 'e'},
+        {"dwell", no_argument, NULL, 'd'},
+        {"instance", required_argument, NULL, 'i'},
+        {NULL, 0, NULL, 0}};
+
+    int opt;
+    while ((opt = getopt_long(argc, argv, "", long_opts, NULL)) != -1)
     {
-        fprintf(stderr,
-                "Uso: %s <local_ip> <server_ip> <server_port> <client_id>\n"
-                "  <local_ip>   : IP do cliente (ex.: 10.0.0.11) ou 'auto' para automático\n"
-                "  <server_ip>  : IP do servidor (ex.: 10.0.10.12)\n"
-                "  <server_port>: Porta UDP do servidor (ex.: 50000)\n"
-                "  <client_id>  : ID do cliente (1 ou 2)\n",
-                argv[0]);
+        switch (opt)
+        {
+        case 'k':
+            use_kernel_ts = 1;
+            break;
+        case 'j':
+            lj.cpu = atoi(optarg);
+            if (lj.cpu < 0)
+            {
+                fprintf(stderr, "CPU inválida para --low-jitter: %s\n", optarg);
+                return EXIT_FAILURE;
+            }
+            break;
+        case 's':
+            if (load_spec(optarg) < 0)
+            {
+                return EXIT_FAILURE;
+            }
+            break;
+        case 'e':
+            use_send_ts = 1;
+            break;
+        case 'd':
+            use_dwell = 1;
+            break;
+        case 'i':
+            instance_id = atol(optarg);
+            if (instance_id < 0)
+            {
+                fprintf(stderr, "--instance deve ser >= 0: %s\n", optarg);
+                return EXIT_FAILURE;
+            }
+            break;
+        default:
+            print_usage(argv[0]);
+            return EXIT_FAILURE;
+        }
+    }
+
+    if (argc - optind != 4)
+    {
+        print_usage(argv[0]);
         return EXIT_FAILURE;
     }
+    if (instance_id < 0)
+    {
+        instance_id = (long)getpid();
+    }
+    if (lj.cpu >= 0)
+    {
+        low_jitter_setup_process();
+    }
 
-    const char *local_ip = argv[1];
-    const char *server_ip = argv[2];
-    int server_port = atoi(argv[3]);
-    int client_id = atoi(argv[4]);
+    const char *local_ip = argv[optind];
+    const char *server_ip = argv[optind + 1];
+    int server_port = atoi(argv[optind + 2]);
+    int client_id = atoi(argv[optind + 3]);
     if (!(client_id == 1 || client_id == 2))
     {
         fprintf(stderr, "client_id deve ser 1 ou 2\n");
@@ -265,6 +328,11 @@ int main(int argc, char *argv[])
     int sockfd = setup_socket(local_ip);
     if (sockfd < 0)
         return EXIT_FAILURE;
+    if (use_kernel_ts && enable_kernel_timestamps(sockfd) < 0)
+    {
+        close(sockfd);
+        return EXIT_FAILURE;
+    }
 
     struct sockaddr_in servaddr;
     memset(&servaddr, 0, sizeof(servaddr));
@@ -279,13 +347,19 @@ int main(int argc, char *argv[])
 
     char filename[64];
     snprintf(filename, sizeof(filename), "ramp_data_cliente%d.csv", client_id);
-    FILE *fp = open_csv(filename);
+    FILE *fp = open_csv(filename, 1);
     if (!fp)
     {
         close(sockfd);
         return EXIT_FAILURE;
     }
 
+    if (lj.cpu >= 0)
+    {
+        low_jitter_setup_socket(sockfd);
+        print_low_jitter_header(filename);
+    }
+
     run_ramp_experiment(sockfd, &servaddr, fp);
 
     printf("[CLIENT %d] Experimento de rampa concluído. Dados em: %s\n",
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparação estatística entre duas execuções (base x candidata) para detectar
+regressões de latência, por tamanho de payload e nível da rampa.
+
+Para cada chave: Mann-Whitney U e Kolmogorov-Smirnov (aproximações para
+amostras grandes, com correção de empates), IC bootstrap da diferença de P99
+e correção para comparações múltiplas (Holm ou Benjamini-Hochberg). A saída
+é uma tabela OK/ALERTA/FALHA e o código de saída é 1 se houver FALHA, para
+uso como portão em scripts.
+
+Cada execução é um CSV bruto (raw_data_* ou ramp_data_*) ou os histogramas
+gravados por "analyze.py --db" (BANCO.db:ANALISE:stats_clienteX.csv, com
+ANALISE vazio para a mais recente).
+
+Uso:
+    python3 compare_runs.py raw_data_cliente1_antes.csv raw_data_cliente1.csv
+    python3 compare_runs.py resultados.db:3:stats_cliente1.csv raw_data_cliente1.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+from math import erfc, sqrt
+
+import numpy as np
+
+from results_db import HIST_BINS, connect, hist_bin, hist_center, load_histograms
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_TOLERANCE = 5.0     # % de piora tolerada na mediana e no P99
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_SEED = 20240917
+MIN_SAMPLES = 20
+
+
+class RunSamples:
+    """
+    Amostras de uma execução: {(tamanho, nivel): valores ordenados} quando
+    vêm de um CSV bruto, ou {(tamanho, nivel): contagens por classe} quando vêm
+    do banco; 'lost' guarda os timeouts por chave. nivel = 0 no experimento 1.
+    """
+
+    def __init__(self, label, exact=None, hists=None, lost=None):
+        self.label = label
+        self.exact = exact
+        self.hists = hists
+        self.lost = lost or {}
+
+    def keys(self):
+        return set(self.exact if self.exact is not None else self.hists)
+
+    def histogram(self, key):
+        if self.hists is not None:
+            return self.hists[key]
+        return np.bincount(hist_bin(self.exact[key]), minlength=HIST_BINS)
+
+    def count(self, key):
+        if self.exact is not None:
+            return self.exact[key].size
+        return int(self.hists[key].sum())
+
+
+def load_csv_run(path):
+    """Lê um raw_data_*/ramp_data_* inteiro com numpy e separa as chaves."""
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    names = ["tamanho_bytes", "nivel", "rtt_ms"] if "nivel" in header \
+        else ["tamanho_bytes", "rtt_ms"]
+    try:
+        cols = [header.index(c) for c in names]
+    except ValueError:
+        raise ValueError(f"{path}: colunas esperadas {names}")
+    table = np.loadtxt(path, delimiter=",", skiprows=1, usecols=cols, ndmin=2)
+    sizes = table[:, 0].astype(np.int64)
+    levels = table[:, 1].astype(np.int64) if len(cols) == 3 else np.zeros_like(sizes)
+    rtts = table[:, -1]
+
+    # Uma ordenação só: por chave e, dentro da chave, por RTT
+    order = np.lexsort((rtts, levels, sizes))
+    sizes, levels, rtts = sizes[order], levels[order], rtts[order]
+    bounds = np.flatnonzero((np.diff(sizes) != 0) | (np.diff(levels) != 0)) + 1
+    exact, lost = {}, {}
+    for chunk_s, chunk_l, chunk_r in zip(np.split(sizes, bounds), np.split(levels, bounds),
+                                         np.split(rtts, bounds)):
+        key = (int(chunk_s[0]), int(chunk_l[0]))
+        valid = chunk_r[chunk_r >= 0]
+        exact[key] = valid
+        lost[key] = chunk_r.size - valid.size
+    return RunSamples(path, exact=exact, lost=lost)
+
+
+def load_db_run(spec):
+    """BANCO.db:ANALISE:stats_clienteX.csv => histogramas gravados pelo analyze.py."""
+    db_path, analise, table = spec.rsplit(":", 2)
+    if not os.path.exists(db_path):
+        raise ValueError(f"banco não encontrado: {db_path}")
+    conn = connect(db_path)
+    try:
+        hists = load_histograms(conn, table, int(analise) if analise else None)
+    finally:
+        conn.close()
+    if hists is None:
+        raise ValueError(f"{spec}: nenhum histograma gravado para {table}")
+    return RunSamples(spec, hists={k: h for k, (h, _) in hists.items()},
+                      lost={k: n for k, (_, n) in hists.items()})
+
+
+def load_run(spec):
+    if ".db:" in spec:
+        return load_db_run(spec)
+    return load_csv_run(spec)
+
+
+def _joint_counts(base, cand, key):
+    """Suporte comum e contagens de cada execução (valores exatos ou classes)."""
+    if base.exact is not None and cand.exact is not None:
+        a, b = base.exact[key], cand.exact[key]
+        support = np.unique(np.concatenate([a, b]))
+        ca = np.bincount(np.searchsorted(support, a), minlength=support.size)
+        cb = np.bincount(np.searchsorted(support, b), minlength=support.size)
+        return support, ca, cb
+    ha, hb = base.histogram(key), cand.histogram(key)
+    nz = np.flatnonzero(ha + hb)
+    return hist_center(nz), ha[nz], hb[nz]
+
+
+def mann_whitney(ca, cb):
+    """
+    Teste U de Mann-Whitney sobre contagens por valor distinto (postos médios
+    nos empates, aproximação normal com correção de empates e continuidade).
+    Retorna (P(B > A) + P(B = A)/2, p bilateral).
+    """
+    n, m = float(ca.sum()), float(cb.sum())
+    big_n = n + m
+    t = (ca + cb).astype(np.float64)
+    avg_rank = np.cumsum(t) - (t - 1) / 2
+    u_a = float((ca * avg_rank).sum()) - n * (n + 1) / 2
+    ties = float((t ** 3 - t).sum())
+    var = n * m / 12 * ((big_n + 1) - ties / (big_n * (big_n - 1)))
+    if var <= 0:
+        return 0.5, 1.0
+    delta = u_a - n * m / 2
+    z = (abs(delta) - 0.5) / sqrt(var) if abs(delta) > 0.5 else 0.0
+    return 1 - u_a / (n * m), erfc(z / sqrt(2))
+
+
+def kolmogorov_smirnov(ca, cb):
+    """Estatística D de duas amostras e p assintótico (distribuição de Kolmogorov)."""
+    n, m = float(ca.sum()), float(cb.sum())
+    d = float(np.abs(np.cumsum(ca) / n - np.cumsum(cb) / m).max())
+    en = sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * d
+    if lam < 0.2:
+        return d, 1.0
+    k = np.arange(1, 101)
+    p = 2 * np.sum((-1.0) ** (k - 1) * np.exp(-2 * k * k * lam * lam))
+    return d, float(min(max(p, 0.0), 1.0))
+
+
+def bootstrap_p99_diff(ha, hb, reps, rng, q=99):
+    """
+    IC 95% de P99(B) - P99(A) reamostrando os histogramas (multinomial com as
+    proporções observadas), todas as réplicas de uma vez.
+    """
+    nz = np.flatnonzero(ha + hb)
+    centers = hist_center(nz)
+
+    def replicate(h):
+        n = int(h.sum())
+        draws = rng.multinomial(n, h[nz] / n, size=reps)
+        cum = np.cumsum(draws, axis=1)
+        idx = (cum < np.ceil(n * q / 100)).sum(axis=1)
+        return centers[np.minimum(idx, nz.size - 1)]
+
+    diff = replicate(hb) - replicate(ha)
+    low, high = np.percentile(diff, [2.5, 97.5])
+    return float(low), float(high)
+
+
+def adjust_pvalues(p, method):
+    """Correção para comparações múltiplas: 'holm' (FWER) ou 'bh' (FDR)."""
+    p = np.asarray(p, dtype=np.float64)
+    m = p.size
+    if m == 0:
+        return p
+    order = np.argsort(p)
+    if method == "holm":
+        adj = np.maximum.accumulate((m - np.arange(m)) * p[order])
+    else:
+        adj = np.minimum.accumulate((p[order] * m / np.arange(1, m + 1))[::-1])[::-1]
+    out = np.empty(m)
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+def _quantile(run, key, q):
+    if run.exact is not None:
+        return float(np.percentile(run.exact[key], q))
+    h = run.hists[key]
+    cum = np.cumsum(h)
+    return float(hist_center(np.searchsorted(cum, cum[-1] * q / 100)))
+
+
+def compare(base, cand, alpha=DEFAULT_ALPHA, tolerance=DEFAULT_TOLERANCE,
+            correction="holm", reps=DEFAULT_BOOTSTRAP, seed=DEFAULT_SEED,
+            min_samples=MIN_SAMPLES):
+    """Compara todas as chaves em comum; retorna a lista de linhas (dicts)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for key in sorted(base.keys() & cand.keys()):
+        n_a, n_b = base.count(key), cand.count(key)
+        if min(n_a, n_b) < min_samples:
+            continue
+        _, ca, cb = _joint_counts(base, cand, key)
+        prob_b, p_mw = mann_whitney(ca, cb)
+        ks_d, p_ks = kolmogorov_smirnov(ca, cb)
+        ci = bootstrap_p99_diff(base.histogram(key), cand.histogram(key), reps, rng)
+        total_a, total_b = n_a + base.lost.get(key, 0), n_b + cand.lost.get(key, 0)
+        rows.append({
+            "tamanho_bytes": key[0], "nivel": key[1], "n_a": n_a, "n_b": n_b,
+            "mediana_a": _quantile(base, key, 50), "mediana_b": _quantile(cand, key, 50),
+            "p99_a": _quantile(base, key, 99), "p99_b": _quantile(cand, key, 99),
+            "ic_p99": ci, "prob_b_maior": prob_b, "p_mw": p_mw, "ks_d": ks_d, "p_ks": p_ks,
+            "perda_a": base.lost.get(key, 0) / total_a * 100,
+            "perda_b": cand.lost.get(key, 0) / total_b * 100,
+        })
+
+    adj_mw = adjust_pvalues([r["p_mw"] for r in rows], correction)
+    adj_ks = adjust_pvalues([r["p_ks"] for r in rows], correction)
+    tol = tolerance / 100
+    for r, p_mw, p_ks in zip(rows, adj_mw, adj_ks):
+        r["p_mw_adj"], r["p_ks_adj"] = p_mw, p_ks
+        shift = (r["mediana_b"] - r["mediana_a"]) / r["mediana_a"] if r["mediana_a"] > 0 else 0.0
+        r["dif_mediana_pct"] = shift * 100
+        significant = p_mw < alpha
+        if (significant and r["prob_b_maior"] > 0.5 and shift > tol) or \
+                r["ic_p99"][0] > tol * r["p99_a"]:
+            r["resultado"] = "FALHA"
+        elif significant and r["prob_b_maior"] < 0.5 and shift < -tol:
+            r["resultado"] = "MELHOROU"
+        elif significant or p_ks < alpha:
+            r["resultado"] = "ALERTA"
+        else:
+            r["resultado"] = "OK"
+    return rows
+
+
+CSV_HEADER = [
+    "tamanho_bytes", "nivel", "n_a", "n_b", "mediana_a_ms", "mediana_b_ms",
+    "dif_mediana_%", "p99_a_ms", "p99_b_ms", "dif_p99_ic_inferior_ms",
+    "dif_p99_ic_superior_ms", "prob_b_maior", "p_mw", "p_mw_corrigido",
+    "ks_d", "p_ks", "p_ks_corrigido", "perda_a_%", "perda_b_%", "resultado",
+]
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(CSV_HEADER)
+        for r in rows:
+            writer.writerow([
+                r["tamanho_bytes"], r["nivel"], r["n_a"], r["n_b"],
+                f"{r['mediana_a']:.5f}", f"{r['mediana_b']:.5f}", f"{r['dif_mediana_pct']:.2f}",
+                f"{r['p99_a']:.5f}", f"{r['p99_b']:.5f}",
+                f"{r['ic_p99'][0]:.5f}", f"{r['ic_p99'][1]:.5f}", f"{r['prob_b_maior']:.4f}",
+                f"{r['p_mw']:.3g}", f"{r['p_mw_adj']:.3g}", f"{r['ks_d']:.4f}",
+                f"{r['p_ks']:.3g}", f"{r['p_ks_adj']:.3g}",
+                f"{r['perda_a']:.2f}", f"{r['perda_b']:.2f}", r["resultado"],
+            ])
+
+
+def print_table(rows, base, cand):
+    print(f"Base:      {base.label}")
+    print(f"Candidata: {cand.label}\n")
+    print(f"{'Tamanho':>7} {'Nível':>5} | {'Mediana A':>9} {'Mediana B':>9} {'Δ%':>7} | "
+          f"{'P99 A':>8} {'P99 B':>8} {'IC ΔP99 (ms)':>20} | {'p MW*':>8} {'p KS*':>8} | Resultado")
+    for r in rows:
+        ci = f"[{r['ic_p99'][0]:+.4f}, {r['ic_p99'][1]:+.4f}]"
+        print(f"{r['tamanho_bytes']:>7} {r['nivel'] or '-':>5} | {r['mediana_a']:>9.4f} "
+              f"{r['mediana_b']:>9.4f} {r['dif_mediana_pct']:>+7.2f} | {r['p99_a']:>8.4f} "
+              f"{r['p99_b']:>8.4f} {ci:>20} | {r['p_mw_adj']:>8.2g} {r['p_ks_adj']:>8.2g} | "
+              f"{r['resultado']}")
+    print("* p corrigido para comparações múltiplas")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compara duas execuções e aponta regressões de latência")
+    parser.add_argument("base", help="execução de referência (CSV bruto ou BANCO.db:ANALISE:TABELA)")
+    parser.add_argument("candidata", help="execução a verificar (mesmo formato)")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA,
+                        help=f"nível de significância (padrão: {DEFAULT_ALPHA})")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="piora relativa tolerada, em %%, na mediana e no P99 "
+                             f"(padrão: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--correction", choices=("holm", "bh"), default="holm",
+                        help="correção para comparações múltiplas (padrão: holm)")
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP,
+                        help=f"réplicas do bootstrap do P99 (padrão: {DEFAULT_BOOTSTRAP})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="semente do bootstrap")
+    parser.add_argument("--output", help="salva a tabela em CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        base = load_run(args.base)
+        cand = load_run(args.candidata)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 2
+
+    rows = compare(base, cand, args.alpha, args.tolerance, args.correction,
+                   args.bootstrap, args.seed)
+    if not rows:
+        print("[ERROR] Nenhuma chave (tamanho, nível) em comum com amostras suficientes")
+        return 2
+    print_table(rows, base, cand)
+    if args.output:
+        write_csv(rows, args.output)
+        print(f"[SUCCESS] Comparação salva em {args.output}")
+
+    failures = [r for r in rows if r["resultado"] == "FALHA"]
+    if failures:
+        print(f"\n[ERROR] Regressão em {len(failures)} de {len(rows)} comparações")
+        return 1
+    print(f"\n[SUCCESS] Nenhuma regressão em {len(rows)} comparações")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
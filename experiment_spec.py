@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Especificação do experimento compartilhada (experimento.conf).
+
+Arquivo texto 'chave = valor', com '#' para comentários, lido também pelos
+clientes em C (--spec ARQ). Hoje a única chave usada é 'tamanhos', a grade
+de payloads; chaves desconhecidas são ignoradas por todos os leitores.
+
+    # experimento.conf
+    tamanhos = 2, 4, 8, 16, ..., 1472, 1473, ..., 65507
+"""
+
+import os
+
+SPEC_FILE = "experimento.conf"
+DEFAULT_SIZES = (2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096,
+                 8192, 16384, 32768, 65507)
+MAX_UDP_PAYLOAD = 65507
+MAX_SIZES = 256           # mesmo limite dos clientes (MAX_SPEC_SIZES)
+
+
+def read_spec(path):
+    """Dicionário chave -> valor (texto) do arquivo de especificação."""
+    spec = {}
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            key, sep, value = line.partition("=")
+            if not sep:
+                raise ValueError(f"{path}:{lineno}: esperado 'chave = valor'")
+            spec[key.strip()] = value.strip()
+    return spec
+
+
+def parse_sizes(text, origin="tamanhos"):
+    try:
+        sizes = [int(tok) for tok in text.replace(",", " ").split()]
+    except ValueError:
+        raise ValueError(f"{origin}: lista de tamanhos inválida")
+    if not sizes or len(sizes) > MAX_SIZES:
+        raise ValueError(f"{origin}: use de 1 a {MAX_SIZES} tamanhos")
+    bad = [s for s in sizes if not 1 <= s <= MAX_UDP_PAYLOAD]
+    if bad:
+        raise ValueError(f"{origin}: tamanhos fora de 1..{MAX_UDP_PAYLOAD}: {bad}")
+    return tuple(sizes)
+
+
+def load_sizes(path=None):
+    """Grade de tamanhos da especificação (DEFAULT_SIZES sem arquivo ou sem a chave)."""
+    if path is None:
+        return DEFAULT_SIZES
+    spec = read_spec(path)
+    if "tamanhos" not in spec:
+        return DEFAULT_SIZES
+    return parse_sizes(spec["tamanhos"], f"{path}: tamanhos")
+
+
+def write_sizes(path, sizes):
+    """
+    Grava a grade em 'path', substituindo a linha 'tamanhos' e mantendo o
+    resto do arquivo (cria o arquivo se não existir).
+    """
+    line = "tamanhos = " + ", ".join(str(s) for s in sizes) + "\n"
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    out, replaced = [], False
+    for old in lines:
+        if old.split("#", 1)[0].partition("=")[0].strip() == "tamanhos":
+            out.append(line)
+            replaced = True
+        else:
+            out.append(old)
+    if not replaced:
+        out.append(line)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(out)
+    os.replace(tmp, path)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emulador de enlace em espaço de usuário para rodar os experimentos sem o
+laboratório (ou no CI): um relay UDP em loopback entre client_udp* e server_udp.
+
+    client_udp --> 127.0.0.1:9091 (emulador) --> 127.0.0.1:9090 (server_udp)
+
+Cada sentido (ida e volta) é um enlace independente, como uma Ethernet full
+duplex, com:
+  - banda por token bucket. Com balde vazio (padrão) cada datagrama é
+    serializado à taxa do enlace, como numa linha física; com --burst-kb o
+    comportamento é o do tbf do tc ('burst' bytes saem de uma vez). O tamanho
+    no fio inclui os cabeçalhos UDP/IP/Ethernet de cada fragmento IP;
+  - fila limitada em bytes (descarte de cauda: o datagrama inteiro é perdido
+    se não couber, como acontece quando um fragmento é descartado);
+  - atraso de propagação fixo mais jitter gaussiano (sem reordenação, a não
+    ser com --reorder);
+  - perda aleatória independente ou em rajadas (Gilbert, --loss-burst).
+
+Cada cliente (endereço de origem) ganha um socket próprio em direção ao
+servidor, então vários clientes podem usar o mesmo emulador. Os contadores
+por sentido e por tamanho separam o que o emulador descartou (perda sorteada
+ou fila cheia) do que foi perdido fora dele, e vão para --stats ao sair.
+
+Uso:
+    ./server_udp 127.0.0.1 9090 &
+    python3 link_emulator.py --rate 10M --delay-ms 0.5 --stats link_stats_10.csv &
+    ./client_udp 127.0.0.1 127.0.0.1 9091 1
+"""
+
+import argparse
+import csv
+import heapq
+import ipaddress
+import os
+import random
+import selectors
+import signal
+import socket
+import sys
+import time
+
+DEFAULT_LISTEN = "127.0.0.1:9091"
+DEFAULT_SERVER = "127.0.0.1:9090"
+SOCKET_BUFFER = 8 << 20
+MAX_DATAGRAM = 65535
+# Cabeçalhos por fragmento IP: IP 20 + Ethernet 14 + FCS 4 + preâmbulo/SFD 8 + IFG 12
+IP_HEADER = 20
+ETH_OVERHEAD = 38
+MTU = 1500
+# Esperas menores que isso viram entrega imediata (a folga do timer do kernel é ~50 us)
+MIN_WAIT_S = 20e-6
+IDLE_SESSION_S = 300.0
+
+STATS_HEADER = ["sentido", "tamanho_bytes", "recebidos", "encaminhados", "perda_sorteada",
+                "perda_fila", "erros_envio", "bytes_fio", "fila_media_ms", "fila_max_ms"]
+
+
+def wire_bytes(payload):
+    """Bytes ocupados no fio por um datagrama UDP de 'payload' bytes (com fragmentação IP)."""
+    ip_payload = payload + 8
+    frags = max(1, -(-ip_payload // (MTU - IP_HEADER)))
+    return ip_payload + frags * (IP_HEADER + ETH_OVERHEAD)
+
+
+def parse_rate(text):
+    """'10M', '100mbit', '1.5G', '64k' => bits por segundo ('0' = sem limite)."""
+    t = text.strip().lower()
+    for suffix in ("bit", "bps", "b"):
+        if t.endswith(suffix) and t[:-len(suffix)][-1:].isalpha():
+            t = t[:-len(suffix)]
+            break
+    mult = {"k": 1e3, "m": 1e6, "g": 1e9}.get(t[-1:], 1)
+    if t[-1:] in "kmg":
+        t = t[:-1]
+    try:
+        value = float(t) * mult
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"taxa inválida: {text}")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"taxa inválida: {text}")
+    return value
+
+
+def parse_endpoint(text):
+    host, _, port = text.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"endereço inválido (esperado IP:PORTA): {text}")
+
+
+class LossModel:
+    """
+    Perda independente (Bernoulli) ou em rajadas (Gilbert de dois estados,
+    perde tudo no estado ruim). Com rajada média L > 1: r = 1/L e
+    p = perda*r/(1-perda), o que mantém a taxa de perda média pedida.
+    """
+
+    def __init__(self, loss, burst, rng):
+        self.rng = rng
+        self.loss = loss
+        self.bad = False
+        if burst > 1 and 0 < loss < 1:
+            self.r = 1.0 / burst
+            self.p = loss * self.r / (1.0 - loss)
+        else:
+            self.r = self.p = None
+
+    def drop(self):
+        if self.loss <= 0:
+            return False
+        if self.p is None:
+            return self.rng.random() < self.loss
+        self.bad = (self.rng.random() >= self.r) if self.bad else (self.rng.random() < self.p)
+        return self.bad
+
+
+class SizeCounters:
+    __slots__ = ("received", "sent", "lost_random", "lost_queue", "send_errors",
+                 "wire", "queue_sum", "queue_max")
+
+    def __init__(self):
+        self.received = self.sent = self.lost_random = self.lost_queue = 0
+        self.send_errors = self.wire = 0
+        self.queue_sum = self.queue_max = 0.0
+
+
+class Link:
+    """Um sentido do enlace: token bucket, fila em bytes, atraso, jitter e perda."""
+
+    def __init__(self, name, rate_bps, burst, queue_bytes, delay, jitter, loss, rng, reorder):
+        self.name = name
+        self.rate = rate_bps / 8.0           # bytes/s
+        self.burst = burst
+        self.queue_bytes = queue_bytes
+        self.delay = delay
+        self.jitter = jitter
+        self.reorder = reorder
+        self.loss = loss
+        self.rng = rng
+        self.tokens = float(burst)
+        self.t_ref = 0.0                     # instante em que 'tokens' foi calculado
+        self.t_free = 0.0                    # fim da transmissão do último datagrama aceito
+        self.last_arrival = 0.0
+        self.counters = {}
+
+    def _counters(self, size):
+        c = self.counters.get(size)
+        if c is None:
+            c = self.counters[size] = SizeCounters()
+        return c
+
+    def admit(self, now, size):
+        """
+        Decide o destino de um datagrama que chega agora. Devolve o instante
+        de entrega no outro lado ou None se ele foi descartado.
+        """
+        c = self._counters(size)
+        c.received += 1
+        if self.loss.drop():
+            c.lost_random += 1
+            return None
+
+        wire = wire_bytes(size)
+        if self.rate <= 0:
+            depart = now
+        else:
+            backlog = max(0.0, self.t_free - now) * self.rate
+            if backlog + wire > self.queue_bytes:
+                c.lost_queue += 1
+                return None
+            start = max(now, self.t_free)
+            tokens = min(self.burst, self.tokens + (start - self.t_ref) * self.rate)
+            depart = start
+            if tokens < wire:
+                depart += (wire - tokens) / self.rate
+                tokens = wire
+            self.tokens, self.t_ref, self.t_free = tokens - wire, depart, depart
+
+        waited_ms = (depart - now) * 1000.0
+        c.queue_sum += waited_ms
+        if waited_ms > c.queue_max:
+            c.queue_max = waited_ms
+        c.wire += wire
+
+        arrival = depart + self.delay
+        if self.jitter > 0:
+            arrival = max(depart, arrival + self.rng.gauss(0.0, self.jitter))
+        if not self.reorder:
+            arrival = max(arrival, self.last_arrival)
+            self.last_arrival = arrival
+        return arrival
+
+    def totals(self):
+        t = SizeCounters()
+        for c in self.counters.values():
+            for attr in ("received", "sent", "lost_random", "lost_queue", "send_errors", "wire"):
+                setattr(t, attr, getattr(t, attr) + getattr(c, attr))
+        return t
+
+    def rows(self):
+        for size in sorted(self.counters):
+            c = self.counters[size]
+            accepted = c.received - c.lost_random - c.lost_queue
+            yield [self.name, size, c.received, c.sent, c.lost_random, c.lost_queue,
+                   c.send_errors, c.wire, f"{c.queue_sum / accepted if accepted else 0:.5f}",
+                   f"{c.queue_max:.5f}"]
+
+
+class LinkEmulator:
+    """
+    Laço único (select + heap de entregas) que encaminha os dois sentidos.
+    Usa select() e não epoll: são poucos sockets e o timeout do select tem
+    resolução de microssegundos, enquanto o do epoll é arredondado para
+    milissegundos (a 100 Mbps um datagrama de 1 KB leva ~0,09 ms).
+    """
+
+    def __init__(self, listen, server, up, down, idle=IDLE_SESSION_S):
+        self.server = server
+        self.up = up
+        self.down = down
+        self.idle = idle
+        self.sel = selectors.SelectSelector()
+        self.listen_sock = self._socket()
+        self.listen_sock.bind(listen)
+        self.sel.register(self.listen_sock, selectors.EVENT_READ, None)
+        self.sessions = {}                   # endereço do cliente -> [socket, último uso]
+        self.pending = []                    # (instante, seq, tamanho, dados, sentido, destino)
+        self.seq = 0
+
+    @staticmethod
+    def _socket():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, opt, SOCKET_BUFFER)
+            except OSError:
+                pass
+        sock.setblocking(False)
+        return sock
+
+    def _session(self, client, now):
+        entry = self.sessions.get(client)
+        if entry is None:
+            sock = self._socket()
+            sock.connect(self.server)
+            entry = self.sessions[client] = [sock, now]
+            self.sel.register(sock, selectors.EVENT_READ, client)
+            print(f"[INFO] Novo cliente {client[0]}:{client[1]} -> porta local "
+                  f"{sock.getsockname()[1]}")
+        entry[1] = now
+        return entry[0]
+
+    def _expire_sessions(self, now):
+        for client, (sock, last) in list(self.sessions.items()):
+            if now - last > self.idle:
+                self.sel.unregister(sock)
+                sock.close()
+                del self.sessions[client]
+
+    def _enqueue(self, link, now, data, dest):
+        when = link.admit(now, len(data))
+        if when is not None:
+            self.seq += 1
+            heapq.heappush(self.pending, (when, self.seq, len(data), data, link, dest))
+
+    def _drain(self, sock, client, now):
+        while True:
+            try:
+                if client is None:
+                    data, addr = sock.recvfrom(MAX_DATAGRAM)
+                else:
+                    data = sock.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionRefusedError:
+                # ICMP de porta inalcançável do servidor: o datagrama já foi contado
+                continue
+            if client is None:
+                self._enqueue(self.up, now, data, self._session(addr, now))
+            else:
+                self._enqueue(self.down, now, data, client)
+
+    def _deliver(self, now):
+        pending = self.pending
+        while pending and pending[0][0] <= now:
+            _, _, size, data, link, dest = heapq.heappop(pending)
+            c = link.counters[size]
+            try:
+                if isinstance(dest, tuple):
+                    self.listen_sock.sendto(data, dest)
+                else:
+                    dest.send(data)
+                c.sent += 1
+            except OSError:
+                c.send_errors += 1
+
+    def run(self, stop_at=None, report=0.0, on_report=None):
+        next_report = time.monotonic() + report if report > 0 else None
+        next_expire = time.monotonic() + self.idle
+        while True:
+            now = time.monotonic()
+            self._deliver(now)
+            if stop_at is not None and now >= stop_at:
+                return
+            if next_report is not None and now >= next_report:
+                on_report()
+                next_report = now + report
+            if now >= next_expire:
+                self._expire_sessions(now)
+                next_expire = now + self.idle
+
+            timeout = 0.5
+            if self.pending:
+                wait = self.pending[0][0] - now
+                timeout = 0 if wait < MIN_WAIT_S else min(timeout, wait)
+            for key, _ in self.sel.select(timeout):
+                self._drain(key.fileobj, key.data, time.monotonic())
+
+    def close(self):
+        for sock, _ in self.sessions.values():
+            sock.close()
+        self.listen_sock.close()
+        self.sel.close()
+
+
+def format_link(link):
+    t = link.totals()
+    dropped = t.lost_random + t.lost_queue
+    pct = dropped * 100.0 / t.received if t.received else 0.0
+    return (f"{link.name:>5}: {t.received} recebidos, {t.sent} encaminhados, "
+            f"{t.lost_random} perda sorteada, {t.lost_queue} fila cheia"
+            + (f", {t.send_errors} erros de envio" if t.send_errors else "")
+            + f" ({pct:.2f}% descartado)")
+
+
+def write_stats(path, links):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(STATS_HEADER)
+        for link in links:
+            writer.writerows(link.rows())
+    os.replace(tmp, path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Relay UDP em loopback que emula banda, atraso, jitter, perda e fila")
+    parser.add_argument("--listen", type=parse_endpoint, default=DEFAULT_LISTEN,
+                        help=f"endereço onde os clientes enviam (padrão: {DEFAULT_LISTEN})")
+    parser.add_argument("--server", type=parse_endpoint, default=DEFAULT_SERVER,
+                        help=f"endereço do server_udp (padrão: {DEFAULT_SERVER})")
+    parser.add_argument("--rate", type=parse_rate, default=parse_rate("10M"),
+                        help="banda de cada sentido, ex.: 10M, 100M, 0 = sem limite (padrão: 10M)")
+    parser.add_argument("--burst-kb", type=float, default=0.0,
+                        help="tamanho do balde de tokens em KB; 0 = serializa cada datagrama "
+                             "à taxa do enlace, 4 = o 'burst 32kbit' do tbf da seção 5.2 "
+                             "(padrão: 0)")
+    parser.add_argument("--queue-kb", type=float, default=128.0,
+                        help="fila máxima por sentido em KB; acima disso descarta (padrão: 128)")
+    parser.add_argument("--delay-ms", type=float, default=0.0,
+                        help="atraso de propagação em cada sentido, ms (padrão: 0)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="desvio padrão do jitter gaussiano, ms (padrão: 0)")
+    parser.add_argument("--reorder", action="store_true",
+                        help="deixa o jitter reordenar datagramas (padrão: ordem preservada)")
+    parser.add_argument("--loss", type=float, default=0.0,
+                        help="perda por sentido em %% (padrão: 0)")
+    parser.add_argument("--loss-burst", type=float, default=1.0,
+                        help="tamanho médio das rajadas de perda; 1 = perdas independentes "
+                             "(padrão: 1)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="semente do sorteio de perda e jitter (reprodutibilidade)")
+    parser.add_argument("--stats", metavar="ARQUIVO",
+                        help="CSV com os contadores por sentido e tamanho (reescrito a cada "
+                             "relatório e ao sair)")
+    parser.add_argument("--report", type=float, default=10.0,
+                        help="intervalo dos relatórios no terminal em segundos, 0 = só no fim "
+                             "(padrão: 10)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="encerra sozinho após N segundos")
+    args = parser.parse_args()
+    if not 0 <= args.loss < 100:
+        parser.error("--loss deve estar em [0, 100)")
+    if args.loss_burst < 1:
+        parser.error("--loss-burst deve ser >= 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    for name, (host, _) in (("--listen", args.listen), ("--server", args.server)):
+        try:
+            loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            print(f"[ERROR] {name} {host}: o emulador só opera em loopback (127.0.0.0/8)")
+            return 2
+
+    rng = random.Random(args.seed)
+    links = []
+    for name in ("ida", "volta"):
+        links.append(Link(name, args.rate, args.burst_kb * 1024, args.queue_kb * 1024,
+                          args.delay_ms / 1000.0, args.jitter_ms / 1000.0,
+                          LossModel(args.loss / 100.0, args.loss_burst, rng), rng, args.reorder))
+    up, down = links
+    if args.rate > 0 and up.burst + up.queue_bytes < wire_bytes(65507):
+        print(f"[WARN] burst + fila ({(up.burst + up.queue_bytes) / 1024:.0f} KB) menor que um "
+              "datagrama de 64 KB no fio: esses tamanhos serão sempre descartados")
+
+    try:
+        emu = LinkEmulator(args.listen, args.server, up, down)
+    except OSError as e:
+        print(f"[ERROR] Não foi possível abrir {args.listen[0]}:{args.listen[1]}: {e}")
+        return 2
+
+    rate = f"{args.rate / 1e6:g} Mbps" if args.rate > 0 else "sem limite"
+    print(f"[INFO] Emulando {rate}, atraso {args.delay_ms:g} ms, jitter {args.jitter_ms:g} ms, "
+          f"perda {args.loss:g}% (rajada {args.loss_burst:g}), fila {args.queue_kb:g} KB")
+    print(f"[INFO] {args.listen[0]}:{args.listen[1]} -> {args.server[0]}:{args.server[1]} "
+          "(Ctrl+C para sair)")
+
+    def report():
+        for link in links:
+            print(f"[INFO] {format_link(link)}")
+        if args.stats:
+            write_stats(args.stats, links)
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # Rodando em segundo plano (scripts, orquestrador) o encerramento chega por SIGTERM
+    signal.signal(signal.SIGTERM, terminate)
+    stop_at = time.monotonic() + args.duration if args.duration else None
+    try:
+        emu.run(stop_at, args.report, report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.close()
+    print("[SUCCESS] Emulador encerrado")
+    for link in links:
+        print(f"[INFO] {format_link(link)}")
+    if args.stats:
+        write_stats(args.stats, links)
+        print(f"[INFO] Contadores salvos em {args.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
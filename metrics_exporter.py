@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportador de métricas (formato texto do Prometheus) das medições dos clientes.
+
+Lê os raw_data_cliente*.csv e ramp_data_cliente*.csv de forma incremental
+(mesmo leitor do watch.py) e publica em http://127.0.0.1:9464/metrics, por
+rede, cliente, experimento e tamanho: histograma de RTT, timeouts, amostras e
+taxa de amostras. O texto é montado pela thread de leitura a cada intervalo e
+o scrape só devolve a última versão pronta, então o custo de um scrape não
+depende do número de amostras.
+
+Uso:
+    python3 metrics_exporter.py                    # 127.0.0.1:9464
+    python3 metrics_exporter.py --port 9500 raw_data_cliente1.csv
+    curl -s http://127.0.0.1:9464/metrics
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from results_db import hist_bin
+from watch import DEFAULT_PATTERNS, FileMonitor
+
+DEFAULT_PORT = 9464
+# Limites dos buckets do histograma exportado, em ms (RTT de loopback a 64 KB em 10 Mbps)
+BUCKETS_MS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NAME_PATTERN = re.compile(r"^(?P<tipo>raw|ramp)_data_(?P<cliente>cliente\d+)(?P<c100>_100)?\.csv$")
+
+
+def file_labels(path):
+    """raw_data_cliente2_100.csv => rede="100", cliente="cliente2", experimento="tamanho"."""
+    m = _NAME_PATTERN.match(os.path.basename(path))
+    if not m:
+        return {"rede": "", "cliente": os.path.basename(path), "experimento": ""}
+    return {
+        "rede": "100" if m.group("c100") else "10",
+        "cliente": m.group("cliente"),
+        "experimento": "rampa" if m.group("tipo") == "ramp" else "tamanho",
+    }
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+# Índice da primeira classe do histograma acima de cada limite
+_BUCKET_BINS = hist_bin(np.array(BUCKETS_MS, dtype=np.float64))
+
+
+def render_metrics(monitors):
+    """Texto completo do /metrics para o estado atual dos monitores."""
+    out = [
+        "# HELP udp_rtt_seconds RTT medido pelo cliente (amostras válidas).",
+        "# TYPE udp_rtt_seconds histogram",
+    ]
+    counters = []
+    for mon in monitors:
+        base = file_labels(mon.path)
+        for size in sorted(mon.keys):
+            st = mon.keys[size]
+            lab = _labels(**base, tamanho_bytes=size)
+            cum = np.cumsum(st.hist)
+            below = np.where(_BUCKET_BINS > 0, cum[np.maximum(_BUCKET_BINS - 1, 0)], 0)
+            for limit, count in zip(BUCKETS_MS, below):
+                out.append(f'udp_rtt_seconds_bucket{{{lab},le="{limit / 1000:g}"}} {int(count)}')
+            out.append(f'udp_rtt_seconds_bucket{{{lab},le="+Inf"}} {st.n}')
+            out.append(f"udp_rtt_seconds_sum{{{lab}}} {st.sum / 1000:.9g}")
+            out.append(f"udp_rtt_seconds_count{{{lab}}} {st.n}")
+            counters.append((lab, st))
+
+    out += ["# HELP udp_timeouts_total Envios sem eco dentro do timeout do cliente.",
+            "# TYPE udp_timeouts_total counter"]
+    out += [f"udp_timeouts_total{{{lab}}} {st.lost}" for lab, st in counters]
+    out += ["# HELP udp_samples_total Linhas gravadas pelo cliente (válidas + timeouts).",
+            "# TYPE udp_samples_total counter"]
+    out += [f"udp_samples_total{{{lab}}} {st.n + st.lost}" for lab, st in counters]
+    out += ["# HELP udp_ramp_level Nível da rampa em andamento.",
+            "# TYPE udp_ramp_level gauge"]
+    out += [f"udp_ramp_level{{{lab}}} {st.nivel}" for lab, st in counters if st.nivel is not None]
+
+    out += ["# HELP udp_sample_rate Linhas novas por segundo no arquivo (última leitura).",
+            "# TYPE udp_sample_rate gauge"]
+    out += [f"udp_sample_rate{{{_labels(**file_labels(m.path))}}} {m.rate:.3f}" for m in monitors]
+    out += ["# HELP udp_invalid_lines_total Linhas malformadas ignoradas.",
+            "# TYPE udp_invalid_lines_total counter"]
+    out += [f"udp_invalid_lines_total{{{_labels(**file_labels(m.path))}}} {m.bad_rows}"
+            for m in monitors]
+    out += ["# HELP udp_exporter_last_update_timestamp_seconds Hora da última leitura dos CSVs.",
+            "# TYPE udp_exporter_last_update_timestamp_seconds gauge",
+            f"udp_exporter_last_update_timestamp_seconds {time.time():.3f}"]
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+class Exporter:
+    """Thread de leitura dos CSVs; guarda o último texto de /metrics pronto."""
+
+    def __init__(self, paths, interval):
+        self.paths = paths
+        self.interval = interval
+        self.monitors = {}
+        self.payload = render_metrics([])
+        self.stop = threading.Event()
+
+    def poll_once(self, elapsed):
+        paths = self.paths or sorted(p for pat in DEFAULT_PATTERNS for p in glob.glob(pat))
+        for path in paths:
+            if path not in self.monitors and os.path.exists(path):
+                self.monitors[path] = FileMonitor(path)
+        for mon in self.monitors.values():
+            mon.poll(elapsed)
+        ready = [m for m in self.monitors.values()
+                 if m.tail.header and "rtt_ms" in m.tail.header]
+        self.payload = render_metrics(ready)
+
+    def run(self):
+        last = None
+        while not self.stop.is_set():
+            now = time.monotonic()
+            try:
+                self.poll_once(now - last if last is not None else 0.0)
+            except OSError as e:
+                print(f"[WARN] Falha ao ler os CSVs: {e}")
+            last = now
+            self.stop.wait(self.interval)
+
+
+def make_handler(exporter):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404, "use /metrics")
+                return
+            body = exporter.payload
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return MetricsHandler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Publica as medições dos clientes no formato do Prometheus")
+    parser.add_argument("arquivos", nargs="*",
+                        help="CSVs a acompanhar (padrão: raw_data_cliente*.csv e "
+                             "ramp_data_cliente*.csv do diretório atual)")
+    parser.add_argument("--bind", default="127.0.0.1",
+                        help="endereço do servidor HTTP (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"porta do servidor HTTP (padrão: {DEFAULT_PORT})")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="intervalo de leitura dos CSVs em segundos (padrão: 1)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    exporter = Exporter(args.arquivos, args.interval)
+    try:
+        server = ThreadingHTTPServer((args.bind, args.port), make_handler(exporter))
+    except OSError as e:
+        print(f"[ERROR] Não foi possível abrir {args.bind}:{args.port}: {e}")
+        return 1
+
+    reader = threading.Thread(target=exporter.run, daemon=True)
+    reader.start()
+    print(f"[INFO] Métricas em http://{args.bind}:{args.port}/metrics (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
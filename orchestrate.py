@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orquestrador da campanha de medições (substitui os run_*.sh).
+
+Lê uma especificação JSON com as redes e as fases (rede, modo raw/ramp,
+clientes, número de instâncias), sobe o server_udp (e, se pedido, o
+link_emulator.py) de cada rede e roda as instâncias dos clientes com
+concorrência limitada, esperando cada uma e guardando o código de saída e a
+duração. Cada instância roda no seu próprio diretório (instâncias nunca
+anexam ao mesmo CSV ao mesmo tempo); ao fim da fase os CSVs das instâncias
+bem-sucedidas são concatenados, em ordem, no diretório de análise com os
+nomes que o analyze.py espera (raw_data_cliente1.csv, ramp_data_cliente2_100.csv,
+...), e o analyze.py/plot.py rodam sobre o que já foi coletado.
+
+Cada execução vai para um diretório novo (<saida>/<nome>_<data_hora>/):
+    campanha.json        cópia da especificação usada
+    experimento.conf     cópia da grade de tamanhos ('experimento'), se houver
+    fase_<i>_<rede>mbps_<modo>/<cliente>_<instancia>/   CSV e log de cada instância
+    analise/             CSVs consolidados, saídas do analyze.py e graficos/
+    instancias.csv       código de saída, duração e linhas de cada instância
+    fases.csv            início, duração e falhas de cada fase
+
+Uso:
+    python3 orchestrate.py campanha_loopback.json
+    python3 orchestrate.py campanha_laboratorio.json --dry-run
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import experiment_spec
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BINARIES = {"raw": "client_udp", "ramp": "client_udp_ramp"}
+CSV_PREFIX = {"raw": "raw_data", "ramp": "ramp_data"}
+SERVER_START_S = 0.5          # espera após subir servidor/emulador antes dos clientes
+POLL_S = 0.05
+
+INSTANCE_HEADER = ["fase", "rede", "modo", "cliente", "instancia", "codigo_saida",
+                   "duracao_s", "linhas", "diretorio"]
+PHASE_HEADER = ["fase", "rede", "modo", "clientes", "instancias", "concorrencia", "inicio",
+                "duracao_s", "falhas", "analise_codigo_saida"]
+
+
+class SpecError(ValueError):
+    pass
+
+
+def load_spec(path):
+    """
+    Lê e valida a especificação. Campos (só 'fases' é obrigatório):
+
+    {
+      "nome": "laboratorio",
+      "saida": "execucoes",
+      "experimento": "experimento.conf",
+      "redes": {
+        "10":  {"servidor_ip": "10.0.0.12", "porta": 9090, "local_ip": "auto",
+                "iniciar_servidor": true, "servidor_args": ["--workers", "2"],
+                "emulador": {"porta": 9091, "args": ["--delay-ms", "0.5"]}}
+      },
+      "fases": [
+        {"rede": "10", "modo": "raw", "clientes": [1, 2], "instancias": 1000,
+         "concorrencia": 2, "cliente_args": ["--kernel-ts"], "timeout_s": 900}
+      ],
+      "analise": {"analyze": true, "plot": true, "args": ["--jobs", "2"],
+                  "em_paralelo": false}
+    }
+    """
+    with open(path, encoding="utf-8") as f:
+        try:
+            spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise SpecError(f"JSON inválido: {e}")
+
+    spec.setdefault("nome", os.path.splitext(os.path.basename(path))[0])
+    spec.setdefault("saida", "execucoes")
+    redes = spec.setdefault("redes", {})
+    analise = spec.setdefault("analise", {})
+    analise.setdefault("analyze", True)
+    analise.setdefault("plot", True)
+    analise.setdefault("args", [])
+    analise.setdefault("em_paralelo", False)
+
+    if spec.get("experimento"):
+        spec["experimento"] = os.path.abspath(spec["experimento"])
+        try:
+            experiment_spec.load_sizes(spec["experimento"])
+        except (OSError, ValueError) as e:
+            raise SpecError(f"experimento: {e}")
+
+    fases = spec.get("fases")
+    if not fases:
+        raise SpecError("a especificação não tem 'fases'")
+    for i, fase in enumerate(fases, 1):
+        rede = str(fase.get("rede", ""))
+        if rede not in ("10", "100"):
+            raise SpecError(f"fase {i}: 'rede' deve ser \"10\" ou \"100\"")
+        fase["rede"] = rede
+        if fase.get("modo") not in BINARIES:
+            raise SpecError(f"fase {i}: 'modo' deve ser \"raw\" ou \"ramp\"")
+        clientes = fase.setdefault("clientes", [1, 2])
+        if not clientes or any(c not in (1, 2) for c in clientes):
+            raise SpecError(f"fase {i}: 'clientes' deve conter 1 e/ou 2")
+        if int(fase.setdefault("instancias", 1)) < 1:
+            raise SpecError(f"fase {i}: 'instancias' deve ser >= 1")
+        # Padrão: uma instância de cada cliente por vez (dois terminais em sequência)
+        if int(fase.setdefault("concorrencia", len(clientes))) < 1:
+            raise SpecError(f"fase {i}: 'concorrencia' deve ser >= 1")
+        fase.setdefault("cliente_args", [])
+        fase.setdefault("timeout_s", None)
+
+        rede_cfg = redes.setdefault(rede, {})
+        rede_cfg.setdefault("servidor_ip", "127.0.0.1")
+        rede_cfg.setdefault("porta", 9090)
+        rede_cfg.setdefault("local_ip", "auto")
+        rede_cfg.setdefault("iniciar_servidor", True)
+        rede_cfg.setdefault("servidor_args", [])
+        if rede_cfg.get("emulador") is not None:
+            rede_cfg["emulador"].setdefault("porta", int(rede_cfg["porta"]) + 1)
+            rede_cfg["emulador"].setdefault("args", [])
+    return spec
+
+
+def csv_target(modo, cliente, rede):
+    """Nome que o analyze.py espera: ramp_data_cliente2_100.csv."""
+    return f"{CSV_PREFIX[modo]}_cliente{cliente}{'_100' if rede == '100' else ''}.csv"
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def merge_csv(parts, target):
+    """
+    Anexa os CSVs 'parts' a 'target' (um único cabeçalho), e os .meta de cada
+    parte a target.meta. Devolve as linhas anexadas.
+    """
+    header = None
+    if os.path.exists(target):
+        with open(target, encoding="utf-8") as f:
+            header = f.readline().rstrip("\r\n")
+    rows = 0
+    with open(target, "a", encoding="utf-8") as out:
+        for part in parts:
+            with open(part, encoding="utf-8") as f:
+                part_header = f.readline().rstrip("\r\n")
+                if header is None:
+                    header = part_header
+                    out.write(header + "\n")
+                elif part_header != header:
+                    print(f"[WARN] {part}: colunas \"{part_header}\" diferentes de \"{header}\"; "
+                          "ignorado")
+                    continue
+                for line in f:
+                    if line.strip():
+                        out.write(line if line.endswith("\n") else line + "\n")
+                        rows += 1
+            # Configuração da medição (ex.: --low-jitter) gravada pelo cliente junto do CSV
+            if os.path.exists(part + ".meta"):
+                with open(part + ".meta", encoding="utf-8") as f, \
+                        open(target + ".meta", "a", encoding="utf-8") as meta:
+                    meta.write(f.read())
+    return rows
+
+
+class Instance:
+    """Uma execução de client_udp/client_udp_ramp no seu próprio diretório."""
+
+    def __init__(self, fase_idx, fase, cliente, instancia, workdir):
+        self.fase_idx = fase_idx
+        self.fase = fase
+        self.cliente = cliente
+        self.instancia = instancia
+        self.workdir = workdir
+        self.proc = None
+        self.log = None
+        self.start = None
+        self.duration = None
+        self.returncode = None
+
+    def command(self, rede_cfg, spec_args=()):
+        target_ip, port = rede_cfg["servidor_ip"], rede_cfg["porta"]
+        if rede_cfg.get("emulador") is not None:
+            target_ip, port = "127.0.0.1", rede_cfg["emulador"]["porta"]
+        binary = os.path.join(REPO_DIR, BINARIES[self.fase["modo"]])
+        return [binary, *spec_args, *map(str, self.fase["cliente_args"]), str(rede_cfg["local_ip"]),
+                str(target_ip), str(port), str(self.cliente)]
+
+    def launch(self, rede_cfg, spec_args=()):
+        os.makedirs(self.workdir, exist_ok=True)
+        self.log = open(os.path.join(self.workdir, "saida.log"), "wb")
+        self.start = time.monotonic()
+        self.proc = subprocess.Popen(self.command(rede_cfg, spec_args), cwd=self.workdir,
+                                     stdout=self.log, stderr=subprocess.STDOUT,
+                                     stdin=subprocess.DEVNULL)
+
+    def poll(self, now):
+        code = self.proc.poll()
+        timeout = self.fase["timeout_s"]
+        if code is None and timeout and now - self.start > timeout:
+            self.proc.kill()
+            code = self.proc.wait()
+            print(f"[WARN] Cliente {self.cliente} instância {self.instancia} excedeu "
+                  f"{timeout} s e foi encerrado")
+        if code is not None:
+            self.returncode = code
+            self.duration = now - self.start
+            self.log.close()
+        return code is not None
+
+    def terminate(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    @property
+    def csv_path(self):
+        return os.path.join(self.workdir, f"{CSV_PREFIX[self.fase['modo']]}_cliente{self.cliente}.csv")
+
+    def row(self, run_dir):
+        return [self.fase_idx, self.fase["rede"], self.fase["modo"], self.cliente,
+                self.instancia, self.returncode, f"{self.duration:.3f}",
+                count_rows(self.csv_path), os.path.relpath(self.workdir, run_dir)]
+
+
+class Campaign:
+    def __init__(self, spec, spec_path):
+        self.spec = spec
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_dir = os.path.abspath(os.path.join(spec["saida"], f"{spec['nome']}_{stamp}"))
+        self.analysis_dir = os.path.join(self.run_dir, "analise")
+        self.spec_path = spec_path
+        # Cópia da grade de tamanhos no diretório da execução (passada com --spec)
+        self.experiment = (os.path.join(self.run_dir, experiment_spec.SPEC_FILE)
+                           if spec.get("experimento") else None)
+        self.services = {}                 # rede -> [Popen, ...] (servidor, emulador)
+        self.running = []
+        self.analysis = None               # (fase, Popen do analyze/plot) em andamento
+        self.phase_rows = []
+
+    # ---- servidor e emulador -------------------------------------------------
+
+    def start_services(self, rede):
+        if rede in self.services:
+            return True
+        cfg = self.spec["redes"][rede]
+        procs = []
+        self.services[rede] = procs
+        log_dir = os.path.join(self.run_dir, f"servicos_{rede}mbps")
+        os.makedirs(log_dir, exist_ok=True)
+        if cfg["iniciar_servidor"]:
+            cmd = [os.path.join(REPO_DIR, "server_udp"), str(cfg["servidor_ip"]),
+                   str(cfg["porta"]), *map(str, cfg["servidor_args"])]
+            procs.append(self._spawn(cmd, os.path.join(log_dir, "servidor.log")))
+            print(f"[INFO] Servidor {rede} Mbps: {' '.join(cmd)}")
+        emu = cfg.get("emulador")
+        if emu is not None:
+            cmd = [sys.executable, os.path.join(REPO_DIR, "link_emulator.py"),
+                   "--listen", f"127.0.0.1:{emu['porta']}",
+                   "--server", f"{cfg['servidor_ip']}:{cfg['porta']}",
+                   "--rate", f"{rede}M", "--report", "0",
+                   "--stats", os.path.join(self.analysis_dir, f"link_stats_{rede}.csv"),
+                   *map(str, emu["args"])]
+            procs.append(self._spawn(cmd, os.path.join(log_dir, "emulador.log")))
+            print(f"[INFO] Emulador {rede} Mbps em 127.0.0.1:{emu['porta']}")
+        time.sleep(SERVER_START_S)
+        for proc in procs:
+            if proc.poll() is not None:
+                print(f"[ERROR] '{os.path.basename(proc.args[0])}' da rede {rede} Mbps saiu com "
+                      f"código {proc.returncode} (veja {log_dir})")
+                return False
+        return True
+
+    @staticmethod
+    def _spawn(cmd, log_path):
+        log = open(log_path, "wb")
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                stdin=subprocess.DEVNULL)
+        log.close()
+        return proc
+
+    def stop_services(self):
+        for rede, procs in self.services.items():
+            # Emulador primeiro (grava os contadores), depois o servidor
+            for proc in reversed(procs):
+                if proc.poll() is None:
+                    proc.send_signal(signal.SIGINT if proc.args[0].endswith("server_udp")
+                                     else signal.SIGTERM)
+                    try:
+                        proc.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+        self.services = {}
+
+    # ---- fases ---------------------------------------------------------------
+
+    def run_phase(self, idx, fase, inst_writer):
+        rede, modo = fase["rede"], fase["modo"]
+        phase_dir = os.path.join(self.run_dir, f"fase_{idx}_{rede}mbps_{modo}")
+        n, conc = int(fase["instancias"]), int(fase["concorrencia"])
+        print(f"\n[INFO] Fase {idx}: rede {rede} Mbps, {modo}, clientes {fase['clientes']}, "
+              f"{n} instância(s) cada, até {conc} simultânea(s)")
+        started_at = datetime.now().isoformat(timespec="seconds")
+        t0 = time.monotonic()
+        if not self.start_services(rede):
+            self.phase_rows.append([idx, rede, modo, " ".join(map(str, fase["clientes"])), n,
+                                    conc, started_at, "0", "servidor", ""])
+            return False
+
+        # Alterna os clientes: com concorrência 2, cliente 1 e 2 rodam lado a lado
+        queue = [Instance(idx, fase, c, k, os.path.join(phase_dir, f"cliente{c}_{k:04d}"))
+                 for k in range(1, n + 1) for c in fase["clientes"]]
+        total, done, failed = len(queue), [], 0
+        next_report = max(1, total // 10)
+        queue.reverse()
+        while queue or self.running:
+            while queue and len(self.running) < conc:
+                inst = queue.pop()
+                inst.launch(self.spec["redes"][rede], self.spec_args())
+                self.running.append(inst)
+            time.sleep(POLL_S)
+            now = time.monotonic()
+            for inst in [i for i in self.running if i.poll(now)]:
+                self.running.remove(inst)
+                done.append(inst)
+                inst_writer.writerow(inst.row(self.run_dir))
+                if inst.returncode != 0:
+                    failed += 1
+                    print(f"[WARN] Cliente {inst.cliente} instância {inst.instancia} saiu com "
+                          f"código {inst.returncode} (veja {inst.workdir}/saida.log)")
+            if len(done) >= next_report:
+                print(f"[INFO] Fase {idx}: {len(done)}/{total} instâncias concluídas "
+                      f"({time.monotonic() - t0:.0f} s)")
+                next_report = len(done) + max(1, total // 10)
+
+        for cliente in fase["clientes"]:
+            parts = [i.csv_path for i in sorted(done, key=lambda i: i.instancia)
+                     if i.cliente == cliente and i.returncode == 0 and os.path.exists(i.csv_path)]
+            target = os.path.join(self.analysis_dir, csv_target(modo, cliente, rede))
+            rows = merge_csv(parts, target)
+            print(f"[INFO] {len(parts)} instância(s) do cliente {cliente}: {rows} linhas "
+                  f"anexadas a {os.path.relpath(target, self.run_dir)}")
+
+        elapsed = time.monotonic() - t0
+        self.phase_rows.append([idx, rede, modo, " ".join(map(str, fase["clientes"])), n, conc,
+                                started_at, f"{elapsed:.1f}", failed, ""])
+        status = "[SUCCESS]" if not failed else "[WARN]"
+        print(f"{status} Fase {idx} concluída em {elapsed:.1f} s ({failed} falha(s))")
+        return True
+
+    # ---- análise incremental -------------------------------------------------
+
+    def spec_args(self):
+        return ["--spec", self.experiment] if self.experiment else []
+
+    def analysis_commands(self):
+        cfg = self.spec["analise"]
+        cmds = []
+        if cfg["analyze"]:
+            cmds.append([sys.executable, os.path.join(REPO_DIR, "analyze.py"),
+                         *self.spec_args(), *map(str, cfg["args"])])
+        if cfg["plot"]:
+            cmds.append([sys.executable, os.path.join(REPO_DIR, "plot.py"), *self.spec_args()])
+        return cmds
+
+    def start_analysis(self, idx):
+        """analyze.py e plot.py em sequência sobre o diretório de análise."""
+        self.wait_analysis()
+        cmds = self.analysis_commands()
+        if not cmds:
+            return
+        script = " && ".join(subprocess.list2cmdline(c) for c in cmds)
+        log = open(os.path.join(self.analysis_dir, f"analise_fase_{idx}.log"), "wb")
+        proc = subprocess.Popen(script, shell=True, cwd=self.analysis_dir, stdout=log,
+                                stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        log.close()
+        self.analysis = (idx, proc)
+        print(f"[INFO] Análise da fase {idx} iniciada (log em analise/analise_fase_{idx}.log)")
+        if not self.spec["analise"]["em_paralelo"]:
+            self.wait_analysis()
+
+    def wait_analysis(self):
+        if self.analysis is None:
+            return
+        idx, proc = self.analysis
+        code = proc.wait()
+        self.analysis = None
+        for row in self.phase_rows:
+            if row[0] == idx:
+                row[-1] = code
+        if code == 0:
+            print(f"[SUCCESS] Análise da fase {idx} concluída")
+        else:
+            print(f"[WARN] Análise da fase {idx} saiu com código {code}")
+
+    # ---- execução ------------------------------------------------------------
+
+    def run(self):
+        os.makedirs(self.analysis_dir)
+        shutil.copyfile(self.spec_path, os.path.join(self.run_dir, "campanha.json"))
+        if self.experiment:
+            shutil.copyfile(self.spec["experimento"], self.experiment)
+        print(f"[INFO] Campanha '{self.spec['nome']}' em {self.run_dir}")
+        t0 = time.monotonic()
+        ok = True
+        with open(os.path.join(self.run_dir, "instancias.csv"), "w", newline="") as f:
+            inst_writer = csv.writer(f)
+            inst_writer.writerow(INSTANCE_HEADER)
+            try:
+                for idx, fase in enumerate(self.spec["fases"], 1):
+                    if not self.run_phase(idx, fase, inst_writer):
+                        ok = False
+                        break
+                    f.flush()
+                    # Próxima fase em outra rede: derruba os serviços desta antes de medir
+                    nxt = self.spec["fases"][idx] if idx < len(self.spec["fases"]) else None
+                    if nxt is None or nxt["rede"] != fase["rede"]:
+                        self.stop_services()
+                    self.start_analysis(idx)
+                self.wait_analysis()
+            except KeyboardInterrupt:
+                ok = False
+                print("\n[WARN] Interrompido: encerrando instâncias e serviços")
+                for inst in self.running:
+                    inst.terminate()
+                if self.analysis is not None:
+                    self.analysis[1].terminate()
+            finally:
+                self.stop_services()
+                self.write_phases()
+
+        print(f"\n[INFO] Campanha {'concluída' if ok else 'interrompida'} em "
+              f"{time.monotonic() - t0:.1f} s; resultados em {self.run_dir}")
+        return ok
+
+    def write_phases(self):
+        with open(os.path.join(self.run_dir, "fases.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(PHASE_HEADER)
+            writer.writerows(self.phase_rows)
+
+
+def print_plan(spec):
+    if spec.get("experimento"):
+        sizes = experiment_spec.load_sizes(spec["experimento"])
+        print(f"[INFO] Grade de {len(sizes)} tamanhos de {spec['experimento']}")
+    for idx, fase in enumerate(spec["fases"], 1):
+        cfg = spec["redes"][fase["rede"]]
+        via = (f" via emulador 127.0.0.1:{cfg['emulador']['porta']}"
+               if cfg.get("emulador") is not None else "")
+        print(f"[INFO] Fase {idx}: {BINARIES[fase['modo']]} -> {cfg['servidor_ip']}:{cfg['porta']}"
+              f"{via}, clientes {fase['clientes']} x {fase['instancias']} instância(s), "
+              f"concorrência {fase['concorrencia']}"
+              + (f", args {' '.join(map(str, fase['cliente_args']))}" if fase["cliente_args"] else ""))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Executa uma campanha de medições descrita em JSON")
+    parser.add_argument("especificacao", help="arquivo JSON da campanha")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="só valida a especificação e mostra as fases")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        spec = load_spec(args.especificacao)
+    except (OSError, SpecError) as e:
+        print(f"[ERROR] {args.especificacao}: {e}")
+        return 2
+
+    print_plan(spec)
+    if args.dry_run:
+        return 0
+
+    needed = {BINARIES[f["modo"]] for f in spec["fases"]}
+    if any(spec["redes"][f["rede"]]["iniciar_servidor"] for f in spec["fases"]):
+        needed.add("server_udp")
+    missing = sorted(b for b in needed if not os.path.exists(os.path.join(REPO_DIR, b)))
+    if missing:
+        print(f"[ERROR] Binários não encontrados: {', '.join(missing)} (rode 'make')")
+        return 2
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (ex.: job do CI cancelado) tem o mesmo efeito que Ctrl+C
+    signal.signal(signal.SIGTERM, terminate)
+    return 0 if Campaign(spec, args.especificacao).run() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
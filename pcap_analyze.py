@@ -0,0 +1,757 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análise de capturas UDP (.pcap clássico ou .pcapng) em uma única passada.
+
+Substitui o pipeline de texto do analyze_packets.sh (tcpdump -v | grep ...):
+lê o arquivo gravado pelo tcpdump diretamente com struct sobre um mmap e gera
+as mesmas seções do tcpdump_analysis_*.log, além de uma série temporal por
+segundo em CSV.
+
+Com --wire-rtt/--client-csv, casa cada requisição com o seu eco (remontando
+fragmentos IP) para obter o RTT no fio e, juntando com o RTT gravado pelo
+cliente, o overhead do host (pilha de rede + escalonamento) por tamanho.
+
+Uso:
+    python3 pcap_analyze.py tcpdump_capture_X.pcap --port 9090 \
+        --output tcpdump_analysis_X.log --timeseries tcpdump_timeseries_X.csv
+    python3 pcap_analyze.py captura.pcap --wire-rtt wire_rtt.csv \
+        --client-csv raw_data_cliente1.csv=10.0.0.11
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import socket
+import statistics
+import struct
+import sys
+from collections import Counter
+from datetime import datetime
+
+from analyze import (EXPECTED_MEASURES_PER_LEVEL, WARMUP_PER_SIZE,
+                     compute_percentile)
+from experiment_spec import DEFAULT_SIZES, load_sizes
+
+EXPECTED_SIZES = DEFAULT_SIZES
+# Maior payload UDP que cabe em um quadro Ethernet de 1500 bytes sem fragmentar
+MAX_UNFRAGMENTED_PAYLOAD = 1500 - 20 - 8
+TOP_FLOWS = 10
+
+# Tipos de enlace (LINKTYPE_*) suportados
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_LINUX_SLL2 = 276
+_RAW_LINKTYPES = (LINKTYPE_RAW, 12, 14, LINKTYPE_IPV4)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = 0x8100
+IPPROTO_UDP = 17
+ARPHRD_LOOPBACK = 772
+PACKET_OUTGOING = 4
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000),       # microssegundos, little-endian
+    b"\xa1\xb2\xc3\xd4": (">", 1000),       # microssegundos, big-endian
+    b"\x4d\x3c\xb2\xa1": ("<", 1),          # nanossegundos, little-endian
+    b"\xa1\xb2\x3c\x4d": (">", 1),          # nanossegundos, big-endian
+}
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_PB = 0x00000002
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_UDP = struct.Struct("!HHHH")
+_ETHERTYPE = struct.Struct("!H")
+
+
+def _iter_pcap(mm):
+    """Registros de um pcap clássico => (ts_ns, linktype, dados)."""
+    endian, ts_mult = _PCAP_MAGIC[bytes(mm[:4])]
+    linktype = struct.unpack_from(endian + "I", mm, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+    offset, end = 24, len(mm)
+    while offset + 16 <= end:
+        ts_sec, ts_frac, caplen, _ = record.unpack_from(mm, offset)
+        offset += 16
+        if offset + caplen > end:
+            break                               # registro truncado no fim
+        yield ts_sec * 1_000_000_000 + ts_frac * ts_mult, linktype, mm[offset:offset + caplen]
+        offset += caplen
+
+
+def _if_tsresol_ns(options, endian):
+    """Resolução do timestamp (em ns por unidade) a partir das opções do IDB."""
+    pos = 0
+    while pos + 4 <= len(options):
+        code, length = struct.unpack_from(endian + "HH", options, pos)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = options[pos + 4]
+            if value & 0x80:
+                return 1e9 / (2 ** (value & 0x7F))
+            return 1e9 / (10 ** value)
+        pos += 4 + ((length + 3) & ~3)
+    return 1000.0
+
+
+def _iter_pcapng(mm):
+    """Blocos de pacote de um pcapng => (ts_ns, linktype, dados)."""
+    offset, end = 0, len(mm)
+    endian = "<"
+    interfaces = []                             # (linktype, ns por unidade)
+    last_ts = 0
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(endian + "I", mm, offset)[0]
+        if block_type == PCAPNG_SHB:
+            # A ordem dos bytes é definida por seção
+            magic = struct.unpack_from("<I", mm, offset + 8)[0]
+            endian = "<" if magic == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            interfaces = []
+        block_len = struct.unpack_from(endian + "I", mm, offset + 4)[0]
+        if block_len < 12 or offset + block_len > end:
+            break
+        body = offset + 8
+
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + "H", mm, body)[0]
+            options = mm[body + 8:offset + block_len - 4]
+            interfaces.append((linktype, _if_tsresol_ns(options, endian)))
+        elif block_type == PCAPNG_EPB:
+            if_id, ts_high, ts_low, caplen, _ = struct.unpack_from(endian + "IIIII", mm, body)
+            linktype, ns_per_unit = interfaces[if_id]
+            last_ts = int(((ts_high << 32) | ts_low) * ns_per_unit)
+            yield last_ts, linktype, mm[body + 20:body + 20 + caplen]
+        elif block_type == PCAPNG_SPB:
+            orig_len = struct.unpack_from(endian + "I", mm, body)[0]
+            caplen = min(orig_len, block_len - 16)
+            # Simple Packet Block não tem timestamp: herda o do pacote anterior
+            yield last_ts, interfaces[0][0], mm[body + 4:body + 4 + caplen]
+        elif block_type == PCAPNG_PB:
+            if_id, _, ts_high, ts_low, caplen, _ = struct.unpack_from(endian + "HHIIII", mm, body)
+            linktype, ns_per_unit = interfaces[if_id]
+            last_ts = int(((ts_high << 32) | ts_low) * ns_per_unit)
+            yield last_ts, linktype, mm[body + 20:body + 20 + caplen]
+
+        offset += block_len
+
+
+def iter_packets(mm):
+    """Detecta o formato (pcap ou pcapng) e itera sobre (ts_ns, linktype, dados)."""
+    magic = bytes(mm[:4])
+    if magic in _PCAP_MAGIC:
+        return _iter_pcap(mm)
+    if struct.unpack_from("<I", mm, 0)[0] == PCAPNG_SHB:
+        return _iter_pcapng(mm)
+    raise ValueError("formato de captura desconhecido (esperado pcap ou pcapng)")
+
+
+def _ip_offset(linktype, data):
+    """
+    Deslocamento do cabeçalho IPv4 no quadro, ou -1 se não for IPv4.
+    Com "tcpdump -i any" cada pacote de loopback aparece duas vezes (saída e
+    entrada); a cópia de saída é descartada para não contar em dobro.
+    """
+    if linktype == LINKTYPE_LINUX_SLL:
+        pkttype, hatype = struct.unpack_from("!HH", data, 0)
+        if hatype == ARPHRD_LOOPBACK and pkttype == PACKET_OUTGOING:
+            return -1
+        return 16 if _ETHERTYPE.unpack_from(data, 14)[0] == ETHERTYPE_IPV4 else -1
+    if linktype == LINKTYPE_LINUX_SLL2:
+        hatype, pkttype = struct.unpack_from("!HB", data, 8)
+        if hatype == ARPHRD_LOOPBACK and pkttype == PACKET_OUTGOING:
+            return -1
+        return 20 if _ETHERTYPE.unpack_from(data, 0)[0] == ETHERTYPE_IPV4 else -1
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype = _ETHERTYPE.unpack_from(data, 12)[0]
+        if ethertype == ETHERTYPE_VLAN:
+            return 18 if _ETHERTYPE.unpack_from(data, 16)[0] == ETHERTYPE_IPV4 else -1
+        return 14 if ethertype == ETHERTYPE_IPV4 else -1
+    if linktype == LINKTYPE_NULL:
+        family = struct.unpack_from("=I", data, 0)[0]
+        return 4 if family == socket.AF_INET else -1
+    if linktype in _RAW_LINKTYPES:
+        return 0 if data[0] >> 4 == 4 else -1
+    return -1
+
+
+def parse_ipv4(linktype, data):
+    """
+    Decodifica o cabeçalho IPv4 do quadro.
+    Retorna (src, dst, ip_id, frag_offset, more_fragments, proto, ip_payload_offset,
+    ip_payload_len) ou None se o quadro não for IPv4 ou estiver truncado.
+    """
+    try:
+        off = _ip_offset(linktype, data)
+        if off < 0:
+            return None
+        ver_ihl, _, total_len, ip_id, frag, _, proto, _, src, dst = _IPV4.unpack_from(data, off)
+    except (struct.error, IndexError):
+        return None
+    ihl = (ver_ihl & 0x0F) * 4
+    return (src, dst, ip_id, (frag & 0x1FFF) * 8, bool(frag & 0x2000), proto,
+            off + ihl, total_len - ihl)
+
+
+def format_endpoint(addr, port):
+    return f"{socket.inet_ntoa(addr)}.{port}"
+
+
+class CaptureAnalysis:
+    """Acumuladores de uma passada sobre a captura."""
+
+    def __init__(self, port):
+        self.port = port
+        self.frames = 0
+        self.datagrams = 0
+        self.sizes = Counter()
+        self.flows = Counter()
+        self.per_second = {}
+        self.first_ts = None
+        self.last_ts = None
+        self.fragmented = 0
+        self.trailing_fragments = 0
+        self.large = 0
+        self._open_fragments = set()
+
+    def add_frame(self, ts_ns, linktype, data):
+        self.frames += 1
+        ip = parse_ipv4(linktype, data)
+        if ip is None:
+            return None
+        src, dst, ip_id, frag_off, more_frags, proto, l4_off, l4_len = ip
+        if proto != IPPROTO_UDP:
+            return None
+
+        if frag_off > 0:
+            # Fragmentos seguintes não têm cabeçalho UDP: atribui pelo id IP
+            key = (src, dst, ip_id)
+            if key in self._open_fragments:
+                self.trailing_fragments += 1
+                if not more_frags:
+                    self._open_fragments.discard(key)
+            return None
+
+        try:
+            sport, dport, udp_len, _ = _UDP.unpack_from(data, l4_off)
+        except struct.error:
+            return None
+        if self.port and self.port not in (sport, dport):
+            return None
+
+        payload = udp_len - 8
+        self.datagrams += 1
+        self.sizes[payload] += 1
+        self.flows[(src, sport, dst, dport)] += 1
+        if self.first_ts is None:
+            self.first_ts = ts_ns
+        self.last_ts = ts_ns
+        if payload > MAX_UNFRAGMENTED_PAYLOAD:
+            self.large += 1
+        if more_frags:
+            self.fragmented += 1
+            self._open_fragments.add((src, dst, ip_id))
+
+        second = ts_ns // 1_000_000_000
+        bucket = self.per_second.get(second)
+        if bucket is None:
+            bucket = self.per_second[second] = [0, 0, 0, 0, 0]
+        bucket[0] += 1
+        bucket[1] += payload
+        if dport == self.port:
+            bucket[2] += 1
+        elif sport == self.port:
+            bucket[3] += 1
+        if more_frags:
+            bucket[4] += 1
+        return src, sport, dst, dport, ip_id, payload
+
+    def duration_s(self):
+        if self.first_ts is None:
+            return 0.0
+        return (self.last_ts - self.first_ts) / 1e9
+
+
+class FragmentReassembler:
+    """
+    Remonta datagramas IPv4 fragmentados. Só guarda o primeiro fragmento (que
+    traz o cabeçalho UDP) e a quantidade de bytes já vista de cada datagrama.
+    """
+
+    TIMEOUT_NS = 30 * 1_000_000_000          # igual ao ipfrag_time do Linux
+
+    def __init__(self):
+        self._pending = {}
+        self.incomplete = 0
+        self._last_sweep = 0
+
+    def feed(self, ts_ns, ip, data):
+        """
+        Retorna (ts_primeiro_fragmento, ts_conclusão, dados_do_primeiro,
+        offset_udp) quando o datagrama fica completo, ou None.
+        """
+        src, dst, ip_id, frag_off, more_frags, proto, l4_off, l4_len = ip
+        if frag_off == 0 and not more_frags:
+            return ts_ns, ts_ns, data, l4_off
+
+        if ts_ns - self._last_sweep > self.TIMEOUT_NS:
+            self._expire(ts_ns)
+        key = (src, dst, ip_id, proto)
+        entry = self._pending.get(key)
+        if entry is None:
+            # [ts_inicio, bytes_vistos, tamanho_total, dados_primeiro, offset_udp]
+            entry = self._pending[key] = [ts_ns, 0, -1, None, 0]
+        entry[1] += l4_len
+        if frag_off == 0:
+            entry[3], entry[4] = data, l4_off
+        if not more_frags:
+            entry[2] = frag_off + l4_len
+        if entry[2] >= 0 and entry[1] >= entry[2] and entry[3] is not None:
+            del self._pending[key]
+            return entry[0], ts_ns, entry[3], entry[4]
+        return None
+
+    def _expire(self, now_ns):
+        self._last_sweep = now_ns
+        stale = [k for k, e in self._pending.items() if now_ns - e[0] > self.TIMEOUT_NS]
+        for key in stale:
+            del self._pending[key]
+        self.incomplete += len(stale)
+
+    def finish(self):
+        self.incomplete += len(self._pending)
+        self._pending.clear()
+
+
+class WireRttMatcher:
+    """
+    Casa cada requisição (cliente -> porta do servidor) com o eco do mesmo
+    fluxo e tamanho. Os clientes são pare-e-espere: o eco casa com a
+    requisição pendente mais recente do mesmo tamanho (a que o cliente está
+    esperando) e as anteriores a ela ficam sem resposta. O RTT no fio vai do primeiro fragmento da
+    requisição ao último fragmento do eco.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self.reassembler = FragmentReassembler()
+        # fluxo (cli_ip, cli_porta, srv_ip, srv_porta) => [[tamanho, ts, rtt_ns, ping], ...]
+        self.requests = {}
+        self._pending = {}
+        self.orphan_echoes = 0
+
+    def add_frame(self, ts_ns, linktype, data):
+        ip = parse_ipv4(linktype, data)
+        if ip is None or ip[5] != IPPROTO_UDP:
+            return
+        done = self.reassembler.feed(ts_ns, ip, data)
+        if done is None:
+            return
+        ts_first, ts_done, first, l4_off = done
+        try:
+            sport, dport, udp_len, _ = _UDP.unpack_from(first, l4_off)
+        except struct.error:
+            return
+        size = udp_len - 8
+        src, dst = ip[0], ip[1]
+
+        if dport == self.port:
+            flow = (src, sport, dst, dport)
+            is_ping = bytes(first[l4_off + 8:l4_off + 12]) == b"PING"
+            reqs = self.requests.setdefault(flow, [])
+            reqs.append([size, ts_first, None, is_ping])
+            self._pending.setdefault(flow, []).append(len(reqs) - 1)
+        elif sport == self.port:
+            flow = (dst, dport, src, sport)
+            pending = self._pending.get(flow)
+            reqs = self.requests.get(flow)
+            if not pending:
+                self.orphan_echoes += 1
+                return
+            for pos in range(len(pending) - 1, -1, -1):
+                idx = pending[pos]
+                if reqs[idx][0] == size:
+                    reqs[idx][2] = ts_done - reqs[idx][1]
+                    del pending[:pos + 1]
+                    return
+            self.orphan_echoes += 1
+
+    def finish(self):
+        self.reassembler.finish()
+        self._pending.clear()
+
+    def flows_by_client(self):
+        """{ip_cliente: [fluxo, ...]} com os fluxos em ordem de início."""
+        by_client = {}
+        for flow in sorted(self.requests, key=lambda f: self.requests[f][0][1]):
+            by_client.setdefault(flow[0], []).append(flow)
+        return by_client
+
+    def per_size(self):
+        """{tamanho: (rtts_ms ordenados, sem_resposta)} de todos os fluxos."""
+        result = {}
+        for reqs in self.requests.values():
+            for size, _, rtt_ns, is_ping in reqs:
+                if is_ping:
+                    continue
+                rtts, lost = result.setdefault(size, ([], [0]))
+                if rtt_ns is None:
+                    lost[0] += 1
+                else:
+                    rtts.append(rtt_ns / 1e6)
+        return {size: (sorted(r), lost[0]) for size, (r, lost) in result.items()}
+
+
+def wire_samples(reqs, ramp):
+    """
+    Numera as requisições de um fluxo como o cliente numera as linhas do CSV:
+    ignora o PING e, no client_udp, os WARMUP_PER_SIZE primeiros envios de
+    cada tamanho. Retorna {(tamanho, [nivel,] iteracao): rtt_ms ou None}.
+    """
+    ordinal = Counter()
+    samples = {}
+    for size, _, rtt_ns, is_ping in reqs:
+        if is_ping:
+            continue
+        k = ordinal[size]
+        ordinal[size] += 1
+        if ramp:
+            key = (size, k // EXPECTED_MEASURES_PER_LEVEL + 1, k % EXPECTED_MEASURES_PER_LEVEL + 1)
+        else:
+            if k < WARMUP_PER_SIZE:
+                continue
+            key = (size, k - WARMUP_PER_SIZE + 1)
+        samples[key] = None if rtt_ns is None else rtt_ns / 1e6
+    return samples
+
+
+def read_client_runs(path):
+    """
+    Lê um CSV de cliente (raw_data_* ou ramp_data_*) separando as execuções:
+    a n-ésima ocorrência de uma mesma chave (tamanho, [nivel,] iteracao)
+    pertence à n-ésima execução. Com a coluna instancia (--send-ts), a
+    contagem é feita dentro de cada rótulo, o que separa execuções
+    simultâneas que intercalaram linhas no mesmo CSV. Retorna
+    (ramp, [{chave: rtt_ms}, ...]) na ordem em que as execuções aparecem.
+    """
+    runs = []
+    run_index = {}
+    occurrences = Counter()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        ramp = "nivel" in (reader.fieldnames or [])
+        key_fields = ("tamanho_bytes", "nivel", "iteracao_no_nivel") if ramp \
+            else ("tamanho_bytes", "iteracao")
+        for row in reader:
+            try:
+                key = tuple(int(row[k]) for k in key_fields)
+                rtt = float(row["rtt_ms"])
+            except (ValueError, TypeError, KeyError):
+                continue
+            label = row.get("instancia")
+            run = (label, occurrences[label, key])
+            occurrences[label, key] += 1
+            if run not in run_index:
+                run_index[run] = len(runs)
+                runs.append({})
+            runs[run_index[run]][key] = rtt
+    return ramp, runs
+
+
+def join_host_overhead(matcher, csv_path, client_ip=None, first_run=None):
+    """
+    Junta o RTT no fio com o RTT medido pelo cliente. O k-ésimo fluxo do
+    cliente na captura corresponde à execução first_run + k do CSV; por
+    padrão supõe-se que a captura cobre as últimas execuções gravadas.
+    Retorna ({tamanho: [rtt_cliente - rtt_fio, ...]}, fluxos, primeira_execução).
+    """
+    by_client = matcher.flows_by_client()
+    if client_ip is None:
+        if len(by_client) != 1:
+            raise ValueError(f"{len(by_client)} clientes na captura; "
+                             f"informe o IP em --client-csv ARQUIVO=IP")
+        client_ip = next(iter(by_client))
+    else:
+        client_ip = socket.inet_aton(client_ip)
+    flows = by_client.get(client_ip, [])
+    if not flows:
+        raise ValueError(f"cliente {socket.inet_ntoa(client_ip)} não aparece na captura")
+
+    ramp, runs = read_client_runs(csv_path)
+    if first_run is None:
+        first_run = max(len(runs) - len(flows), 0)
+
+    overhead = {}
+    for k, flow in enumerate(flows):
+        if first_run + k >= len(runs):
+            break
+        run = runs[first_run + k]
+        for key, wire_ms in wire_samples(matcher.requests[flow], ramp).items():
+            client_ms = run.get(key)
+            if wire_ms is None or client_ms is None or client_ms < 0:
+                continue
+            overhead.setdefault(key[0], []).append(client_ms - wire_ms)
+    return overhead, len(flows), first_run
+
+
+def write_wire_rtt(matcher, path):
+    """Um registro por requisição casada (ou -1 quando ficou sem eco)."""
+    with open(path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(["cliente", "porta_cliente", "tamanho_bytes", "ordem",
+                         "t_envio_s", "rtt_fio_ms"])
+        for flow in sorted(matcher.requests, key=lambda f: matcher.requests[f][0][1]):
+            ordinal = Counter()
+            for size, ts, rtt_ns, is_ping in matcher.requests[flow]:
+                if is_ping:
+                    continue
+                ordinal[size] += 1
+                writer.writerow([socket.inet_ntoa(flow[0]), flow[1], size, ordinal[size],
+                                 f"{ts / 1e9:.9f}",
+                                 "-1" if rtt_ns is None else f"{rtt_ns / 1e6:.6f}"])
+
+
+def write_host_overhead(overhead, path):
+    with open(path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(["tamanho_bytes", "n_amostras", "overhead_medio_ms",
+                         "overhead_mediana_ms", "overhead_p95_ms", "overhead_p99_ms",
+                         "overhead_min_ms", "overhead_max_ms"])
+        for size in sorted(overhead):
+            values = sorted(overhead[size])
+            writer.writerow([
+                size, len(values), f"{statistics.mean(values):.5f}",
+                f"{compute_percentile(values, 50):.5f}",
+                f"{compute_percentile(values, 95):.5f}",
+                f"{compute_percentile(values, 99):.5f}",
+                f"{values[0]:.5f}", f"{values[-1]:.5f}",
+            ])
+
+
+def analyze_capture(path, port, on_frame=None):
+    """
+    Lê a captura inteira em uma passada. on_frame(ts_ns, linktype, data) é
+    chamado para cada quadro lido, para análises adicionais na mesma passada.
+    """
+    analysis = CaptureAnalysis(port)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for ts_ns, linktype, data in iter_packets(mm):
+                analysis.add_frame(ts_ns, linktype, data)
+                if on_frame is not None:
+                    on_frame(ts_ns, linktype, data)
+    return analysis
+
+
+def _format_time(ts_ns):
+    return datetime.fromtimestamp(ts_ns / 1e9).strftime("%H:%M:%S.%f")
+
+
+def write_report(analysis, out, path, capture_time=None, expected_sizes=EXPECTED_SIZES):
+    """Escreve as seções do tcpdump_analysis_*.log."""
+    w = out.write
+    w("=== ANÁLISE DE CAPTURA DE PACOTES UDP ===\n")
+    w(f"Data: {datetime.now():%c}\n")
+    w(f"Arquivo: {path}\n")
+    w(f"Porta monitorada: {analysis.port}\n")
+    if capture_time:
+        w(f"Duração da captura: {capture_time}s\n")
+    w("\n=== ESTATÍSTICAS GERAIS ===\n")
+    w(f"Quadros lidos: {analysis.frames}\n")
+    w(f"Total de pacotes UDP capturados: {analysis.datagrams}\n")
+
+    w("\n=== DISTRIBUIÇÃO POR TAMANHO ===\n")
+    w("Quantidade | Tamanho (bytes)\n")
+    w("----------------------------\n")
+    if analysis.sizes:
+        for size in sorted(analysis.sizes):
+            w(f"{analysis.sizes[size]:>10} | {size}\n")
+    else:
+        w("Nenhum pacote encontrado\n")
+
+    w("\n=== ESTATÍSTICAS POR TAMANHO ===\n")
+    for size in expected_sizes:
+        if analysis.sizes.get(size):
+            w(f"Tamanho {size} bytes: {analysis.sizes[size]} pacotes\n")
+
+    w("\n=== FLUXOS DE COMUNICAÇÃO ===\n")
+    w("Origem → Destino | Quantidade\n")
+    w("------------------------------\n")
+    if analysis.flows:
+        for (src, sport, dst, dport), count in analysis.flows.most_common(TOP_FLOWS):
+            w(f"{format_endpoint(src, sport)} > {format_endpoint(dst, dport)} | {count}\n")
+    else:
+        w("Nenhum fluxo encontrado\n")
+
+    w("\n=== ANÁLISE TEMPORAL ===\n")
+    if analysis.first_ts is not None:
+        duration = analysis.duration_s()
+        w(f"Primeiro pacote: {_format_time(analysis.first_ts)}\n")
+        w(f"Último pacote: {_format_time(analysis.last_ts)}\n")
+        w(f"Intervalo com tráfego: {duration:.3f} s\n")
+        if duration > 0:
+            w(f"Taxa média: {analysis.datagrams / duration:.2f} pacotes/segundo\n")
+        if capture_time:
+            w(f"Taxa média na janela de captura: "
+              f"{analysis.datagrams / capture_time:.2f} pacotes/segundo\n")
+        peak_second, peak = max(analysis.per_second.items(), key=lambda kv: kv[1][0])
+        w(f"Pico: {peak[0]} pacotes/segundo em {_format_time(peak_second * 1_000_000_000)}\n")
+
+    w("\n=== POSSÍVEIS ANOMALIAS ===\n")
+    unexpected = sorted(s for s in analysis.sizes if s not in expected_sizes)
+    if unexpected:
+        w("Tamanhos inesperados detectados:\n")
+        for size in unexpected:
+            w(f"{size} ({analysis.sizes[size]} pacotes)\n")
+    else:
+        w("Nenhum tamanho inesperado detectado\n")
+    if analysis.large:
+        w(f"\nAVISO: {analysis.large} pacotes grandes (>{MAX_UNFRAGMENTED_PAYLOAD} bytes "
+          f"de payload) detectados\n")
+        w(f"Datagramas fragmentados (MF no primeiro fragmento): {analysis.fragmented}\n")
+        w(f"Fragmentos seguintes capturados: {analysis.trailing_fragments}\n")
+        w("Possível fragmentação IP ocorrendo\n")
+
+
+def write_wire_report(matcher, joins, out):
+    """Seções de RTT no fio e, se houver CSVs de cliente, do overhead do host."""
+    w = out.write
+    w("\n=== RTT NO FIO (REQUISIÇÃO -> ECO) ===\n")
+    w("Tamanho | Casados | Sem eco | Médio (ms) | Mediana (ms) | P99 (ms)\n")
+    w("-----------------------------------------------------------------\n")
+    for size, (rtts, lost) in sorted(matcher.per_size().items()):
+        if rtts:
+            w(f"{size:>7} | {len(rtts):>7} | {lost:>7} | {statistics.mean(rtts):>10.4f} | "
+              f"{compute_percentile(rtts, 50):>12.4f} | {compute_percentile(rtts, 99):>8.4f}\n")
+        else:
+            w(f"{size:>7} | {0:>7} | {lost:>7} | {'-':>10} | {'-':>12} | {'-':>8}\n")
+    w(f"Ecos sem requisição correspondente: {matcher.orphan_echoes}\n")
+    w(f"Datagramas com fragmentos faltando: {matcher.reassembler.incomplete}\n")
+
+    for csv_path, overhead, n_flows, first_run in joins:
+        w(f"\n=== OVERHEAD DO HOST (RTT CLIENTE - RTT NO FIO): {csv_path} ===\n")
+        w(f"Fluxos na captura: {n_flows}   Primeira execução do CSV: {first_run + 1}\n")
+        w("Tamanho | Amostras | Médio (ms) | Mediana (ms) | P95 (ms) | P99 (ms)\n")
+        w("-------------------------------------------------------------------\n")
+        for size in sorted(overhead):
+            values = sorted(overhead[size])
+            w(f"{size:>7} | {len(values):>8} | {statistics.mean(values):>10.4f} | "
+              f"{compute_percentile(values, 50):>12.4f} | "
+              f"{compute_percentile(values, 95):>8.4f} | {compute_percentile(values, 99):>8.4f}\n")
+        if not overhead:
+            w("Nenhuma amostra em comum entre a captura e o CSV\n")
+
+
+def write_timeseries(analysis, path):
+    """Série temporal por segundo (segundos sem tráfego aparecem com zero)."""
+    with open(path, "w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(["segundo", "epoch_s", "pacotes", "bytes_payload",
+                         "para_servidor", "do_servidor", "fragmentados"])
+        if not analysis.per_second:
+            return
+        first, last = min(analysis.per_second), max(analysis.per_second)
+        empty = (0, 0, 0, 0, 0)
+        for second in range(first, last + 1):
+            writer.writerow([second - first, second, *analysis.per_second.get(second, empty)])
+
+
+def print_summary(analysis, top=5):
+    print(f"Total de pacotes: {analysis.datagrams}")
+    print(f"\nTop {top} tamanhos mais frequentes:")
+    for size, count in analysis.sizes.most_common(top):
+        print(f"{count:6d} pacotes de {size:6d} bytes")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analisa uma captura UDP (pcap/pcapng) em uma passada")
+    parser.add_argument("captura", help="arquivo .pcap ou .pcapng")
+    parser.add_argument("--port", type=int, default=9090,
+                        help="porta UDP do servidor (0 = todas; padrão: 9090)")
+    parser.add_argument("--output", help="arquivo do relatório (padrão: stdout)")
+    parser.add_argument("--timeseries", help="CSV com a série temporal por segundo")
+    parser.add_argument("--capture-time", type=int,
+                        help="duração configurada da captura, em segundos")
+    parser.add_argument("--summary", action="store_true",
+                        help="imprime o resumo (top tamanhos) no terminal")
+    parser.add_argument("--wire-rtt", metavar="ARQUIVO",
+                        help="casa requisições e ecos e salva o RTT no fio por pacote")
+    parser.add_argument("--client-csv", action="append", default=[], metavar="ARQUIVO[=IP]",
+                        help="CSV do cliente para calcular o overhead do host "
+                             "(IP obrigatório se houver mais de um cliente na captura)")
+    parser.add_argument("--first-run", type=int, metavar="N",
+                        help="execução do CSV (1 = primeira) que corresponde ao primeiro "
+                             "fluxo da captura (padrão: as últimas execuções do CSV)")
+    parser.add_argument("--spec", metavar="ARQUIVO",
+                        help="especificação do experimento com a grade de tamanhos esperada "
+                             "(padrão: a grade padrão)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        expected_sizes = load_sizes(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    matcher = None
+    if args.wire_rtt or args.client_csv:
+        matcher = WireRttMatcher(args.port)
+    try:
+        analysis = analyze_capture(args.captura, args.port,
+                                   matcher.add_frame if matcher else None)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {args.captura}: {e}")
+        return 1
+
+    joins = []
+    if matcher:
+        matcher.finish()
+        first_run = args.first_run - 1 if args.first_run else None
+        for spec in args.client_csv:
+            csv_path, _, client_ip = spec.partition("=")
+            try:
+                overhead, n_flows, used_run = join_host_overhead(
+                    matcher, csv_path, client_ip or None, first_run)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] {csv_path}: {e}")
+                continue
+            joins.append((csv_path, overhead, n_flows, used_run))
+            base = os.path.splitext(os.path.basename(csv_path))[0]
+            out_path = f"overhead_host_{base}.csv"
+            write_host_overhead(overhead, out_path)
+            print(f"[SUCCESS] Overhead do host salvo em {out_path}")
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        write_report(analysis, out, args.captura, args.capture_time, expected_sizes)
+        if matcher:
+            write_wire_report(matcher, joins, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.output:
+        print(f"[SUCCESS] Análise salva em {args.output}")
+    if args.wire_rtt:
+        write_wire_rtt(matcher, args.wire_rtt)
+        print(f"[SUCCESS] RTT no fio salvo em {args.wire_rtt}")
+    if args.timeseries:
+        write_timeseries(analysis, args.timeseries)
+        print(f"[SUCCESS] Série temporal salva em {args.timeseries}")
+    if args.summary:
+        print_summary(analysis)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,40 @@
 #!/usr/bin/env python3
 
+import argparse
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sqlite3
 import warnings
 warnings.filterwarnings('ignore')
 
+import experiment_spec
+import results_db
+
+parser = argparse.ArgumentParser(description="Gera os gráficos a partir das estatísticas")
+parser.add_argument("--db", metavar="ARQUIVO",
+                    help="lê as estatísticas do banco SQLite do analyze.py --db em vez dos CSVs")
+parser.add_argument("--analise", type=int, metavar="ID",
+                    help="com --db, usa a análise ID (padrão: a mais recente)")
+parser.add_argument("--spec", metavar="ARQUIVO",
+                    help="especificação do experimento com a grade de tamanhos a plotar "
+                         "(padrão: a grade padrão)")
+args = parser.parse_args()
+
+try:
+    TAMANHOS = list(experiment_spec.load_sizes(args.spec))
+except (OSError, ValueError) as e:
+    parser.error(str(e))
+
+DB = None
+if args.db:
+    if not os.path.exists(args.db):
+        parser.error(f"banco não encontrado: {args.db}")
+    DB = sqlite3.connect(args.db)
+
 print("="*60)
 print("Gerando gráficos interpretativos a partir dos dados de rede")
 print("="*60)
@@ -21,11 +47,21 @@ plt.rcParams['axes.labelsize'] = 11
 plt.rcParams['axes.titlesize'] = 12
 
 def verificar_arquivo(nome_arquivo):
+    if DB is not None and results_db.csv_name_key(nome_arquivo):
+        if results_db.latest_table(DB, nome_arquivo, args.analise) is not None:
+            return True
     return os.path.exists(nome_arquivo)
 
 def carregar_dados(arquivo):
     try:
-        df = pd.read_csv(arquivo)
+        tabela = None
+        if DB is not None and results_db.csv_name_key(arquivo):
+            tabela = results_db.latest_table(DB, arquivo, args.analise)
+        if tabela is not None:
+            colunas, linhas = tabela
+            df = pd.DataFrame(linhas, columns=colunas)
+        else:
+            df = pd.read_csv(arquivo)
         df = df.dropna()
         return df
     except Exception as e:
@@ -133,7 +169,7 @@ try:
         df = carregar_dados("stats_cliente1.csv")
         if df is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_filtrado = df[df['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -189,7 +225,7 @@ try:
         df = carregar_dados("stats_cliente1_100.csv")
         if df is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_filtrado = df[df['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -247,7 +283,7 @@ try:
         df_100 = carregar_dados("stats_network_100mbps.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -304,7 +340,7 @@ try:
             df_100 = carregar_dados("stats_cliente1_100.csv")
             if df_10 is not None and df_100 is not None:
                 # Definir tamanhos específicos de payload conforme solicitado
-                tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+                tamanhos_especificos = TAMANHOS
                 
                 # Filtrar apenas os tamanhos que existem nos dados
                 df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -361,7 +397,7 @@ try:
         df_100 = carregar_dados("stats_network_100mbps.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -413,7 +449,7 @@ try:
             df_100 = carregar_dados("stats_cliente1_100.csv")
             if df_10 is not None and df_100 is not None:
                 # Definir tamanhos específicos de payload conforme solicitado
-                tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+                tamanhos_especificos = TAMANHOS
                 
                 # Filtrar apenas os tamanhos que existem nos dados
                 df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -461,7 +497,7 @@ try:
         df_100 = carregar_dados("stats_network_100mbps.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -521,7 +557,7 @@ try:
             df_100 = carregar_dados("stats_cliente1_100.csv")
             if df_10 is not None and df_100 is not None:
                 # Definir tamanhos específicos de payload conforme solicitado
-                tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+                tamanhos_especificos = TAMANHOS
                 
                 # Filtrar apenas os tamanhos que existem nos dados
                 df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -582,7 +618,7 @@ try:
         df_100 = carregar_dados("stats_network_100mbps.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -645,7 +681,7 @@ try:
             df_100 = carregar_dados("stats_cliente1_100.csv")
             if df_10 is not None and df_100 is not None:
                 # Definir tamanhos específicos de payload conforme solicitado
-                tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+                tamanhos_especificos = TAMANHOS
                 
                 # Filtrar apenas os tamanhos que existem nos dados
                 df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -714,7 +750,7 @@ try:
         df_100 = carregar_dados("stats_network_100mbps.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_sub = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -831,7 +867,7 @@ try:
         df_100 = carregar_dados("stats_cliente1_100.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -880,7 +916,7 @@ try:
         df_100 = carregar_dados("stats_cliente2_100.csv")
         if df_10 is not None and df_100 is not None:
             # Definir tamanhos específicos de payload conforme solicitado
-            tamanhos_especificos = [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65507]
+            tamanhos_especificos = TAMANHOS
             
             # Filtrar apenas os tamanhos que existem nos dados
             df_10_filtrado = df_10[df_10['tamanho_bytes'].isin(tamanhos_especificos)]
@@ -970,70 +1006,232 @@ try:
 except Exception as e:
     print(f" Erro: {e}")
 
-print("\n12. Gerando: Análise de Saturação - RTT Normalizado")
+print("\n12. Gerando: Análise de Saturação - Ponto Detectado por Tamanho")
 try:
-    if (verificar_arquivo("stats_ramp_cliente1.csv") and 
-        verificar_arquivo("stats_ramp_cliente1_100.csv")):
-        df_10 = carregar_dados("stats_ramp_cliente1.csv")
-        df_100 = carregar_dados("stats_ramp_cliente1_100.csv")
-        if df_10 is not None and df_100 is not None:
-            fig, ax = plt.subplots(figsize=(12, 8))
-            ax.axhline(y=1.5, color='black', linestyle='--', linewidth=2, alpha=0.7)
-            ax.text(10, 1.6, 'Limiar de Saturação (150%)', ha='center', fontsize=10)
-            
-            nivel_col = 'nivel' if 'nivel' in df_10.columns else df_10.columns[1]
-            rtt_col = 'media_ms' if 'media_ms' in df_10.columns else df_10.columns[3]
-            
-            def normalizar_rtt(df, tamanho):
-                df_filtered = df[df['tamanho_bytes'] == tamanho].copy()
-                if df_filtered.empty:
-                    return pd.DataFrame()
-                base_rtt = df_filtered[rtt_col].iloc[0]
-                if base_rtt > 0:
-                    df_filtered['rtt_normalizado'] = df_filtered[rtt_col] / base_rtt
-                    return df_filtered
-                return pd.DataFrame()
-            
-            df_10_2b = normalizar_rtt(df_10, 2)
-            df_100_2b = normalizar_rtt(df_100, 2)
-            df_10_1k = normalizar_rtt(df_10, 1024)
-            df_100_1k = normalizar_rtt(df_100, 1024)
-            df_10_64k = normalizar_rtt(df_10, 65507)
-            df_100_64k = normalizar_rtt(df_100, 65507)
-            
-            if not df_10_2b.empty:
-                ax.scatter(df_10_2b[nivel_col], df_10_2b['rtt_normalizado'], 
-                          color='#D32F2F', s=50, alpha=0.7, label='10 Mbps - 2 bytes')
-            if not df_100_2b.empty:
-                ax.scatter(df_100_2b[nivel_col], df_100_2b['rtt_normalizado'], 
-                          color='#388E3C', s=50, alpha=0.7, label='100 Mbps - 2 bytes')
-            if not df_10_1k.empty:
-                ax.scatter(df_10_1k[nivel_col], df_10_1k['rtt_normalizado'], 
-                          color='#8BC34A', s=50, alpha=0.7, marker='s', label='10 Mbps - 1KB')
-            if not df_100_1k.empty:
-                ax.scatter(df_100_1k[nivel_col], df_100_1k['rtt_normalizado'], 
-                          color='#FF5722', s=50, alpha=0.7, marker='s', label='100 Mbps - 1KB')
-            if not df_10_64k.empty:
-                ax.scatter(df_10_64k[nivel_col], df_10_64k['rtt_normalizado'], 
-                          color='#9C27B0', s=50, alpha=0.7, marker='^', label='10 Mbps - 64KB')
-            if not df_100_64k.empty:
-                ax.scatter(df_100_64k[nivel_col], df_100_64k['rtt_normalizado'], 
-                          color='#FFC107', s=50, alpha=0.7, marker='^', label='100 Mbps - 64KB')
-            ax.set_xlim(0, 20)
-            ax.set_ylim(0, 2.5)
-            ax.set_title('Análise de Saturação: RTT Normalizado por Nível', 
-                        fontsize=14, fontweight='bold')
-            ax.set_xlabel('Nível da Rampa', fontsize=12)
-            ax.set_ylabel('RTT Normalizado (RTT/RTT_inicial)', fontsize=12)
-            ax.grid(True, alpha=0.3)
-            ax.set_xticks(range(0, 20, 2))
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.tight_layout()
-            plt.savefig('graficos/12_analise_saturacao.png', dpi=300, bbox_inches='tight')
-            plt.close()
-            print(" 12_analise_saturacao.png")
+    redes_sat = [("10 Mbps", "saturation_cliente1.csv", "stats_ramp_cliente1.csv", '#D32F2F', 'o'),
+                 ("100 Mbps", "saturation_cliente1_100.csv", "stats_ramp_cliente1_100.csv", '#0066CC', 's')]
+    redes_sat = [r for r in redes_sat if verificar_arquivo(r[1]) and verificar_arquivo(r[2])]
+    if redes_sat:
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
+        fig.suptitle('Análise de Saturação (joelho detectado pelo analyze.py)',
+                     fontsize=14, fontweight='bold')
+        nivel_max = 10
+
+        for rede, arq_sat, arq_stats, cor, marcador in redes_sat:
+            df_sat = pd.read_csv(arq_sat)
+            saturados = df_sat[df_sat['saturado'] == 'sim']
+            livres = df_sat[df_sat['saturado'] != 'sim']
+            if not saturados.empty:
+                erro = [saturados['nivel_saturacao'] - saturados['nivel_ic_inferior'],
+                        saturados['nivel_ic_superior'] - saturados['nivel_saturacao']]
+                ax1.errorbar(saturados['tamanho_bytes'], saturados['nivel_saturacao'],
+                             yerr=erro, fmt=marcador, color=cor, markersize=8,
+                             capsize=4, alpha=0.8, label=f'{rede} - saturou')
+            if not livres.empty:
+                ax1.scatter(livres['tamanho_bytes'], [nivel_max + 0.5] * len(livres),
+                            facecolors='none', edgecolors=cor, marker=marcador, s=70,
+                            label=f'{rede} - sem saturação')
+
+        ax1.axhline(y=nivel_max + 0.25, color='gray', linestyle=':', alpha=0.6)
+        ax1.set_xscale('log', base=2)
+        ax1.set_ylim(0, nivel_max + 1)
+        ax1.set_yticks(range(1, nivel_max + 1))
+        ax1.set_xlabel('Tamanho do Payload (bytes)', fontsize=12)
+        ax1.set_ylabel('Nível de Saturação (1=10 req/s → 10=100 req/s)', fontsize=12)
+        ax1.set_title('Nível em que o RTT deixa a linha de base (IC 95%)')
+        ax1.grid(True, alpha=0.3)
+        ax1.legend(fontsize=9)
+
+        # RTT normalizado pela linha de base ajustada, apenas na subida da rampa
+        rede, arq_sat, arq_stats, _, _ = redes_sat[0]
+        df_sat = pd.read_csv(arq_sat).set_index('tamanho_bytes')
+        df_stats = carregar_dados(arq_stats)
+        df_stats = df_stats[df_stats['nivel'] <= nivel_max]
+        cores = plt.cm.viridis(np.linspace(0, 1, len(df_sat)))
+        for cor, (tamanho, linha) in zip(cores, df_sat.iterrows()):
+            serie = df_stats[df_stats['tamanho_bytes'] == tamanho].sort_values('nivel')
+            if serie.empty or linha['rtt_base_ms'] <= 0:
+                continue
+            normalizado = serie['media_ms'] / linha['rtt_base_ms']
+            ax2.plot(serie['nivel'], normalizado, color=cor, alpha=0.8,
+                     label=formatar_bytes(int(tamanho)))
+            if linha['saturado'] == 'sim':
+                nivel_sat = int(linha['nivel_saturacao'])
+                ponto = serie[serie['nivel'] == nivel_sat]
+                if not ponto.empty:
+                    ax2.scatter(nivel_sat, ponto['media_ms'].iloc[0] / linha['rtt_base_ms'],
+                                color=cor, marker='X', s=120, edgecolors='black', zorder=5)
+        ax2.axhline(y=1.0, color='black', linestyle='--', alpha=0.5)
+        ax2.set_xticks(range(1, nivel_max + 1))
+        ax2.set_xlabel('Nível da Rampa (subida)', fontsize=12)
+        ax2.set_ylabel('RTT / RTT de base ajustado', fontsize=12)
+        ax2.set_title(f'RTT normalizado - Cliente 1, {rede} (X = saturação)')
+        ax2.grid(True, alpha=0.3)
+        ax2.legend(bbox_to_anchor=(1.02, 1), loc='upper left', fontsize=8, ncol=1)
+
+        plt.tight_layout()
+        plt.savefig('graficos/12_analise_saturacao.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        print(" 12_analise_saturacao.png")
+    else:
+        print(" Arquivos saturation_cliente1*.csv não encontrados (execute analyze.py --saturation)")
+except Exception as e:
+    print(f" Erro: {e}")
+
+print("\n13. Gerando: Padrão de Perdas - Rajadas e Modelo de Gilbert-Elliott")
+try:
+    redes_perda = [("10 Mbps", "loss_cliente1.csv", "loss_hist_cliente1.csv", '#D32F2F', 'o'),
+                   ("100 Mbps", "loss_cliente1_100.csv", "loss_hist_cliente1_100.csv", '#0066CC', 's')]
+    redes_perda = [r for r in redes_perda if verificar_arquivo(r[1]) and verificar_arquivo(r[2])]
+    if redes_perda:
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
+        fig.suptitle('Padrão de Perdas - Cliente 1 (timeouts em ordem de envio)',
+                     fontsize=14, fontweight='bold')
+        maior_taxa = 0.0
+        menor_fracao = 1.0
+
+        for rede, arq_resumo, arq_hist, cor, marcador in redes_perda:
+            df_resumo = pd.read_csv(arq_resumo)
+            df_hist = pd.read_csv(arq_hist)
+            rajadas = df_hist[df_hist['tipo'] == 'rajada'].groupby('comprimento')['contagem'].sum()
+            if not rajadas.empty:
+                # Fração das rajadas com comprimento >= L, comparada com perdas independentes
+                ccdf = rajadas[::-1].cumsum()[::-1] / rajadas.sum()
+                menor_fracao = min(menor_fracao, ccdf.min())
+                ax1.step(ccdf.index, ccdf.values, where='post', color=cor, linewidth=2,
+                         label=f'{rede} - observado')
+                taxa = df_resumo['n_perdas'].sum() / df_resumo['n_envios'].sum()
+                comprimentos = np.arange(1, int(ccdf.index.max()) + 1)
+                ax1.plot(comprimentos, taxa ** (comprimentos - 1), color=cor, linestyle=':',
+                         alpha=0.7, label=f'{rede} - perdas independentes')
+
+            com_perda = df_resumo[df_resumo['n_perdas'] > 0]
+            if not com_perda.empty:
+                ax2.scatter(com_perda['taxa_perda_%'], com_perda['p_perda_apos_perda'] * 100,
+                            s=40 + 4 * com_perda['n_perdas'].clip(upper=100), color=cor,
+                            marker=marcador, alpha=0.7, edgecolors='black', label=rede)
+                for _, linha in com_perda.iterrows():
+                    ax2.annotate(formatar_bytes(int(linha['tamanho_bytes'])),
+                                 (linha['taxa_perda_%'], linha['p_perda_apos_perda'] * 100),
+                                 textcoords='offset points', xytext=(5, 5), fontsize=8)
+                maior_taxa = max(maior_taxa, com_perda['taxa_perda_%'].max())
+
+        ax1.set_yscale('log')
+        ax1.set_ylim(menor_fracao / 10, 1.5)
+        ax1.set_xlabel('Comprimento da rajada L (envios perdidos seguidos)', fontsize=12)
+        ax1.set_ylabel('Fração das rajadas com comprimento ≥ L', fontsize=12)
+        ax1.set_title('Distribuição do comprimento das rajadas')
+        ax1.grid(True, alpha=0.3, which='both')
+        ax1.legend(fontsize=9)
+
+        limite = max(maior_taxa * 1.2, 1.0)
+        ax2.plot([0, limite], [0, limite], color='gray', linestyle='--',
+                 label='perdas independentes')
+        ax2.set_xlim(0, limite)
+        ax2.set_xlabel('Taxa de perda (%)', fontsize=12)
+        ax2.set_ylabel('P(perda | perda anterior) (%)', fontsize=12)
+        ax2.set_title('Agrupamento por tamanho (acima da diagonal = rajadas)')
+        ax2.grid(True, alpha=0.3)
+        ax2.legend(fontsize=9)
+
+        plt.tight_layout()
+        plt.savefig('graficos/13_padrao_perdas.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        print(" 13_padrao_perdas.png")
+    else:
+        print(" Arquivos loss_cliente1*.csv não encontrados (execute analyze.py --loss)")
+except Exception as e:
+    print(f" Erro: {e}")
+
+print("\n14. Gerando: Contenção entre Execuções Simultâneas (--send-ts)")
+try:
+    redes_contencao = [("10 Mbps", "contention_cliente1.csv", '-', 'o'),
+                       ("100 Mbps", "contention_cliente1_100.csv", '--', 's')]
+    redes_contencao = [r for r in redes_contencao if verificar_arquivo(r[1])]
+    if redes_contencao:
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
+        fig.suptitle('Carga Concorrente - Cliente 1 (execuções simultâneas no mesmo host)',
+                     fontsize=14, fontweight='bold')
+        cores = plt.cm.viridis(np.linspace(0, 0.9, len(TAMANHOS)))
+        cor_tamanho = dict(zip(TAMANHOS, cores))
+
+        for rede, arquivo, estilo, marcador in redes_contencao:
+            df = pd.read_csv(arquivo)
+            df = df[df['tamanho_bytes'].isin(TAMANHOS)]
+            # Só as classes com amostras suficientes para a mediana fazer sentido
+            df = df[df['n_validos'] >= 30]
+            tamanhos_rede = sorted(df['tamanho_bytes'].unique())
+            if len(tamanhos_rede) > 4:
+                tamanhos_rede = [tamanhos_rede[i] for i in
+                                 np.linspace(0, len(tamanhos_rede) - 1, 4).astype(int)]
+            for tamanho in tamanhos_rede:
+                dados = df[df['tamanho_bytes'] == tamanho].sort_values('instancias_ativas')
+                ax1.plot(dados['instancias_ativas'], dados['mediana_ms'], linestyle=estilo,
+                         marker=marcador, color=cor_tamanho[tamanho], linewidth=2,
+                         label=f'{rede} - {formatar_bytes(tamanho)}')
+            ax2.scatter(df['carga_media_mbps'], df['taxa_perda_%'], marker=marcador,
+                        s=30 + 10 * df['instancias_ativas'], alpha=0.7, edgecolors='black',
+                        c=[cor_tamanho[t] for t in df['tamanho_bytes']], label=rede)
+
+        ax1.set_yscale('log')
+        ax1.set_xlabel('Execuções ativas na janela do envio', fontsize=12)
+        ax1.set_ylabel('RTT mediano (ms)', fontsize=12)
+        ax1.set_title('RTT x número de execuções simultâneas')
+        ax1.xaxis.set_major_locator(matplotlib.ticker.MaxNLocator(integer=True))
+        ax1.grid(True, alpha=0.3, which='both')
+        ax1.legend(fontsize=8)
+
+        ax2.set_xlabel('Carga oferecida por todas as execuções (Mbps)', fontsize=12)
+        ax2.set_ylabel('Taxa de perda (%)', fontsize=12)
+        ax2.set_title('Perda x carga agregada (cor = tamanho, área = execuções ativas)')
+        ax2.grid(True, alpha=0.3)
+        ax2.legend(fontsize=9)
+
+        plt.tight_layout()
+        plt.savefig('graficos/14_contencao_execucoes.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        print(" 14_contencao_execucoes.png")
+    else:
+        print(" Arquivos contention_cliente1*.csv não encontrados "
+              "(clientes com --send-ts e analyze.py --contention)")
+except Exception as e:
+    print(f" Erro: {e}")
+
+print("\n15. Gerando: Tempo no Servidor x Rede (--dwell)")
+try:
+    redes_dwell = [("10 Mbps", "dwell_cliente1.csv"), ("100 Mbps", "dwell_cliente1_100.csv")]
+    redes_dwell = [r for r in redes_dwell if verificar_arquivo(r[1])]
+    if redes_dwell:
+        fig, eixos = plt.subplots(1, len(redes_dwell), figsize=(8 * len(redes_dwell), 7),
+                                  squeeze=False)
+        fig.suptitle('Decomposição do RTT - Cliente 1 (tempo no servidor x restante)',
+                     fontsize=14, fontweight='bold')
+        for ax, (rede, arquivo) in zip(eixos[0], redes_dwell):
+            df = pd.read_csv(arquivo)
+            df = df[df['tamanho_bytes'].isin(TAMANHOS)].sort_values('tamanho_bytes')
+            x = np.arange(len(df))
+            ax.bar(x, df['rede_mediana_ms'], color='#0066CC', alpha=0.8,
+                   label='Rede e pilhas (mediana)')
+            ax.bar(x, df['dwell_mediana_ms'], bottom=df['rede_mediana_ms'], color='#FF6B35',
+                   alpha=0.8, label='Servidor (mediana)')
+            ax.plot(x, df['rede_mediana_ms'] + df['dwell_p99_ms'], color='#D32F2F', marker='v',
+                    linestyle='--', label='Servidor (P99) sobre a rede (mediana)')
+            ax.set_xticks(x)
+            ax.set_xticklabels([formatar_bytes(int(t)) for t in df['tamanho_bytes']],
+                               rotation=45, ha='right')
+            ax.set_xlabel('Tamanho do payload', fontsize=12)
+            ax.set_ylabel('Tempo (ms)', fontsize=12)
+            ax.set_title(rede)
+            ax.grid(True, alpha=0.3, axis='y')
+            ax.legend(fontsize=9)
+
+        plt.tight_layout()
+        plt.savefig('graficos/15_tempo_servidor.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        print(" 15_tempo_servidor.png")
     else:
-        print(" Arquivos de rampa não encontrados")
+        print(" Arquivos dwell_cliente1*.csv não encontrados "
+              "(server_udp e clientes com --dwell e analyze.py --dwell)")
 except Exception as e:
     print(f" Erro: {e}")
 
@@ -1052,7 +1250,10 @@ graficos_gerados = [
     '09_cliente2_comparacao_rede.png',
     '10_ramp_cliente1_rtt_carga.png',
     '11_ramp_perda_vs_nivel.png',
-    '12_analise_saturacao.png'
+    '12_analise_saturacao.png',
+    '13_padrao_perdas.png',
+    '14_contencao_execucoes.png',
+    '15_tempo_servidor.png'
 ]
 
 total_gerados = 0
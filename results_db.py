@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banco SQLite com o histórico dos resultados do analyze.py.
+
+Cada execução de "analyze.py --db ARQ" vira uma análise (data, commit do git,
+argumentos); cada CSV de estatísticas gerado nela vira uma execução (tipo,
+rede, cliente, arquivo de origem, número de instâncias) com as linhas por
+tamanho/nível. O plot.py consulta o banco com "--db ARQ" no lugar dos CSVs.
+
+Uso:
+    python3 results_db.py resultados.db          # lista o histórico de análises
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# Colunas dos CSVs => colunas do banco (sem caracteres especiais)
+_COLUMN_NAMES = {
+    "taxa_perda_%": "taxa_perda_pct",
+    "taxa_perda_agregada_%": "taxa_perda_agregada_pct",
+}
+_CSV_NAMES = {v: k for k, v in _COLUMN_NAMES.items()}
+
+STATS_COLUMNS = (
+    "tamanho_bytes", "nivel", "n_validos", "media_ms", "mediana_ms", "dp_ms",
+    "jitter_ms", "ic_lower_ms", "ic_upper_ms", "p95_ms", "p99_ms", "min_ms",
+    "max_ms", "taxa_perda_pct", "num_outliers", "rtt_ms",
+)
+# ICs bootstrap (analyze.py --bootstrap); vazios quando o bootstrap não foi pedido
+BOOTSTRAP_COLUMNS = (
+    "media_bs_inf_ms", "media_bs_sup_ms", "mediana_bs_inf_ms", "mediana_bs_sup_ms",
+    "p95_bs_inf_ms", "p95_bs_sup_ms", "p99_bs_inf_ms", "p99_bs_sup_ms",
+)
+NETWORK_COLUMNS = (
+    "tamanho_bytes", "media_agregada_ms", "mediana_agregada_ms", "p95_agregado_ms",
+    "p99_agregado_ms", "jitter_agregado_ms", "taxa_perda_agregada_pct",
+    "dp_perda_agregada", "n_total_amostras", "rtt_ms", "dp_agregado_ms",
+)
+
+# Histogramas de RTT em escala logarítmica: 1 µs a 10 s, 1000 classes por década
+# (largura relativa de ~0,23%, suficiente para comparar percentis entre execuções)
+HIST_MIN_MS = 1e-3
+HIST_DECADES = 7
+HIST_BINS_PER_DECADE = 1000
+HIST_BINS = HIST_DECADES * HIST_BINS_PER_DECADE
+
+
+def hist_bin(rtts_ms):
+    """Índice da classe de cada RTT (valores fora da faixa vão para as pontas)."""
+    idx = np.floor(np.log10(np.maximum(rtts_ms, HIST_MIN_MS) / HIST_MIN_MS)
+                   * HIST_BINS_PER_DECADE)
+    return np.clip(idx, 0, HIST_BINS - 1).astype(np.int64)
+
+
+def hist_center(idx):
+    """Centro geométrico de cada classe, em ms."""
+    return HIST_MIN_MS * 10 ** ((np.asarray(idx) + 0.5) / HIST_BINS_PER_DECADE)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analises (
+    id          INTEGER PRIMARY KEY,
+    criado_em   TEXT NOT NULL,
+    git_commit  TEXT,
+    argumentos  TEXT
+);
+CREATE TABLE IF NOT EXISTS execucoes (
+    id             INTEGER PRIMARY KEY,
+    analise_id     INTEGER NOT NULL REFERENCES analises(id),
+    tipo           TEXT NOT NULL,      -- 'tamanho', 'rampa', 'rampa_agregada' ou 'rede'
+    rede           TEXT NOT NULL,      -- '10' ou '100'
+    cliente        TEXT,               -- NULL nas estatísticas agregadas por rede
+    arquivo_origem TEXT,
+    n_instancias   INTEGER
+);
+CREATE TABLE IF NOT EXISTS estatisticas (
+    execucao_id   INTEGER NOT NULL REFERENCES execucoes(id),
+    tamanho_bytes INTEGER NOT NULL,
+    nivel         INTEGER,             -- NULL no experimento 1
+    n_validos     INTEGER,
+    media_ms REAL, mediana_ms REAL, dp_ms REAL, jitter_ms REAL,
+    ic_lower_ms REAL, ic_upper_ms REAL, p95_ms REAL, p99_ms REAL,
+    min_ms REAL, max_ms REAL, taxa_perda_pct REAL, num_outliers INTEGER,
+    rtt_ms REAL,
+    media_bs_inf_ms REAL, media_bs_sup_ms REAL, mediana_bs_inf_ms REAL, mediana_bs_sup_ms REAL,
+    p95_bs_inf_ms REAL, p95_bs_sup_ms REAL, p99_bs_inf_ms REAL, p99_bs_sup_ms REAL
+);
+CREATE TABLE IF NOT EXISTS estatisticas_rede (
+    execucao_id   INTEGER NOT NULL REFERENCES execucoes(id),
+    tamanho_bytes INTEGER NOT NULL,
+    media_agregada_ms REAL, mediana_agregada_ms REAL, p95_agregado_ms REAL,
+    p99_agregado_ms REAL, jitter_agregado_ms REAL, taxa_perda_agregada_pct REAL,
+    dp_perda_agregada REAL, n_total_amostras INTEGER, rtt_ms REAL, dp_agregado_ms REAL
+);
+CREATE TABLE IF NOT EXISTS histogramas (
+    execucao_id   INTEGER NOT NULL REFERENCES execucoes(id),
+    tamanho_bytes INTEGER NOT NULL,
+    nivel         INTEGER,
+    perdidos      INTEGER NOT NULL,    -- timeouts (rtt < 0)
+    classes       BLOB NOT NULL,       -- índices das classes não vazias (int32)
+    contagens     BLOB NOT NULL        -- contagem de cada classe (int64)
+);
+CREATE INDEX IF NOT EXISTS idx_execucoes_rede
+    ON execucoes (rede, tipo, cliente, analise_id);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_execucao
+    ON estatisticas (execucao_id, tamanho_bytes, nivel);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_rede_execucao
+    ON estatisticas_rede (execucao_id, tamanho_bytes);
+CREATE INDEX IF NOT EXISTS idx_histogramas_execucao
+    ON histogramas (execucao_id, tamanho_bytes, nivel);
+"""
+
+# stats_cliente1.csv, stats_ramp_cliente2_100.csv, stats_network_10mbps.csv,
+# stats_ramp_aggregated_clientes_100mbps.csv
+_CSV_PATTERN = re.compile(
+    r"^stats_(?:(?P<ramp>ramp_)?(?P<cliente>cliente\d+)(?P<c100>_100)?|network_(?P<rede>10|100)mbps"
+    r"|ramp_aggregated_clientes_(?P<rede_rampa>10|100)mbps)\.csv$")
+
+
+def csv_name_key(filename):
+    """Nome de CSV de estatísticas => (tipo, rede, cliente), ou None."""
+    m = _CSV_PATTERN.match(os.path.basename(filename))
+    if not m:
+        return None
+    if m.group("rede"):
+        return "rede", m.group("rede"), None
+    if m.group("rede_rampa"):
+        return "rampa_agregada", m.group("rede_rampa"), None
+    tipo = "rampa" if m.group("ramp") else "tamanho"
+    return tipo, "100" if m.group("c100") else "10", m.group("cliente")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    # Bancos criados antes das colunas de bootstrap
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(estatisticas)")}
+    for column in BOOTSTRAP_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE estatisticas ADD COLUMN {column} REAL")
+    return conn
+
+
+class ResultsDB:
+    """Grava as tabelas de uma execução do analyze.py como uma nova análise."""
+
+    def __init__(self, path, argumentos=""):
+        self.path = path
+        self.conn = connect(path)
+        cur = self.conn.execute(
+            "INSERT INTO analises (criado_em, git_commit, argumentos) VALUES (?, ?, ?)",
+            (datetime.now().isoformat(timespec="seconds"), git_commit(), argumentos))
+        self.analise_id = cur.lastrowid
+
+    def add_table(self, filename, header, rows, arquivo_origem=None, n_instancias=None):
+        """
+        Registra as linhas de um CSV de estatísticas (mesmo header e valores
+        escritos no arquivo). O nome do CSV define tipo, rede e cliente.
+        Retorna o id da execução.
+        """
+        key = csv_name_key(filename)
+        if key is None:
+            raise ValueError(f"nome de CSV não reconhecido: {filename}")
+        tipo, rede, cliente = key
+        cur = self.conn.execute(
+            "INSERT INTO execucoes (analise_id, tipo, rede, cliente, arquivo_origem, n_instancias) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.analise_id, tipo, rede, cliente, arquivo_origem, n_instancias))
+        table, allowed = (("estatisticas_rede", NETWORK_COLUMNS) if tipo == "rede"
+                          else ("estatisticas", STATS_COLUMNS + BOOTSTRAP_COLUMNS))
+        columns = [_COLUMN_NAMES.get(c, c) for c in header]
+        keep = [i for i, c in enumerate(columns) if c in allowed]
+        names = ", ".join(["execucao_id"] + [columns[i] for i in keep])
+        marks = ", ".join("?" * (len(keep) + 1))
+        self.conn.executemany(
+            f"INSERT INTO {table} ({names}) VALUES ({marks})",
+            ([cur.lastrowid] + [row[i] for i in keep] for row in rows))
+        self.conn.commit()
+        return cur.lastrowid
+
+    def add_histograms(self, execucao_id, data, total_per_key):
+        """
+        Guarda o histograma dos RTTs válidos de cada chave (tamanho ou
+        (tamanho, nivel)) e o número de timeouts, para comparações futuras
+        sem os arquivos brutos (compare_runs.py).
+        """
+        rows = []
+        for key in sorted(total_per_key):
+            size, nivel = key if isinstance(key, tuple) else (key, None)
+            rtts = np.asarray(data.get(key, ()), dtype=np.float64)
+            counts = np.bincount(hist_bin(rtts), minlength=HIST_BINS)
+            classes = np.flatnonzero(counts)
+            rows.append((execucao_id, size, nivel, total_per_key[key] - rtts.size,
+                         classes.astype("<i4").tobytes(),
+                         counts[classes].astype("<i8").tobytes()))
+        self.conn.executemany(
+            "INSERT INTO histogramas (execucao_id, tamanho_bytes, nivel, perdidos, classes, "
+            "contagens) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def _latest_execution(conn, filename, analise_id=None):
+    key = csv_name_key(filename)
+    if key is None:
+        return None, None
+    tipo, rede, cliente = key
+    row = conn.execute(
+        "SELECT id FROM execucoes WHERE rede = ? AND tipo = ? AND cliente IS ? "
+        "AND analise_id <= ? ORDER BY analise_id DESC, id DESC LIMIT 1",
+        (rede, tipo, cliente, analise_id if analise_id is not None else sys.maxsize)).fetchone()
+    return (row[0] if row else None), tipo
+
+
+def load_histograms(conn, filename, analise_id=None):
+    """
+    Histogramas gravados para o CSV equivalente na análise escolhida:
+    {(tamanho, nivel ou 0): (contagens[HIST_BINS], perdidos)} ou None.
+    """
+    execucao_id, _ = _latest_execution(conn, filename, analise_id)
+    if execucao_id is None:
+        return None
+    result = {}
+    for size, nivel, lost, classes, counts in conn.execute(
+            "SELECT tamanho_bytes, nivel, perdidos, classes, contagens FROM histogramas "
+            "WHERE execucao_id = ?", (execucao_id,)):
+        hist = np.zeros(HIST_BINS, dtype=np.int64)
+        hist[np.frombuffer(classes, dtype="<i4")] = np.frombuffer(counts, dtype="<i8")
+        result[(size, nivel or 0)] = (hist, lost)
+    return result or None
+
+
+def latest_table(conn, filename, analise_id=None):
+    """
+    Linhas do CSV equivalente na análise mais recente (ou na mais recente até
+    analise_id) que o contém. Retorna (colunas no formato do CSV, linhas) ou None.
+    """
+    execucao_id, tipo = _latest_execution(conn, filename, analise_id)
+    if execucao_id is None:
+        return None
+
+    if tipo == "rede":
+        table, columns = "estatisticas_rede", list(NETWORK_COLUMNS)
+    else:
+        table, columns = "estatisticas", list(STATS_COLUMNS)
+        if tipo == "tamanho":
+            columns.remove("nivel")
+        has_bootstrap = conn.execute(
+            "SELECT 1 FROM estatisticas WHERE execucao_id = ? AND media_bs_inf_ms IS NOT NULL "
+            "LIMIT 1", (execucao_id,)).fetchone()
+        if has_bootstrap:
+            columns += BOOTSTRAP_COLUMNS
+    order = "tamanho_bytes, nivel" if tipo in ("rampa", "rampa_agregada") else "tamanho_bytes"
+    rows = conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE execucao_id = ? ORDER BY {order}",
+        (execucao_id,)).fetchall()
+    return [_CSV_NAMES.get(c, c) for c in columns], rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de análises no banco de resultados")
+    parser.add_argument("banco", help="arquivo SQLite gerado por analyze.py --db")
+    args = parser.parse_args()
+    if not os.path.exists(args.banco):
+        print(f"[ERROR] Banco não encontrado: {args.banco}")
+        return 1
+
+    conn = connect(args.banco)
+    query = """
+        SELECT a.id, a.criado_em, COALESCE(a.git_commit, '-'),
+               GROUP_CONCAT(e.tipo || ':' || e.rede || ':' || COALESCE(e.cliente, 'rede'), ' ')
+        FROM analises a LEFT JOIN execucoes e ON e.analise_id = a.id
+        GROUP BY a.id ORDER BY a.id
+    """
+    print("ID | Data                | Commit   | Tabelas")
+    for analise_id, criado_em, commit, tabelas in conn.execute(query):
+        print(f"{analise_id:>2} | {criado_em} | {commit:<8} | {tabelas or '-'}")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitor do arquivo de estatísticas ao vivo do server_udp (--stats-file).
+
+O servidor mantém o arquivo mapeado em memória e o reescreve a cada
+--stats-interval ms; este módulo copia o conteúdo de forma consistente
+(seqlock) e devolve um dicionário com os contadores.
+
+Uso:
+    python3 server_stats.py server_stats.bin            # instantâneo
+    python3 server_stats.py server_stats.bin --follow   # atualiza a cada segundo
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+STATS_MAGIC = b"UDPSTAT1"
+STATS_VERSION = 1
+MAX_BUFFER = 65536
+
+# Espelha struct stats_file em server_udp.c (little-endian, sem padding)
+_HEADER = struct.Struct("<8sIIQQQQQQQQQQQdd")
+_HEADER_FIELDS = (
+    "magic", "version", "num_workers", "seq", "start_ns", "update_ns",
+    "interval_ms", "packets_in", "packets_out", "bytes_in", "bytes_out",
+    "send_errors", "short_sends", "recv_errors", "rate_in_pps", "rate_out_pps",
+)
+STATS_FILE_SIZE = _HEADER.size + 8 * MAX_BUFFER
+_SEQ_OFFSET = 16
+
+
+def _snapshot(mm, retries=100):
+    """Copia o arquivo inteiro quando seq está par e igual antes e depois."""
+    for _ in range(retries):
+        seq_before = struct.unpack_from("<Q", mm, _SEQ_OFFSET)[0]
+        if seq_before % 2 == 0:
+            data = mm[:STATS_FILE_SIZE]
+            seq_after = struct.unpack_from("<Q", mm, _SEQ_OFFSET)[0]
+            if seq_before == seq_after:
+                return data
+        time.sleep(0.001)
+    raise RuntimeError("arquivo de estatísticas em atualização contínua")
+
+
+def read_server_stats(path):
+    """
+    Lê o arquivo de estatísticas do servidor.
+    Retorna dict com os contadores globais e 'size_count' = {tamanho: pacotes}
+    (somente tamanhos com pelo menos um pacote recebido).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < STATS_FILE_SIZE:
+            raise ValueError(f"{path}: arquivo menor que o esperado")
+        with mmap.mmap(f.fileno(), STATS_FILE_SIZE, access=mmap.ACCESS_READ) as mm:
+            data = _snapshot(mm)
+
+    stats = dict(zip(_HEADER_FIELDS, _HEADER.unpack_from(data, 0)))
+    if stats["magic"] != STATS_MAGIC:
+        raise ValueError(f"{path}: não é um arquivo de estatísticas do server_udp")
+    if stats["version"] != STATS_VERSION:
+        raise ValueError(f"{path}: versão {stats['version']} não suportada")
+
+    counts = array("Q")
+    counts.frombytes(data[_HEADER.size:])
+    if sys.byteorder != "little":
+        counts.byteswap()
+    stats["size_count"] = {size: n for size, n in enumerate(counts) if n}
+    return stats
+
+
+def format_stats(stats):
+    elapsed = (stats["update_ns"] - stats["start_ns"]) / 1e9
+    lines = [
+        f"Workers: {stats['num_workers']}   Tempo ativo: {elapsed:.1f} s",
+        f"Recebidos: {stats['packets_in']} pacotes ({stats['bytes_in']} bytes)",
+        f"Enviados:  {stats['packets_out']} pacotes ({stats['bytes_out']} bytes)",
+        f"Taxa (última amostra): entrada {stats['rate_in_pps']:.0f} pkt/s, "
+        f"saída {stats['rate_out_pps']:.0f} pkt/s",
+        f"Erros de envio: {stats['send_errors']}   Envios parciais: {stats['short_sends']}   "
+        f"Erros de recepção: {stats['recv_errors']}",
+        "Tamanho (bytes) | Pacotes",
+    ]
+    for size in sorted(stats["size_count"]):
+        lines.append(f"{size:>15} | {stats['size_count'][size]}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lê as estatísticas ao vivo do server_udp")
+    parser.add_argument("arquivo", help="arquivo passado em --stats-file")
+    parser.add_argument("--follow", action="store_true",
+                        help="reimprime a cada intervalo até Ctrl+C")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="intervalo de atualização em segundos (padrão: 1)")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            stats = read_server_stats(args.arquivo)
+            print(format_stats(stats))
+            if not args.follow:
+                break
+            print("-" * 40)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
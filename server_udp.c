@@ -1,30 +1,135 @@
+#define _GNU_SOURCE
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <unistd.h>
 #include <errno.h>
+#include <fcntl.h>
+#include <getopt.h>
+#include <pthread.h>
+#include <sched.h>
+#include <time.h>
+#include <stdint.h>
+#include <stddef.h>
 #include <arpa/inet.h>
+#include <sys/mman.h>
 #include <sys/socket.h>
 #include <signal.h>
 
 #define MAX_BUFFER 65536
+#define MAX_WORKERS 64
+#define MAX_BATCH 256
+#define BUSY_POLL_US 50
+#define STATS_MAGIC "UDPSTAT1"
+#define STATS_VERSION 1
+#define DWELL_HEADER 16
 
-static volatile int running = 1;
-static int server_sockfd = -1;
+#define COUNT_ADD(field, n) __atomic_fetch_add(&(field), (uint64_t)(n), __ATOMIC_RELAXED)
+#define COUNT_LOAD(field) __atomic_load_n(&(field), __ATOMIC_RELAXED)
+
+/* Contadores de um worker: escritos só pela thread dona, lidos pela thread de estatísticas */
+struct counters
+{
+    uint64_t packets_in;
+    uint64_t packets_out;
+    uint64_t bytes_in;
+    uint64_t bytes_out;
+    uint64_t send_errors;
+    uint64_t short_sends;
+    uint64_t recv_errors;
+    uint64_t size_count[MAX_BUFFER];
+};
+
+/*
+ * Layout do arquivo de estatísticas (--stats-file), lido por server_stats.py.
+ * Todos os campos são little-endian; seq é ímpar enquanto o arquivo está sendo
+ * atualizado (seqlock), então o leitor repete a cópia até ver o mesmo valor par
+ * antes e depois.
+ */
+struct stats_file
+{
+    char magic[8];
+    uint32_t version;
+    uint32_t num_workers;
+    uint64_t seq;
+    uint64_t start_ns;
+    uint64_t update_ns;
+    uint64_t interval_ms;
+    uint64_t packets_in;
+    uint64_t packets_out;
+    uint64_t bytes_in;
+    uint64_t bytes_out;
+    uint64_t send_errors;
+    uint64_t short_sends;
+    uint64_t recv_errors;
+    double rate_in_pps;
+    double rate_out_pps;
+    uint64_t size_count[MAX_BUFFER];
+};
+
+struct worker
+{
+    int id;
+    int sockfd;
+    int cpu;
+    pthread_t thread;
+    unsigned long packet_count;
+    unsigned long error_count;
+    struct timespec first_packet;
+    struct timespec last_packet;
+    struct counters *stats;
+};
+
+struct batch
+{
+    int size;
+    unsigned char *buffers;
+    unsigned char *controls;
+    struct mmsghdr *msgs;
+    struct iovec *iovecs;
+    struct sockaddr_in *addrs;
+};
+
+static volatile sig_atomic_t running = 1;
+static struct worker workers[MAX_WORKERS];
+static int num_workers = 1;
+static int batch_size = 1;
+static const char *stats_path = NULL;
+static int stats_interval_ms = 1000;
+static int low_jitter = 0;
+/*
+ * --dwell: os primeiros DWELL_HEADER bytes do eco (datagramas de pelo menos
+ * esse tamanho) levam dois instantes em ns, big-endian, do relógio do
+ * servidor: chegada ao socket (SO_TIMESTAMPNS do kernel, ou a volta do
+ * recvfrom se o kernel não fornecer) e envio do eco. Os dois são
+ * CLOCK_REALTIME porque o timestamp do kernel vem nesse relógio; o cliente
+ * só usa a diferença, o tempo do datagrama dentro do servidor.
+ */
+static int dwell = 0;
+#define DWELL_CONTROL CMSG_SPACE(sizeof(struct timespec))
+
+/* Configurações do modo --low-jitter efetivamente aceitas pelo sistema */
+static int lj_mlocked = 0;
+static int lj_nonblocking = 1;
+static int lj_busy_poll = 1;
 
 static void signal_handler(int sig)
 {
     printf("\n[SERVER] Recebido sinal %d, parando servidor...\n", sig);
     running = 0;
-    if (server_sockfd >= 0)
+    /* shutdown() acorda as threads bloqueadas em recvfrom sem liberar o fd */
+    for (int i = 0; i < num_workers; i++)
     {
-        close(server_sockfd);
-        server_sockfd = -1;
+        if (workers[i].sockfd >= 0)
+        {
+            shutdown(workers[i].sockfd, SHUT_RDWR);
+        }
     }
 }
 
-static int setup_socket(const char *listen_ip, int port)
+static int setup_socket(const char *listen_ip, int port, int worker_id)
 {
+    int verbose = (worker_id == 0);
     int sockfd = socket(AF_INET, SOCK_DGRAM, 0);
     if (sockfd < 0)
     {
@@ -42,6 +147,13 @@ static int setup_socket(const char *listen_ip, int port)
 
     if (setsockopt(sockfd, SOL_SOCKET, SO_REUSEPORT, &opt, sizeof(opt)) < 0)
     {
+        if (num_workers > 1)
+        {
+            /* Sem SO_REUSEPORT o kernel não distribui datagramas entre os workers */
+            perror("setsockopt SO_REUSEPORT");
+            close(sockfd);
+            return -1;
+        }
         perror("setsockopt SO_REUSEPORT (ignorando erro)");
     }
 
@@ -51,6 +163,31 @@ static int setup_socket(const char *listen_ip, int port)
         perror("setsockopt SO_RCVBUF (ignorando erro)");
     }
 
+    if (dwell && setsockopt(sockfd, SOL_SOCKET, SO_TIMESTAMPNS, &opt, sizeof(opt)) < 0 && verbose)
+    {
+        perror("setsockopt SO_TIMESTAMPNS (chegada medida na volta do recvfrom)");
+    }
+
+    if (low_jitter)
+    {
+        /* Workers giram em recvfrom não bloqueante em vez de dormir no kernel */
+        int flags = fcntl(sockfd, F_GETFL, 0);
+        if (flags < 0 || fcntl(sockfd, F_SETFL, flags | O_NONBLOCK) < 0)
+        {
+            perror("fcntl O_NONBLOCK (ignorando erro)");
+            lj_nonblocking = 0;
+        }
+        int busy_us = BUSY_POLL_US;
+        if (setsockopt(sockfd, SOL_SOCKET, SO_BUSY_POLL, &busy_us, sizeof(busy_us)) < 0)
+        {
+            if (verbose)
+            {
+                perror("setsockopt SO_BUSY_POLL (ignorando erro)");
+            }
+            lj_busy_poll = 0;
+        }
+    }
+
     struct timeval tv;
     tv.tv_sec = 5;
     tv.tv_usec = 0;
@@ -69,7 +206,10 @@ static int setup_socket(const char *listen_ip, int port)
     if (strcmp(listen_ip, "0.0.0.0") == 0 || strlen(listen_ip) == 0)
     {
         servaddr.sin_addr.s_addr = INADDR_ANY;
-        printf("[SERVER] Configurado para escutar em todas as interfaces (0.0.0.0:%d)\n", port);
+        if (verbose)
+        {
+            printf("[SERVER] Configurado para escutar em todas as interfaces (0.0.0.0:%d)\n", port);
+        }
     }
     else
     {
@@ -79,7 +219,10 @@ static int setup_socket(const char *listen_ip, int port)
             close(sockfd);
             return -1;
         }
-        printf("[SERVER] Configurado para escutar no IP específico %s:%d\n", listen_ip, port);
+        if (verbose)
+        {
+            printf("[SERVER] Configurado para escutar no IP específico %s:%d\n", listen_ip, port);
+        }
     }
 
     if (bind(sockfd, (struct sockaddr *)&servaddr, sizeof(servaddr)) < 0)
@@ -90,7 +233,7 @@ static int setup_socket(const char *listen_ip, int port)
     }
 
     socklen_t addr_len = sizeof(servaddr);
-    if (getsockname(sockfd, (struct sockaddr *)&servaddr, &addr_len) == 0)
+    if (verbose && getsockname(sockfd, (struct sockaddr *)&servaddr, &addr_len) == 0)
     {
         printf("[SERVER] UDP servidor ATIVO em %s:%d\n",
                inet_ntoa(servaddr.sin_addr), ntohs(servaddr.sin_port));
@@ -99,18 +242,100 @@ static int setup_socket(const char *listen_ip, int port)
     return sockfd;
 }
 
-static int handle_one_packet(int sockfd, unsigned char *buffer)
+static int pin_to_cpu(int cpu)
 {
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    CPU_SET(cpu, &set);
+    return pthread_setaffinity_np(pthread_self(), sizeof(set), &set);
+}
+
+static uint64_t timespec_ns(const struct timespec *ts)
+{
+    return (uint64_t)ts->tv_sec * 1000000000ULL + (uint64_t)ts->tv_nsec;
+}
+
+static void put_be64(unsigned char *p, uint64_t v)
+{
+    for (int i = 7; i >= 0; i--)
+    {
+        p[i] = (unsigned char)(v & 0xff);
+        v >>= 8;
+    }
+}
+
+/* Instante de chegada do cmsg SCM_TIMESTAMPNS (0 se o kernel não o anexou) */
+static uint64_t arrival_ns(struct msghdr *msg)
+{
+    for (struct cmsghdr *cm = CMSG_FIRSTHDR(msg); cm; cm = CMSG_NXTHDR(msg, cm))
+    {
+        if (cm->cmsg_level == SOL_SOCKET && cm->cmsg_type == SCM_TIMESTAMPNS)
+        {
+            struct timespec ts;
+            memcpy(&ts, CMSG_DATA(cm), sizeof(ts));
+            return timespec_ns(&ts);
+        }
+    }
+    return 0;
+}
+
+static void dwell_stamp(unsigned char *buffer, size_t len, uint64_t rx_ns, uint64_t tx_ns)
+{
+    if (len >= DWELL_HEADER)
+    {
+        put_be64(buffer, rx_ns);
+        put_be64(buffer + 8, tx_ns);
+    }
+}
+
+static uint64_t now_realtime_ns(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_REALTIME, &ts);
+    return timespec_ns(&ts);
+}
+
+static int handle_one_packet(struct worker *w, unsigned char *buffer)
+{
+    int sockfd = w->sockfd;
     struct sockaddr_in cliaddr;
     socklen_t len = sizeof(cliaddr);
 
-    ssize_t nbytes = recvfrom(
-        sockfd,
-        buffer,
-        MAX_BUFFER,
-        0,
-        (struct sockaddr *)&cliaddr,
-        &len);
+    ssize_t nbytes;
+    uint64_t rx_ns = 0;
+    if (dwell)
+    {
+        struct iovec iov = {.iov_base = buffer, .iov_len = MAX_BUFFER};
+        char control[DWELL_CONTROL];
+        struct msghdr msg;
+        memset(&msg, 0, sizeof(msg));
+        msg.msg_name = &cliaddr;
+        msg.msg_namelen = len;
+        msg.msg_iov = &iov;
+        msg.msg_iovlen = 1;
+        msg.msg_control = control;
+        msg.msg_controllen = sizeof(control);
+        nbytes = recvmsg(sockfd, &msg, 0);
+        len = msg.msg_namelen;
+        if (nbytes >= 0)
+        {
+            rx_ns = arrival_ns(&msg);
+            if (rx_ns == 0)
+            {
+                rx_ns = now_realtime_ns();
+            }
+        }
+    }
+    else
+    {
+        nbytes = recvfrom(
+            sockfd,
+            buffer,
+            MAX_BUFFER,
+            0,
+            (struct sockaddr *)&cliaddr,
+            &len);
+    }
     if (nbytes < 0)
     {
         if (errno == EWOULDBLOCK || errno == EAGAIN)
@@ -120,10 +345,22 @@ static int handle_one_packet(int sockfd, unsigned char *buffer)
         if (running)
         {
             perror("recvfrom");
+            COUNT_ADD(w->stats->recv_errors, 1);
         }
         return -1;
     }
+    if (!running)
+    {
+        return 0;
+    }
+    COUNT_ADD(w->stats->packets_in, 1);
+    COUNT_ADD(w->stats->bytes_in, nbytes);
+    COUNT_ADD(w->stats->size_count[nbytes], 1);
 
+    if (dwell)
+    {
+        dwell_stamp(buffer, (size_t)nbytes, rx_ns, now_realtime_ns());
+    }
     ssize_t sent = sendto(
         sockfd,
         buffer,
@@ -134,78 +371,615 @@ static int handle_one_packet(int sockfd, unsigned char *buffer)
     if (sent < 0)
     {
         perror("sendto");
+        COUNT_ADD(w->stats->send_errors, 1);
         return -1;
     }
+    COUNT_ADD(w->stats->packets_out, 1);
+    COUNT_ADD(w->stats->bytes_out, sent);
 
     if (sent != nbytes)
     {
         printf("[WARN] Enviado apenas %zd de %zd bytes\n", sent, nbytes);
+        COUNT_ADD(w->stats->short_sends, 1);
     }
 
     return 1;
 }
 
-static void serve_forever(int sockfd)
+static int batch_init(struct batch *b, int size)
 {
-    unsigned char buffer[MAX_BUFFER];
-    int packet_count = 0;
+    b->size = size;
+    b->buffers = malloc((size_t)size * MAX_BUFFER);
+    b->msgs = calloc(size, sizeof(*b->msgs));
+    b->iovecs = calloc(size, sizeof(*b->iovecs));
+    b->addrs = calloc(size, sizeof(*b->addrs));
+    b->controls = dwell ? calloc(size, DWELL_CONTROL) : NULL;
+    if (!b->buffers || !b->msgs || !b->iovecs || !b->addrs || (dwell && !b->controls))
+    {
+        free(b->buffers);
+        free(b->controls);
+        free(b->msgs);
+        free(b->iovecs);
+        free(b->addrs);
+        return -1;
+    }
+    if (low_jitter)
+    {
+        /* Pré-falha as páginas dos buffers antes do primeiro datagrama */
+        memset(b->buffers, 0, (size_t)size * MAX_BUFFER);
+    }
+    for (int i = 0; i < size; i++)
+    {
+        b->iovecs[i].iov_base = b->buffers + (size_t)i * MAX_BUFFER;
+        b->msgs[i].msg_hdr.msg_iov = &b->iovecs[i];
+        b->msgs[i].msg_hdr.msg_iovlen = 1;
+        b->msgs[i].msg_hdr.msg_name = &b->addrs[i];
+    }
+    return 0;
+}
 
-    printf("[SERVER] Servidor ATIVO - aguardando conexões...\n");
-    printf("[SERVER] (Ctrl+C para parar)\n");
+static void batch_free(struct batch *b)
+{
+    free(b->buffers);
+    free(b->controls);
+    free(b->msgs);
+    free(b->iovecs);
+    free(b->addrs);
+}
+
+static int handle_batch(struct worker *w, struct batch *b)
+{
+    int sockfd = w->sockfd;
+    for (int i = 0; i < b->size; i++)
+    {
+        b->iovecs[i].iov_len = MAX_BUFFER;
+        b->msgs[i].msg_hdr.msg_namelen = sizeof(b->addrs[i]);
+        if (dwell)
+        {
+            b->msgs[i].msg_hdr.msg_control = b->controls + (size_t)i * DWELL_CONTROL;
+            b->msgs[i].msg_hdr.msg_controllen = DWELL_CONTROL;
+        }
+    }
+
+    /* MSG_WAITFORONE: bloqueia só até o primeiro datagrama e drena o que já estiver na fila */
+    int nrecv = recvmmsg(sockfd, b->msgs, b->size, MSG_WAITFORONE, NULL);
+    if (nrecv < 0)
+    {
+        if (errno == EWOULDBLOCK || errno == EAGAIN)
+        {
+            return 0;
+        }
+        if (running)
+        {
+            perror("recvmmsg");
+            COUNT_ADD(w->stats->recv_errors, 1);
+        }
+        return -1;
+    }
+    if (!running)
+    {
+        return 0;
+    }
+
+    uint64_t bytes_in = 0;
+    for (int i = 0; i < nrecv; i++)
+    {
+        b->iovecs[i].iov_len = b->msgs[i].msg_len;
+        bytes_in += b->msgs[i].msg_len;
+        COUNT_ADD(w->stats->size_count[b->msgs[i].msg_len], 1);
+    }
+    COUNT_ADD(w->stats->packets_in, nrecv);
+    COUNT_ADD(w->stats->bytes_in, bytes_in);
+
+    if (dwell)
+    {
+        /* Um instante de envio para o lote: todos saem no mesmo sendmmsg */
+        uint64_t tx_ns = now_realtime_ns();
+        for (int i = 0; i < nrecv; i++)
+        {
+            struct msghdr *hdr = &b->msgs[i].msg_hdr;
+            uint64_t rx_ns = arrival_ns(hdr);
+            dwell_stamp(hdr->msg_iov->iov_base, b->msgs[i].msg_len, rx_ns ? rx_ns : tx_ns, tx_ns);
+            hdr->msg_control = NULL;
+            hdr->msg_controllen = 0;
+        }
+    }
+
+    int echoed = 0;
+    int offset = 0;
+    while (offset < nrecv)
+    {
+        int nsent = sendmmsg(sockfd, b->msgs + offset, nrecv - offset, 0);
+        if (nsent < 0)
+        {
+            /* O datagrama em offset falhou; os seguintes ainda podem ser enviados */
+            perror("sendmmsg");
+            COUNT_ADD(w->stats->send_errors, 1);
+            offset++;
+            continue;
+        }
+        uint64_t bytes_out = 0;
+        for (int i = offset; i < offset + nsent; i++)
+        {
+            bytes_out += b->msgs[i].msg_len;
+            if (b->msgs[i].msg_len != b->iovecs[i].iov_len)
+            {
+                printf("[WARN] Enviado apenas %u de %zu bytes\n",
+                       b->msgs[i].msg_len, b->iovecs[i].iov_len);
+                COUNT_ADD(w->stats->short_sends, 1);
+            }
+        }
+        COUNT_ADD(w->stats->packets_out, nsent);
+        COUNT_ADD(w->stats->bytes_out, bytes_out);
+        echoed += nsent;
+        offset += nsent;
+    }
+
+    return echoed;
+}
+
+static void *serve_forever(void *arg)
+{
+    struct worker *w = arg;
+    struct batch b;
+    if (batch_init(&b, batch_size) < 0)
+    {
+        fprintf(stderr, "[WORKER %d] Falha ao alocar buffers\n", w->id);
+        return NULL;
+    }
+
+    if (w->cpu >= 0)
+    {
+        int err = pin_to_cpu(w->cpu);
+        if (err != 0)
+        {
+            fprintf(stderr, "[WORKER %d] Falha ao fixar na CPU %d: %s\n",
+                    w->id, w->cpu, strerror(err));
+        }
+    }
 
     while (running)
     {
-        int result = handle_one_packet(sockfd, buffer);
+        int result = (batch_size > 1) ? handle_batch(w, &b)
+                                      : handle_one_packet(w, b.buffers);
         if (result > 0)
         {
-            packet_count++;
+            if (w->packet_count == 0)
+            {
+                clock_gettime(CLOCK_MONOTONIC, &w->first_packet);
+            }
+            clock_gettime(CLOCK_MONOTONIC, &w->last_packet);
+            w->packet_count += result;
+        }
+        else if (result < 0 && running)
+        {
+            w->error_count++;
+            printf("[ERROR] Erro no processamento do pacote (worker %d)\n", w->id);
         }
-        else if (result < 0)
+    }
+
+    batch_free(&b);
+    return NULL;
+}
+
+static double elapsed_s(const struct timespec *start, const struct timespec *end)
+{
+    return (double)(end->tv_sec - start->tv_sec) + (double)(end->tv_nsec - start->tv_nsec) / 1e9;
+}
+
+static double worker_rate(const struct worker *w)
+{
+    double secs = elapsed_s(&w->first_packet, &w->last_packet);
+    return (w->packet_count > 1 && secs > 0) ? (double)(w->packet_count - 1) / secs : 0.0;
+}
+
+static uint64_t realtime_ns(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_REALTIME, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ULL + (uint64_t)ts.tv_nsec;
+}
+
+static void sum_counters(struct counters *total, int with_sizes)
+{
+    memset(total, 0, with_sizes ? sizeof(*total) : offsetof(struct counters, size_count));
+    for (int i = 0; i < num_workers; i++)
+    {
+        struct counters *c = workers[i].stats;
+        total->packets_in += COUNT_LOAD(c->packets_in);
+        total->packets_out += COUNT_LOAD(c->packets_out);
+        total->bytes_in += COUNT_LOAD(c->bytes_in);
+        total->bytes_out += COUNT_LOAD(c->bytes_out);
+        total->send_errors += COUNT_LOAD(c->send_errors);
+        total->short_sends += COUNT_LOAD(c->short_sends);
+        total->recv_errors += COUNT_LOAD(c->recv_errors);
+        if (with_sizes)
+        {
+            for (int sz = 0; sz < MAX_BUFFER; sz++)
+            {
+                total->size_count[sz] += COUNT_LOAD(c->size_count[sz]);
+            }
+        }
+    }
+}
+
+static struct stats_file *stats_open(const char *path)
+{
+    int fd = open(path, O_RDWR | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0)
+    {
+        perror("open stats-file");
+        return NULL;
+    }
+    if (ftruncate(fd, sizeof(struct stats_file)) < 0)
+    {
+        perror("ftruncate stats-file");
+        close(fd);
+        return NULL;
+    }
+    struct stats_file *sf = mmap(NULL, sizeof(struct stats_file), PROT_READ | PROT_WRITE,
+                                 MAP_SHARED, fd, 0);
+    close(fd);
+    if (sf == MAP_FAILED)
+    {
+        perror("mmap stats-file");
+        return NULL;
+    }
+    memcpy(sf->magic, STATS_MAGIC, sizeof(sf->magic));
+    sf->version = STATS_VERSION;
+    sf->num_workers = (uint32_t)num_workers;
+    sf->start_ns = realtime_ns();
+    sf->update_ns = sf->start_ns;
+    sf->interval_ms = (uint64_t)stats_interval_ms;
+    return sf;
+}
+
+static void stats_publish(struct stats_file *sf, struct counters *total,
+                          double rate_in, double rate_out)
+{
+    uint64_t seq = sf->seq;
+    __atomic_store_n(&sf->seq, seq + 1, __ATOMIC_RELAXED);
+    __atomic_thread_fence(__ATOMIC_RELEASE);
+
+    sf->update_ns = realtime_ns();
+    sf->packets_in = total->packets_in;
+    sf->packets_out = total->packets_out;
+    sf->bytes_in = total->bytes_in;
+    sf->bytes_out = total->bytes_out;
+    sf->send_errors = total->send_errors;
+    sf->short_sends = total->short_sends;
+    sf->recv_errors = total->recv_errors;
+    sf->rate_in_pps = rate_in;
+    sf->rate_out_pps = rate_out;
+    memcpy(sf->size_count, total->size_count, sizeof(sf->size_count));
+
+    __atomic_store_n(&sf->seq, seq + 2, __ATOMIC_RELEASE);
+}
+
+static void *stats_loop(void *arg)
+{
+    struct stats_file *sf = arg;
+    struct counters *total = malloc(sizeof(*total));
+    if (!total)
+    {
+        fprintf(stderr, "[STATS] Falha ao alocar contadores\n");
+        return NULL;
+    }
+
+    struct timespec prev, now;
+    uint64_t prev_in = 0, prev_out = 0;
+    clock_gettime(CLOCK_MONOTONIC, &prev);
+
+    int stopping = 0;
+    while (!stopping)
+    {
+        /* Dorme em fatias curtas para encerrar logo após o sinal */
+        for (int waited = 0; waited < stats_interval_ms && running; waited += 100)
         {
-            printf("[ERROR] Erro no processamento do pacote\n");
+            int slice = stats_interval_ms - waited < 100 ? stats_interval_ms - waited : 100;
+            struct timespec ts = {slice / 1000, (long)(slice % 1000) * 1000000L};
+            nanosleep(&ts, NULL);
         }
+        stopping = !running;
+
+        clock_gettime(CLOCK_MONOTONIC, &now);
+        double secs = elapsed_s(&prev, &now);
+        sum_counters(total, 1);
+        double rate_in = secs > 0 ? (double)(total->packets_in - prev_in) / secs : 0.0;
+        double rate_out = secs > 0 ? (double)(total->packets_out - prev_out) / secs : 0.0;
+        stats_publish(sf, total, rate_in, rate_out);
+
+        prev = now;
+        prev_in = total->packets_in;
+        prev_out = total->packets_out;
     }
 
-    printf("[SERVER] Servidor parado após processar %d pacotes.\n", packet_count);
+    free(total);
+    return NULL;
+}
+
+static void print_usage(const char *prog)
+{
+    fprintf(stderr, "Uso: %s <listen_ip> <port> [--workers N] [--pin CPU] [--batch N]\n"
+                    "       [--stats-file ARQ] [--stats-interval MS] [--low-jitter CPU] [--dwell]\n", prog);
+    fprintf(stderr, "  <listen_ip>: IP para bind (use '0.0.0.0' para todas as interfaces)\n");
+    fprintf(stderr, "  <port>: Porta UDP para escutar\n");
+    fprintf(stderr, "  --workers N: N sockets SO_REUSEPORT atendidos por N threads (padrão: 1, máx: %d)\n",
+            MAX_WORKERS);
+    fprintf(stderr, "  --pin CPU: fixa o worker i na CPU (CPU + i) %% núcleos online\n");
+    fprintf(stderr, "  --batch N: ecoa até N datagramas por chamada recvmmsg/sendmmsg (padrão: 1, máx: %d)\n",
+            MAX_BATCH);
+    fprintf(stderr, "  --stats-file ARQ: publica contadores ao vivo em ARQ (mmap, lido por server_stats.py)\n");
+    fprintf(stderr, "  --stats-interval MS: período de atualização/amostra de taxa (padrão: 1000 ms)\n");
+    fprintf(stderr, "  --low-jitter CPU: fixa os workers a partir da CPU, trava a memória (mlockall),\n"
+                    "                    pré-falha buffers e recebe por busy-poll não bloqueante\n");
+    fprintf(stderr, "  --dwell: grava nos primeiros %d bytes do eco os instantes de chegada e de envio\n"
+                    "           (ns, big-endian) para o cliente separar o tempo no servidor\n", DWELL_HEADER);
+    fprintf(stderr, "\nExemplos:\n");
+    fprintf(stderr, "  %s 0.0.0.0 50000               # Escuta em todas as interfaces\n", prog);
+    fprintf(stderr, "  %s 10.0.0.12 50000             # Escuta apenas no IP específico\n", prog);
+    fprintf(stderr, "  %s 0.0.0.0 50000 --workers 4   # 4 threads, uma por socket\n", prog);
+    fprintf(stderr, "  %s 0.0.0.0 50000 --batch 64    # Eco em lotes de até 64 datagramas\n", prog);
 }
 
 int main(int argc, char *argv[])
 {
-    if (argc != 3)
+    int first_cpu = -1;
+
+    static const struct option long_opts[] = {
+        {"workers", required_argument, NULL, 'w'},
+        {"pin", required_argument, NULL, 'p'},
+        {"batch", required_argument, NULL, 'b'},
+        {"stats-file", required_argument, NULL, 's'},
+        {"stats-interval", required_argument, NULL, 'i'},
+        {"low-jitter", required_argument, NULL, 'j'},
+        {"dwell", no_argument, NULL, 'd'},
+        {NULL, 0, NULL, 0}};
+
+    int opt;
+    while ((opt = getopt_long(argc, argv, "", long_opts, NULL)) != -1)
     {
-        fprintf(stderr, "Uso: %s <listen_ip> <port>\n", argv[0]);
-        fprintf(stderr, "  <listen_ip>: IP para bind (use '0.0.0.0' para todas as interfaces)\n");
-        fprintf(stderr, "  <port>: Porta UDP para escutar\n");
-        fprintf(stderr, "\nExemplos:\n");
-        fprintf(stderr, "  %s 0.0.0.0 50000        # Escuta em todas as interfaces\n", argv[0]);
-        fprintf(stderr, "  %s 10.0.0.12 50000      # Escuta apenas no IP específico\n", argv[0]);
+        switch (opt)
+        {
+        case 'w':
+            num_workers = atoi(optarg);
+            break;
+        case 'p':
+            first_cpu = atoi(optarg);
+            break;
+        case 'b':
+            batch_size = atoi(optarg);
+            break;
+        case 's':
+            stats_path = optarg;
+            break;
+        case 'i':
+            stats_interval_ms = atoi(optarg);
+            break;
+        case 'j':
+            low_jitter = 1;
+            first_cpu = atoi(optarg);
+            break;
+        case 'd':
+            dwell = 1;
+            break;
+        default:
+            print_usage(argv[0]);
+            return EXIT_FAILURE;
+        }
+    }
+
+    if (argc - optind != 2)
+    {
+        print_usage(argv[0]);
         return EXIT_FAILURE;
     }
 
-    const char *listen_ip = argv[1];
-    int port = atoi(argv[2]);
+    const char *listen_ip = argv[optind];
+    int port = atoi(argv[optind + 1]);
 
     if (port <= 0 || port > 65535)
     {
         fprintf(stderr, "Porta inválida: %d (deve estar entre 1-65535)\n", port);
         return EXIT_FAILURE;
     }
+    if (num_workers < 1 || num_workers > MAX_WORKERS)
+    {
+        fprintf(stderr, "Número de workers inválido: %d (deve estar entre 1-%d)\n",
+                num_workers, MAX_WORKERS);
+        return EXIT_FAILURE;
+    }
+    if (batch_size < 1 || batch_size > MAX_BATCH)
+    {
+        fprintf(stderr, "Tamanho de lote inválido: %d (deve estar entre 1-%d)\n",
+                batch_size, MAX_BATCH);
+        return EXIT_FAILURE;
+    }
+    if (stats_interval_ms < 10)
+    {
+        fprintf(stderr, "Intervalo de estatísticas inválido: %d ms (mínimo: 10)\n", stats_interval_ms);
+        return EXIT_FAILURE;
+    }
+    long ncpus = sysconf(_SC_NPROCESSORS_ONLN);
+    if (first_cpu >= 0 && (ncpus <= 0 || first_cpu >= ncpus))
+    {
+        fprintf(stderr, "CPU inválida para --pin: %d (núcleos online: %ld)\n", first_cpu, ncpus);
+        return EXIT_FAILURE;
+    }
+
+    for (int i = 0; i < MAX_WORKERS; i++)
+    {
+        workers[i].sockfd = -1;
+    }
     signal(SIGINT, signal_handler);
     signal(SIGTERM, signal_handler);
 
-    printf("[SERVER] Iniciando servidor UDP...\n");
+    printf("[SERVER] Iniciando servidor UDP com %d worker(s), lote de %d datagrama(s)...\n",
+           num_workers, batch_size);
+    if (dwell)
+    {
+        printf("[SERVER] Modo --dwell: ecos com >= %d bytes levam os instantes de chegada e envio\n",
+               DWELL_HEADER);
+    }
 
-    server_sockfd = setup_socket(listen_ip, port);
-    if (server_sockfd < 0)
+    for (int i = 0; i < num_workers; i++)
     {
-        return EXIT_FAILURE;
+        workers[i].id = i;
+        workers[i].cpu = (first_cpu >= 0) ? (int)((first_cpu + i) % ncpus) : -1;
+        workers[i].stats = calloc(1, sizeof(struct counters));
+        workers[i].sockfd = workers[i].stats ? setup_socket(listen_ip, port, i) : -1;
+        if (workers[i].sockfd < 0)
+        {
+            for (int j = 0; j <= i; j++)
+            {
+                if (workers[j].sockfd >= 0)
+                {
+                    close(workers[j].sockfd);
+                }
+                free(workers[j].stats);
+            }
+            return EXIT_FAILURE;
+        }
+    }
+
+    struct stats_file *sf = NULL;
+    pthread_t stats_thread;
+    if (stats_path)
+    {
+        sf = stats_open(stats_path);
+        if (!sf || pthread_create(&stats_thread, NULL, stats_loop, sf) != 0)
+        {
+            fprintf(stderr, "[WARN] Estatísticas ao vivo desativadas\n");
+            if (sf)
+            {
+                munmap(sf, sizeof(*sf));
+                sf = NULL;
+            }
+        }
+        else
+        {
+            printf("[SERVER] Estatísticas ao vivo em %s (a cada %d ms)\n", stats_path, stats_interval_ms);
+        }
+    }
+
+    if (low_jitter)
+    {
+        if (mlockall(MCL_CURRENT | MCL_FUTURE) == 0)
+        {
+            lj_mlocked = 1;
+        }
+        else
+        {
+            perror("mlockall (ignorando erro)");
+        }
+        char settings[160];
+        snprintf(settings, sizeof(settings),
+                 "cpu_inicial=%d workers=%d afinidade=por-worker mlockall=%s prefault=ok "
+                 "recv_nao_bloqueante=%s so_busy_poll=%s",
+                 first_cpu, num_workers, lj_mlocked ? "ok" : "falhou",
+                 lj_nonblocking ? "ok" : "falhou", lj_busy_poll ? "ok" : "falhou");
+        printf("[LOW-JITTER] %s\n", settings);
+        /* Com --stats-file, a configuração fica registrada junto das estatísticas */
+        if (stats_path)
+        {
+            char meta_name[512];
+            snprintf(meta_name, sizeof(meta_name), "%s.meta", stats_path);
+            FILE *meta = fopen(meta_name, "a");
+            if (meta)
+            {
+                fprintf(meta, "[LOW-JITTER] pid=%ld inicio=%ld %s\n", (long)getpid(),
+                        (long)time(NULL), settings);
+                fclose(meta);
+            }
+            else
+            {
+                perror("fopen .meta (ignorando erro)");
+            }
+        }
     }
 
-    serve_forever(server_sockfd);
+    printf("[SERVER] Servidor ATIVO - aguardando conexões...\n");
+    printf("[SERVER] (Ctrl+C para parar)\n");
+
+    int started = 0;
+    for (int i = 0; i < num_workers; i++)
+    {
+        int err = pthread_create(&workers[i].thread, NULL, serve_forever, &workers[i]);
+        if (err != 0)
+        {
+            fprintf(stderr, "pthread_create: %s\n", strerror(err));
+            running = 0;
+            break;
+        }
+        started++;
+    }
+
+    unsigned long total_packets = 0;
+    struct timespec run_first = {0, 0}, run_last = {0, 0};
+    for (int i = 0; i < started; i++)
+    {
+        pthread_join(workers[i].thread, NULL);
+        const struct worker *w = &workers[i];
+        if (w->packet_count == 0)
+        {
+            continue;
+        }
+        if (total_packets == 0 || elapsed_s(&w->first_packet, &run_first) > 0)
+        {
+            run_first = w->first_packet;
+        }
+        if (total_packets == 0 || elapsed_s(&run_last, &w->last_packet) > 0)
+        {
+            run_last = w->last_packet;
+        }
+        total_packets += w->packet_count;
+    }
 
-    if (server_sockfd >= 0)
+    for (int i = 0; i < started; i++)
     {
-        close(server_sockfd);
+        if (workers[i].cpu >= 0)
+        {
+            printf("[SERVER] Worker %d (CPU %d): %lu pacotes, %lu erros, %.0f pacotes/s\n",
+                   i, workers[i].cpu, workers[i].packet_count, workers[i].error_count,
+                   worker_rate(&workers[i]));
+        }
+        else
+        {
+            printf("[SERVER] Worker %d: %lu pacotes, %lu erros, %.0f pacotes/s\n",
+                   i, workers[i].packet_count, workers[i].error_count,
+                   worker_rate(&workers[i]));
+        }
+    }
+    if (sf)
+    {
+        pthread_join(stats_thread, NULL);
+        munmap(sf, sizeof(*sf));
+    }
+
+    struct counters total;
+    sum_counters(&total, 0);
+    printf("[SERVER] Recebidos %lu pacotes (%lu bytes), enviados %lu pacotes (%lu bytes)\n",
+           (unsigned long)total.packets_in, (unsigned long)total.bytes_in,
+           (unsigned long)total.packets_out, (unsigned long)total.bytes_out);
+    printf("[SERVER] Erros de envio: %lu, envios parciais: %lu, erros de recepção: %lu\n",
+           (unsigned long)total.send_errors, (unsigned long)total.short_sends,
+           (unsigned long)total.recv_errors);
+
+    double run_secs = elapsed_s(&run_first, &run_last);
+    printf("[SERVER] Servidor parado após processar %lu pacotes.\n", total_packets);
+    if (total_packets > 1 && run_secs > 0)
+    {
+        printf("[SERVER] Vazão média: %.0f pacotes/s em %.3f s de atividade\n",
+               (double)(total_packets - 1) / run_secs, run_secs);
+    }
+
+    for (int i = 0; i < num_workers; i++)
+    {
+        if (workers[i].sockfd >= 0)
+        {
+            close(workers[i].sockfd);
+        }
+        free(workers[i].stats);
     }
     return EXIT_SUCCESS;
 }
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Varredura adaptativa da grade de tamanhos de payload.
+
+Potências de dois não caem nos pontos em que o RTT muda de patamar (por
+exemplo 1472 -> 1473 bytes, onde o datagrama passa a ser fragmentado em
+Ethernet). A varredura mede a grade grossa da especificação com o
+client_udp e, para cada intervalo entre tamanhos vizinhos, compara a
+variação da mediana do RTT com a que a inclinação dos intervalos vizinhos
+explicaria (o RTT cresce linearmente com o tamanho pela serialização, e isso
+não interessa refinar), além da variação da taxa de perda. O ponto médio dos
+intervalos com maior variação inexplicada é medido, rodada após rodada, até
+gastar o orçamento de tamanhos novos; como um degrau continua inteiro em uma
+das metades, a bisseção converge para ele. A grade final é gravada na chave
+'tamanhos' da especificação, lida pelos clientes, analyze.py e plot.py.
+
+Uso:
+    python3 sweep.py auto 10.0.0.12 9090 1 --spec experimento.conf --budget 16
+    python3 sweep.py 127.0.0.1 127.0.0.1 9091 1 --output experimento_refinado.conf
+"""
+
+import argparse
+import math
+import os
+import shlex
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+import experiment_spec
+from analyze import _load_columns
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Cada tamanho da varredura só precisa da mediana com ~1% de precisão
+DEFAULT_CLIENT_ARGS = "--adaptive mediana --ci-target 1 --min-samples 100 --max-samples 1000"
+
+
+def size_summary(csv_path):
+    """{tamanho: (mediana do RTT, taxa de perda, tentativas)} do raw_data da varredura."""
+    table = _load_columns(csv_path, ("tamanho_bytes", "rtt_ms"), "na varredura")
+    if table is None:
+        return {}
+    sizes = table[:, 0].astype(np.int64)
+    summary = {}
+    for size in np.unique(sizes):
+        rtts = table[sizes == size, 1]
+        valid = rtts[rtts >= 0]
+        median = float(np.median(valid)) if valid.size else math.nan
+        summary[int(size)] = (median, 1.0 - valid.size / rtts.size, int(rtts.size))
+    return summary
+
+
+def interval_scores(summary):
+    """
+    [(variação, a, b)] para cada par de tamanhos vizinhos que ainda pode ser
+    dividido. A variação é a maior entre a diferença relativa das medianas
+    que sobra depois de descontar a inclinação do vizinho mais plano
+    (tendência linear) e a diferença das taxas de perda. Só contam vizinhos
+    pelo menos tão largos quanto o intervalo: a inclinação de um par estreito
+    como 1472-1473 é só o degrau dividido por 1 byte e, estendida a um
+    intervalo largo, inventaria uma variação enorme. Um lado sem RTT válido
+    (perda total) conta como variação máxima.
+    """
+    sizes = sorted(summary)
+    medians = [summary[s][0] for s in sizes]
+    widths = [b - a for a, b in zip(sizes, sizes[1:])]
+    slopes = [(mb - ma) / w for w, ma, mb in zip(widths, medians, medians[1:])]
+    scores = []
+    for i, (a, b) in enumerate(zip(sizes, sizes[1:])):
+        if b - a < 2:
+            continue
+        (ma, la, _), (mb, lb, _) = summary[a], summary[b]
+        if math.isnan(ma) != math.isnan(mb):
+            change = math.inf
+        elif math.isnan(ma) or min(ma, mb) <= 0:
+            change = 0.0
+        else:
+            around = [slopes[j] for j in (i - 1, i + 1)
+                      if 0 <= j < len(slopes) and widths[j] >= b - a and slopes[j] == slopes[j]]
+            trend = min(around, key=abs) if around else 0.0
+            change = abs(mb - ma - trend * (b - a)) / min(ma, mb)
+        scores.append((max(change, abs(lb - la)), a, b))
+    scores.sort(reverse=True)
+    return scores
+
+
+def run_round(args, workdir, sizes, round_no):
+    """Mede 'sizes' com o client_udp (anexando ao CSV da varredura)."""
+    spec_path = os.path.join(workdir, f"rodada_{round_no}.conf")
+    experiment_spec.write_sizes(spec_path, sizes)
+    cmd = [os.path.join(REPO_DIR, "client_udp"), *shlex.split(args.client_args),
+           "--spec", spec_path, args.local_ip, args.server_ip, str(args.server_port),
+           str(args.client_id)]
+    with open(os.path.join(workdir, f"rodada_{round_no}.log"), "wb") as log:
+        code = subprocess.call(cmd, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+    if code != 0:
+        print(f"[ERROR] client_udp saiu com código {code} na rodada {round_no} "
+              f"(veja {workdir}/rodada_{round_no}.log)")
+    return code == 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Refina a grade de tamanhos onde o RTT ou a perda mudam mais")
+    parser.add_argument("local_ip", help="IP local do cliente ou 'auto'")
+    parser.add_argument("server_ip")
+    parser.add_argument("server_port", type=int)
+    parser.add_argument("client_id", type=int, choices=(1, 2))
+    parser.add_argument("--spec", default=experiment_spec.SPEC_FILE,
+                        help="especificação com a grade grossa inicial "
+                             f"(padrão: {experiment_spec.SPEC_FILE}; sem o arquivo, a grade padrão)")
+    parser.add_argument("--output", metavar="ARQUIVO",
+                        help="especificação onde gravar a grade final (padrão: a própria --spec)")
+    parser.add_argument("--budget", type=int, default=16,
+                        help="número máximo de tamanhos novos (padrão: 16)")
+    parser.add_argument("--per-round", type=int, default=4,
+                        help="tamanhos novos medidos por rodada (padrão: 4)")
+    parser.add_argument("--min-change", type=float, default=0.02,
+                        help="para antes do orçamento se nenhum intervalo variar mais que "
+                             "isso (fração do RTT além da tendência, ou Δ perda; padrão: 0.02)")
+    parser.add_argument("--client-args", default=DEFAULT_CLIENT_ARGS,
+                        help=f"opções extras do client_udp (padrão: \"{DEFAULT_CLIENT_ARGS}\")")
+    parser.add_argument("--workdir",
+                        help="diretório do CSV e dos logs (padrão: sweep_<data_hora>)")
+    args = parser.parse_args()
+    if args.budget < 0 or args.per_round < 1:
+        parser.error("use --budget >= 0 e --per-round >= 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    spec_path = args.spec if os.path.exists(args.spec) else None
+    try:
+        coarse = sorted(set(experiment_spec.load_sizes(spec_path)))
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 2
+    if not os.path.exists(os.path.join(REPO_DIR, "client_udp")):
+        print("[ERROR] client_udp não encontrado (rode 'make')")
+        return 2
+    output = args.output or args.spec
+    # Absoluto: o client_udp roda com cwd=workdir e recebe o caminho da rodada
+    workdir = os.path.abspath(args.workdir or f"sweep_{datetime.now():%Y%m%d_%H%M%S}")
+    os.makedirs(workdir, exist_ok=True)
+    csv_path = os.path.join(workdir, f"raw_data_cliente{args.client_id}.csv")
+
+    print(f"[INFO] Grade inicial ({len(coarse)} tamanhos) de "
+          f"{spec_path or 'grade padrão'}; orçamento de {args.budget} tamanhos novos")
+    if not run_round(args, workdir, coarse, 0):
+        return 1
+
+    added, round_no = [], 0
+    while len(added) < args.budget:
+        summary = size_summary(csv_path)
+        candidates = [(score, a, b) for score, a, b in interval_scores(summary)
+                      if score >= args.min_change]
+        if not candidates:
+            print(f"[INFO] Nenhum intervalo varia mais que {args.min_change}; parando")
+            break
+        take = min(args.per_round, args.budget - len(added), len(candidates))
+        new = sorted({(a + b) // 2 for _, a, b in candidates[:take]} - set(summary))
+        round_no += 1
+        print(f"[INFO] Rodada {round_no}: " + ", ".join(
+            f"{(a + b) // 2} B ({a}-{b}, variação {score:.3f})"
+            for score, a, b in candidates[:take]))
+        if not new or not run_round(args, workdir, new, round_no):
+            break
+        added += new
+
+    summary = size_summary(csv_path)
+    grid = sorted(summary)
+    experiment_spec.write_sizes(output, grid)
+    print(f"\n{'Tamanho':>8} | {'Mediana (ms)':>12} | {'Perda %':>7} | {'Tentativas':>10}")
+    for size in grid:
+        median, loss, attempts = summary[size]
+        mark = " *" if size in added else ""
+        print(f"{size:>8} | {median:>12.5f} | {loss * 100:>7.2f} | {attempts:>10}{mark}")
+    print(f"\n[SUCCESS] {len(added)} tamanho(s) novo(s) (*); grade de {len(grid)} tamanhos "
+          f"gravada em {output}")
+    print(f"[INFO] Medições da varredura em {csv_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
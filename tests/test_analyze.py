@@ -0,0 +1,128 @@
+import numpy as np
+
+import analyze
+
+
+def _write_ramp_csv(path, rows=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        f.write("tamanho_bytes,nivel,iteracao_no_nivel,rtt_ms,rtt_kernel_ms\n")
+        for i in range(rows):
+            rtt = -1.0 if rng.random() < 0.01 else rng.gamma(2.0, 0.1)
+            f.write(f"{(64, 1024)[i % 2]},{i // 1000},{i % 1000 + 1},{rtt:.5f},{rtt * 0.9:.5f}\n")
+        # Linha truncada de uma execução interrompida
+        f.write("1024,19,10")
+
+
+def test_load_client_csv_parallel_matches_serial(tmp_path, monkeypatch):
+    path = tmp_path / "ramp_data_cliente1.csv"
+    _write_ramp_csv(path)
+    monkeypatch.setattr(analyze, "PARALLEL_MIN_BYTES", 0)
+
+    serial = analyze.load_client_csv(str(path), jobs=1)
+    parallel = analyze.load_client_csv(str(path), jobs=4)
+
+    assert serial.keys() == parallel.keys()
+    for name in serial:
+        np.testing.assert_array_equal(serial[name], parallel[name])
+
+    data, totals = analyze.group_rtts(parallel, ("tamanho_bytes", "nivel"))
+    ref_data, ref_totals = analyze.group_rtts(serial, ("tamanho_bytes", "nivel"))
+    assert totals == ref_totals
+    assert sum(totals.values()) == 20000
+    for key in ref_data:
+        np.testing.assert_array_equal(data[key], ref_data[key])
+
+
+def test_mser_truncation_false_positive_rate_on_stationary_input():
+    rng = np.random.default_rng(7)
+    runs = 2000
+    hits = sum(analyze.mser_truncation(rng.gamma(2.0, 0.05, 1000)) > 0 for _ in range(runs))
+    assert hits / runs <= 0.02
+
+
+def test_mser_truncation_detects_initial_transient():
+    rng = np.random.default_rng(8)
+    series = rng.gamma(2.0, 0.05, 1000)
+    series[:100] += 0.2
+    assert 50 <= analyze.mser_truncation(series) <= 150
+
+
+def _write_raw_csv(path, executions, seed=3):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        f.write("tamanho_bytes,iteracao,rtt_ms\n")
+        for shift in executions:
+            for i in range(1, 301):
+                for size in (64, 1024):
+                    rtt = -1.0 if rng.random() < 0.02 else rng.gamma(2.0, 0.05) + shift
+                    f.write(f"{size},{i},{rtt:.5f}\n")
+
+
+def _rolling_rows(path):
+    with open(path) as f:
+        header = f.readline()
+        return header, [line.split(",") for line in f.read().splitlines()]
+
+
+def test_rolling_per_instance_rows_match_single_execution(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_raw_csv("raw_data_cliente1.csv", (0.0, 0.3))
+    # A segunda execução do cliente 1, sozinha em um arquivo
+    with open("raw_data_cliente1.csv") as f:
+        lines = f.read().splitlines()
+    with open("raw_data_cliente3.csv", "w") as f:
+        f.write("\n".join([lines[0]] + lines[601:]) + "\n")
+
+    for base in ("cliente1", "cliente3"):
+        cols = analyze.load_client_csv(f"raw_data_{base}.csv", jobs=1)
+        analyze.write_rolling_stats(cols, base, window=50, steady=False)
+    assert not (tmp_path / "steady_state_cliente1.csv").exists()
+
+    header, both = _rolling_rows("rolling_cliente1.csv")
+    _, alone = _rolling_rows("rolling_cliente3.csv")
+    assert header.startswith("tamanho_bytes,instancia,")
+    assert {row[1] for row in both} == {"todas", "1", "2"}
+    second = [row[:1] + row[2:] for row in both if row[1] == "2"]
+    assert second == [row[:1] + row[2:] for row in alone if row[1] == "todas"]
+    assert second == [row[:1] + row[2:] for row in alone if row[1] == "1"]
+
+
+def test_tick_histogram_matches_sorted_sample_on_wide_span(monkeypatch):
+    monkeypatch.setattr(analyze, "TICK_DENSE_SPAN", 1 << 12)
+    rng = np.random.default_rng(11)
+    # Corpo denso mais largo que uma faixa (bincount) e cauda esparsa de
+    # centenas de ms a dias (ordenada)
+    body = np.round(rng.random(200000) * 3.5, 5)
+    tail = np.round(rng.choice([250.0, 3000.0, 4.0e8], 400) + rng.random(400), 5)
+    rtts = np.concatenate([body, tail, [body[0], tail[0]]])
+    rng.shuffle(rtts)
+
+    hist = analyze.TickHistogram.from_values(rtts)
+    assert hist.ticks is not None
+    ordered = sorted(rtts.tolist())
+    np.testing.assert_array_equal(hist.samples(), ordered)
+    for p in (0, 1, 25, 50, 95, 99, 99.9, 100):
+        assert hist.percentile(p) == analyze.compute_percentile(ordered, p)
+    assert hist.median() == float(np.median(rtts))
+
+    num_outliers, outliers = analyze.detect_outliers(rtts.tolist())
+    clean, removed = hist.without_outliers()
+    assert removed == num_outliers
+    np.testing.assert_array_equal(
+        clean.samples(), [x for x in ordered if x not in outliers])
+
+
+def test_pooled_group_stats_matches_compute_stats():
+    rng = np.random.default_rng(5)
+    keys = np.column_stack([rng.choice([64, 1024], 30000), rng.integers(1, 4, 30000)])
+    rtts = np.round(rng.gamma(2.0, 0.05, 30000), 5)
+    rtts[:20] = 5.0
+    uniq, st = analyze.pooled_group_stats(keys, rtts)
+    names = ("n", "media", "mediana", "dp", "jitter", "ic_low", "ic_up",
+             "p95", "p99", "min", "max")
+    for i, key in enumerate(uniq.tolist()):
+        stats = analyze.compute_stats(rtts[(keys == key).all(axis=1)])
+        for j, name in enumerate(names):
+            assert np.isclose(st[name][i], stats[j], rtol=1e-9, atol=1e-12), (key, name)
+        assert st["num_outliers"][i] == stats[12]
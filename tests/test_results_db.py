@@ -0,0 +1,32 @@
+import results_db
+
+
+def _table(columns, keys):
+    """Linhas com as chaves fora de ordem e valores distintos por coluna."""
+    rows = []
+    for i, key in enumerate(reversed(keys)):
+        rows.append(tuple(key) + tuple(float(i * 100 + j) for j in range(len(columns) - len(key))))
+    return rows
+
+
+def test_latest_table_round_trips_every_table_type(tmp_path):
+    stats = list(results_db.STATS_COLUMNS)
+    by_size = [c for c in stats if c != "nivel"]
+    tables = {
+        "stats_cliente1.csv": (by_size, [(64,), (1024,)]),
+        "stats_ramp_cliente2_100.csv": (stats, [(64, 1), (64, 2), (1024, 1)]),
+        "stats_ramp_aggregated_clientes_10mbps.csv": (stats, [(64, 1), (1024, 1), (1024, 2)]),
+        "stats_network_100mbps.csv": (list(results_db.NETWORK_COLUMNS), [(64,), (1024,)]),
+    }
+    db = results_db.ResultsDB(str(tmp_path / "resultados.db"))
+    for filename, (columns, keys) in tables.items():
+        header = [results_db._CSV_NAMES.get(c, c) for c in columns]
+        db.add_table(filename, header, _table(columns, keys))
+    db.close()
+
+    conn = results_db.connect(str(tmp_path / "resultados.db"))
+    for filename, (columns, keys) in tables.items():
+        header, rows = results_db.latest_table(conn, filename)
+        assert header == [results_db._CSV_NAMES.get(c, c) for c in columns]
+        assert rows == sorted(_table(columns, keys))
+    assert results_db.latest_table(conn, "stats_cliente2.csv") is None
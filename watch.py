@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Painel ao vivo dos CSVs dos clientes durante a campanha.
+
+Acompanha os raw_data_cliente*.csv e ramp_data_cliente*.csv enquanto os
+clientes ainda escrevem neles (linhas incompletas no fim do arquivo ficam
+para a próxima leitura) e atualiza, a cada intervalo, contagens, perda e
+percentis por tamanho. Os RTTs vão para histogramas logarítmicos de tamanho
+fixo (os mesmos do banco de resultados), então a memória não cresce com a
+duração da campanha; os percentis "recentes" vêm de uma cópia do histograma
+com decaimento exponencial.
+
+Uso:
+    python3 watch.py                                  # painel no terminal
+    python3 watch.py --png graficos/ao_vivo.png       # também gera um PNG periódico
+    python3 watch.py raw_data_cliente1.csv --once     # lê o que existe e sai
+"""
+
+import argparse
+import csv
+import glob
+import io
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from results_db import HIST_BINS, hist_bin, hist_center
+
+DEFAULT_PATTERNS = ("raw_data_cliente*.csv", "ramp_data_cliente*.csv")
+READ_CHUNK = 8 << 20          # bytes lidos por vez ao alcançar um arquivo grande
+DEFAULT_HALF_LIFE = 60.0      # meia-vida (s) do histograma "recente"
+
+
+class KeyStats:
+    """Contadores e histogramas de RTT de um tamanho, com memória fixa."""
+
+    def __init__(self):
+        self.n = 0
+        self.lost = 0
+        self.sum = 0.0
+        self.hist = np.zeros(HIST_BINS, dtype=np.int64)
+        self.recent = np.zeros(HIST_BINS)
+        self.nivel = None
+
+    def add(self, rtts):
+        valid = rtts[rtts >= 0]
+        self.lost += rtts.size - valid.size
+        self.n += valid.size
+        self.sum += float(valid.sum())
+        counts = np.bincount(hist_bin(valid), minlength=HIST_BINS)
+        self.hist += counts
+        self.recent += counts
+
+    def percentiles(self, qs, recent=False):
+        hist = self.recent if recent else self.hist
+        cum = np.cumsum(hist)
+        if cum[-1] <= 0:
+            return [float("nan")] * len(qs)
+        idx = np.searchsorted(cum, [cum[-1] * q / 100 for q in qs])
+        return list(hist_center(np.minimum(idx, HIST_BINS - 1)))
+
+
+class CsvTail:
+    """
+    Leitura incremental de um CSV que ainda está sendo escrito. Guarda o
+    deslocamento já lido e o pedaço de linha sem '\\n' do fim do arquivo.
+    Se o arquivo for truncado ou recriado, recomeça do início.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = b""
+        self.inode = None
+        self.header = None
+
+    def read_lines(self):
+        """Gera blocos de linhas completas novas (listas de str)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.offset, self.partial, self.inode, self.header = 0, b"", st.st_ino, None
+            yield None          # sinaliza que as estatísticas do arquivo recomeçam
+        if st.st_size == self.offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    break
+                self.offset += len(data)
+                data = self.partial + data
+                cut = data.rfind(b"\n") + 1
+                self.partial = data[cut:]
+                if not cut:
+                    continue
+                lines = data[:cut].decode("utf-8", "replace").splitlines()
+                if self.header is None and lines:
+                    self.header = next(csv.reader([lines[0]]))
+                    lines = lines[1:]
+                if lines:
+                    yield lines
+
+
+class FileMonitor:
+    """Estatísticas por tamanho de um raw_data_* ou ramp_data_*."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tail = CsvTail(path)
+        self.reset()
+
+    def reset(self):
+        self.keys = {}
+        self.rows = 0
+        self.bad_rows = 0
+        self.rate = 0.0
+
+    @property
+    def ramp(self):
+        return self.tail.header is not None and "nivel" in self.tail.header
+
+    def _parse(self, lines):
+        header = self.tail.header
+        names = ("tamanho_bytes", "nivel", "rtt_ms") if self.ramp else ("tamanho_bytes", "rtt_ms")
+        try:
+            cols = [header.index(c) for c in names]
+        except ValueError:
+            return None
+        text = io.StringIO("\n".join(lines))
+        try:
+            return np.loadtxt(text, delimiter=",", usecols=cols, ndmin=2)
+        except ValueError:
+            text.seek(0)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                table = np.genfromtxt(text, delimiter=",", usecols=cols,
+                                      invalid_raise=False, ndmin=2)
+            good = table[~np.isnan(table).any(axis=1)]
+            self.bad_rows += len(lines) - good.shape[0]
+            return good
+
+    def poll(self, elapsed):
+        new_rows = 0
+        for lines in self.tail.read_lines():
+            if lines is None:
+                self.reset()
+                continue
+            table = self._parse(lines)
+            if table is None or table.shape[0] == 0:
+                continue
+            new_rows += table.shape[0]
+            sizes = table[:, 0].astype(np.int64)
+            for size in np.unique(sizes):
+                sel = sizes == size
+                stats = self.keys.setdefault(int(size), KeyStats())
+                stats.add(table[sel, -1])
+                if self.ramp:
+                    stats.nivel = int(table[sel, 1][-1])
+        self.rows += new_rows
+        if elapsed > 0:
+            self.rate = new_rows / elapsed
+        return new_rows
+
+    def decay(self, factor):
+        for stats in self.keys.values():
+            stats.recent *= factor
+
+
+def format_monitor(mon):
+    kind = "rampa" if mon.ramp else "tamanho"
+    lines = [f"=== {os.path.basename(mon.path)} ({kind}) - {mon.rows} linhas, "
+             f"{mon.rate:.0f} linhas/s" + (f", {mon.bad_rows} inválidas" if mon.bad_rows else "")
+             + " ==="]
+    head = (f"{'Tamanho':>8} | {'Válidos':>8} | {'Perda %':>7} | {'Média':>8} | "
+            f"{'P50':>8} | {'P95':>8} | {'P99':>8} | {'P99 rec.':>8}")
+    if mon.ramp:
+        head += f" | {'Nível':>5}"
+    lines.append(head)
+    for size in sorted(mon.keys):
+        st = mon.keys[size]
+        total = st.n + st.lost
+        media = st.sum / st.n if st.n else float("nan")
+        p50, p95, p99 = st.percentiles((50, 95, 99))
+        (p99_rec,) = st.percentiles((99,), recent=True)
+        line = (f"{size:>8} | {st.n:>8} | {st.lost * 100 / total if total else 0:>7.2f} | "
+                f"{media:>8.4f} | {p50:>8.4f} | {p95:>8.4f} | {p99:>8.4f} | {p99_rec:>8.4f}")
+        if mon.ramp:
+            line += f" | {st.nivel if st.nivel is not None else '-':>5}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def write_png(monitors, path):
+    """Painel em PNG (um gráfico por arquivo); gravado em arquivo temporário e renomeado."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("[WARN] matplotlib não instalado; --png ignorado")
+        return False
+    monitors = [m for m in monitors if m.keys]
+    if not monitors:
+        return True
+    fig, axes = plt.subplots(len(monitors), 1, figsize=(12, 4 * len(monitors)), squeeze=False)
+    for ax, mon in zip(axes[:, 0], monitors):
+        sizes = sorted(mon.keys)
+        pct = np.array([mon.keys[s].percentiles((50, 99)) for s in sizes])
+        loss = [mon.keys[s].lost * 100 / max(mon.keys[s].n + mon.keys[s].lost, 1) for s in sizes]
+        ax.plot(sizes, pct[:, 0], "o-", color="#0066CC", label="P50")
+        ax.plot(sizes, pct[:, 1], "s--", color="#D32F2F", label="P99")
+        ax.set_xscale("log", base=2)
+        ax.set_xlabel("Tamanho do Payload (bytes)")
+        ax.set_ylabel("RTT (ms)")
+        ax.set_title(f"{os.path.basename(mon.path)} - {mon.rows} linhas "
+                     f"({time.strftime('%H:%M:%S')})")
+        ax.grid(True, alpha=0.3)
+        ax2 = ax.twinx()
+        ax2.bar(sizes, loss, width=np.array(sizes) * 0.3, color="gray", alpha=0.3,
+                label="Perda %")
+        ax2.set_ylabel("Perda (%)")
+        ax.legend(loc="upper left")
+    fig.tight_layout()
+    tmp = f"{path}.tmp.png"
+    fig.savefig(tmp, dpi=100)
+    plt.close(fig)
+    os.replace(tmp, path)
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Acompanha os CSVs dos clientes enquanto o experimento roda")
+    parser.add_argument("arquivos", nargs="*",
+                        help="CSVs a acompanhar (padrão: raw_data_cliente*.csv e "
+                             "ramp_data_cliente*.csv do diretório atual, inclusive os que surgirem)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="intervalo de atualização em segundos (padrão: 1)")
+    parser.add_argument("--half-life", type=float, default=DEFAULT_HALF_LIFE,
+                        help="meia-vida, em segundos, do P99 recente "
+                             f"(padrão: {DEFAULT_HALF_LIFE:.0f})")
+    parser.add_argument("--png", metavar="ARQUIVO",
+                        help="grava também um painel PNG periodicamente")
+    parser.add_argument("--png-interval", type=float, default=10.0,
+                        help="intervalo entre PNGs em segundos (padrão: 10)")
+    parser.add_argument("--once", action="store_true",
+                        help="lê o conteúdo atual, mostra o painel e sai")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    monitors = {}
+    clear = sys.stdout.isatty() and not args.once
+    last, last_png = None, 0.0
+
+    try:
+        while True:
+            paths = args.arquivos or sorted(p for pat in DEFAULT_PATTERNS for p in glob.glob(pat))
+            for path in paths:
+                if path not in monitors and os.path.exists(path):
+                    monitors[path] = FileMonitor(path)
+
+            now = time.monotonic()
+            elapsed, last = (now - last if last is not None else 0.0), now
+            factor = 0.5 ** (elapsed / args.half_life) if args.half_life > 0 else 1.0
+            for mon in monitors.values():
+                mon.decay(factor)
+                mon.poll(elapsed)
+
+            blocks = [format_monitor(m) for m in monitors.values()
+                      if m.tail.header and "rtt_ms" in m.tail.header]
+            if clear:
+                sys.stdout.write("\033[H\033[2J")
+            print(f"[INFO] {time.strftime('%H:%M:%S')} - {len(monitors)} arquivo(s)")
+            print("\n\n".join(blocks) if blocks else "[INFO] Aguardando CSVs dos clientes...")
+            if args.png and (args.once or now - last_png >= args.png_interval):
+                if not write_png(monitors.values(), args.png):
+                    args.png = None
+                last_png = now
+            if args.once:
+                break
+            sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())